@@ -15,21 +15,169 @@ import warnings as warnings_
 from lxml import etree as etree_
 import os
 import glob
-
-
-def load(config_dir):
+import hashlib
+import pickle
+import tempfile
+
+
+_CONFIGS_CACHE_VERSION = 1
+
+_configs_registry = dict()
+
+
+def load(config_dir, cache_dir=None):
+    """Loads the table configurations found in a directory
+
+    Loaded configurations are kept for the rest of the process, keyed by directory, and are reused for as long as no
+    XML file in the directory is added, removed or modified. If a cache directory is given, they are also pickled
+    there so that other processes can skip parsing the XML files too.
+
+    :param config_dir: Path to the directory of XML configuration files
+    :param cache_dir: Optional path to a directory in which to keep a pickled copy of the configurations
+    :return: dict of IndexedConfiguration objects keyed by (measurement type, technology type)
+    """
+    config_files = glob.glob(os.path.join(config_dir, '*.xml'))
+    signature = get_config_files_signature(config_files)
+    registry_key = os.path.abspath(config_dir)
+    registered = _configs_registry.get(registry_key)
+    if registered is not None and registered[0] == signature:
+        return dict(registered[1])
+    config_dict = None
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, 'isatab_configs_{}.pickle'.format(
+            hashlib.sha1(registry_key.encode('utf-8')).hexdigest()))
+        config_dict = read_configs_cache(cache_file, signature)
+    if config_dict is None:
+        config_dict = parse_configs(config_files)
+        if cache_file is not None:
+            write_configs_cache(cache_file, signature, config_dict)
+    _configs_registry[registry_key] = (signature, config_dict)
+    return dict(config_dict)
+
+
+def parse_configs(config_files):
     config_dict = dict()
-    for file in glob.iglob(os.path.join(config_dir, '*.xml')):
+    for file in config_files:
         try:
             config_obj = parse(inFileName=file, silence=True)
             measurement_type = config_obj.get_isatab_configuration()[0].get_measurement().get_term_label()
             technology_type = config_obj.get_isatab_configuration()[0].get_technology().get_term_label()
-            config_dict[(measurement_type, technology_type)] = config_obj
+            config_dict[(measurement_type, technology_type)] = IndexedConfiguration(config_obj)
         except GDSParseError as parse_error:
             print(parse_error)
     return config_dict
 
 
+def get_config_files_signature(config_files):
+    """Gets the name, size and modification time of each configuration file, to tell when any of them has changed"""
+    signature = list()
+    for file in config_files:
+        file_stat = os.stat(file)
+        signature.append((os.path.basename(file), file_stat.st_size, file_stat.st_mtime_ns))
+    return tuple(sorted(signature))
+
+
+def read_configs_cache(cache_file, signature):
+    """Reads pickled configurations, or returns None if there are none or they are not those of the given files"""
+    try:
+        with open(cache_file, 'rb') as cache_fp:
+            version, cached_signature, config_dict = pickle.load(cache_fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # a cache written by another version or cut short is just rebuilt
+        warnings_.warn("Ignoring unreadable configurations cache {}: {}".format(cache_file, e))
+        return None
+    if version != _CONFIGS_CACHE_VERSION or cached_signature != signature:
+        return None
+    return config_dict
+
+
+def write_configs_cache(cache_file, signature, config_dict):
+    """Pickles configurations, writing to a temporary file first so that concurrent readers never see a partial one"""
+    tmp_file = None
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp_fp:
+            pickle.dump((_CONFIGS_CACHE_VERSION, signature, config_dict), tmp_fp, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PicklingError) as e:
+        warnings_.warn("Could not write configurations cache {}: {}".format(cache_file, e))
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def clear_configs_registry():
+    """Forgets the configurations loaded so far in this process"""
+    _configs_registry.clear()
+
+
+class IndexedConfiguration(object):
+    """Indexed view of a parsed table configuration, for looking up its fields without scanning them
+
+    Attributes not defined here, such as get_isatab_configuration() and isatab_configuration, are those of the wrapped
+    configuration object, so the view can be used wherever the configuration object is.
+    """
+
+    def __init__(self, config_obj):
+        self.config = config_obj
+        table_config = config_obj.get_isatab_configuration()[0]
+        self.fields = list(table_config.get_field())
+        self.headers = [f.header for f in self.fields]
+        self.required_headers = [f.header for f in self.fields if f.is_required]
+        self.protocol_fields = list(table_config.get_protocol_field())
+        self.unit_fields = list(table_config.get_unit_field())
+        self.fields_by_header = dict()
+        self.fields_by_lower_header = dict()
+        self.fields_by_pos = dict()
+        for field in self.fields:
+            self.fields_by_header.setdefault(field.header, list()).append(field)
+            self.fields_by_lower_header.setdefault(field.header.lower(), list()).append(field)
+            self.fields_by_pos.setdefault(field.pos, list()).append(field)
+        self.unit_fields_by_pos = dict()
+        for unit_field in self.unit_fields:
+            self.unit_fields_by_pos.setdefault(unit_field.pos, list()).append(unit_field)
+        self.__protocol_ranges = dict()
+
+    def __getattr__(self, name):
+        config = self.__dict__.get('config')  # not yet set while unpickling
+        if config is None:
+            raise AttributeError(name)
+        return getattr(config, name)
+
+    def get_field_by_header(self, header):
+        """Gets the field with the given header, or None if there is no such field or more than one"""
+        fields = self.fields_by_header.get(header, [])
+        return fields[0] if len(fields) == 1 else None
+
+    def get_field_by_lower_header(self, header):
+        """Gets the field with the given header, ignoring case, or None if there is no such field or more than one"""
+        fields = self.fields_by_lower_header.get(header.lower(), [])
+        return fields[0] if len(fields) == 1 else None
+
+    def get_unit_field_by_pos(self, pos):
+        """Gets the unit field at the given position, or None if there is no such field or more than one"""
+        unit_fields = self.unit_fields_by_pos.get(pos, [])
+        return unit_fields[0] if len(unit_fields) == 1 else None
+
+    def get_protocol_types_between(self, left_pos, right_pos):
+        """Gets the types of the protocol fields positioned strictly between two positions
+
+        The ranges are computed on first use and kept, as the same pairs of fields are looked up for every table.
+
+        :param left_pos: Position of the field on the left
+        :param right_pos: Position of the field on the right
+        :return: list of protocol types, in the order of the protocol fields in the configuration
+        """
+        try:
+            return self.__protocol_ranges[(left_pos, right_pos)]
+        except KeyError:
+            protocol_types = [p.protocol_type for p in self.protocol_fields if left_pos < p.pos < right_pos]
+            self.__protocol_ranges[(left_pos, right_pos)] = protocol_types
+            return protocol_types
+
+
 def get_config(config_dict, measurement_type=None, technology_type=None):
     try:
         config = config_dict[(measurement_type, technology_type)].isatab_configuration[0]
@@ -1,14 +1,13 @@
 from abc import ABCMeta, abstractmethod
 from urllib.parse import urljoin
 from lxml import etree
-from jsonschema import RefResolver, Draft4Validator
 from io import BytesIO, StringIO
 from zipfile import ZipFile
 import requests
 import json
 import os
-import pathlib
 import base64
+from isatools.validate import schema_registry
 import pdb
 
 __author__ = 'massi'
@@ -43,15 +42,11 @@ def validate_xml_against_schema(xml_str, xml_schema_file):
 
 def validate_json_against_schema(json_dict, schema_src):
     """
-    Validate a JSON dictionary against the provided JSON schema
+    Validate a JSON dictionary against the provided JSON schema, whose validator is kept by schema_registry
     :param json_dict dict
     :param schema_src str - file path to the JSON schema file
     """
-    with open(schema_src) as schema_file:
-        schema = json.load(schema_file)
-    resolver = RefResolver(pathlib.Path(os.path.abspath(schema_src)).as_uri(), schema)
-    validator = Draft4Validator(schema, resolver=resolver)
-    return validator.validate(json_dict, schema)
+    return schema_registry.validate(json_dict, schema_src)
 
 
 class IsaStorageAdapter(metaclass=ABCMeta):
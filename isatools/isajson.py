@@ -1,25 +1,222 @@
 from isatools.model.v1 import *
+import codecs
 import json
 import logging
 import networkx as nx
-from jsonschema import Draft4Validator, RefResolver, ValidationError
+from jsonschema import ValidationError
 import os
 import glob
 import re
 from json import JSONEncoder
+from isatools.validate.context import ValidationContext, CurrentContextList, add_context_logging
+from isatools.validate import schema_registry
 
 logging.basicConfig(format="%(asctime)s %(levelname)s: %(message)s", level=logging.INFO)
 logger = logging.getLogger(__name__)
+add_context_logging(logger)
 
-errors = list()
-warnings = list()
+# errors and warnings of the validation running in the calling thread, see isatools.validate.context
+errors = CurrentContextList('errors')
+warnings = CurrentContextList('warnings')
 
 # REGEXES
 _RX_DOI = re.compile("(10[.][0-9]{4,}(?:[.][0-9]+)*/(?:(?![%'#? ])\\S)+)")
 _RX_PMID = re.compile("[0-9]{8}")
 _RX_PMCID = re.compile("PMC[0-9]{8}")
+_RX_WHITESPACE = re.compile("[ \t\n\r]*")
+
+
+class _JSONReader(object):
+    """Reads a JSON document from a file one value at a time
+
+    Objects and arrays can be stepped through a member at a time with iter_object() and iter_array(), and values read
+    whole with read_value(), so that only the value being read is held in memory, along with a buffer of the file.
+    """
+    chunk_size = 1 << 16
+
+    def __init__(self, fp):
+        self.__fp = fp
+        self.__decoder = json.JSONDecoder()
+        self.__bytes_decoder = None
+        self.__buffer = ''
+        self.__pos = 0
+        self.__eof = False
+
+    def __read_more(self, size):
+        data = self.__fp.read(size)
+        if not data:
+            self.__eof = True
+        if isinstance(data, bytes):
+            if self.__bytes_decoder is None:
+                self.__bytes_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+            data = self.__bytes_decoder.decode(data, final=self.__eof)
+        self.__buffer = self.__buffer[self.__pos:] + data
+        self.__pos = 0
+
+    def __peek(self):
+        """Skips whitespace and gets the next character without reading past it, or '' at the end of the document"""
+        while True:
+            self.__pos = _RX_WHITESPACE.match(self.__buffer, self.__pos).end()
+            if self.__pos < len(self.__buffer):
+                return self.__buffer[self.__pos]
+            if self.__eof:
+                return ''
+            self.__read_more(self.chunk_size)
+
+    def __expect(self, chars):
+        char = self.__peek()
+        if char == '' or char not in chars:
+            raise json.JSONDecodeError("Expecting one of '{}'".format(chars), self.__buffer, self.__pos)
+        self.__pos += 1
+        return char
+
+    def read_value(self):
+        """Reads the next value whole
+
+        :return: The value, as json.load() would return it
+        """
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__pos)
+                if end < len(self.__buffer) or self.__eof:  # a number at the end of the buffer may run on
+                    self.__pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            # reads at least as much again as is buffered, so that long values are decoded a bounded number of times
+            self.__read_more(max(self.chunk_size, len(self.__buffer) - self.__pos))
+
+    def iter_object(self):
+        """Steps through the next value, which must be an object, yielding each key when its value is next to read
+
+        Each value must be read, with read_value() or by stepping through it, before stepping on to the next key.
+        """
+        self.__expect('{')
+        if self.__peek() == '}':
+            self.__pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.__expect(':')
+            yield key
+            if self.__expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """Steps through the next value, which must be an array, yielding when each item is next to read
+
+        Each item must be read, with read_value() or by stepping through it, before stepping on to the next one.
+        """
+        self.__expect('[')
+        if self.__peek() == ']':
+            self.__pos += 1
+            return
+        while True:
+            yield
+            if self.__expect(',]') == ']':
+                return
+
+    def read_end(self):
+        """Checks that nothing but whitespace is left in the document"""
+        if self.__peek() != '':
+            raise json.JSONDecodeError("Extra data", self.__buffer, self.__pos)
+
+
+class _References(object):
+    """The objects of one kind declared in an ISA-JSON document, by @id or name, and the references to objects not
+    declared yet
+
+    A reference sets an attribute of the object referring, or an item of a list of references, to the object referred
+    to, as soon as both have been read, whichever comes first in the document.
+    """
+
+    def __init__(self, kind, parent=None):
+        """
+        :param kind: What the objects are, for error messages
+        :param parent: _References to also look objects up in, and to hand references left waiting to on close()
+        """
+        self.kind = kind
+        self.parent = parent
+        self.objects = dict()
+        self.waiting = dict()
+
+    def declare(self, id_, obj):
+        self.objects[id_] = obj
+        for target, key, required in self.waiting.pop(id_, ()):
+            _set_reference(target, key, obj)
+
+    def get(self, id_, default=None):
+        try:
+            return self.objects[id_]
+        except KeyError:
+            if self.parent is not None:
+                return self.parent.get(id_, default)
+            return default
+
+    def refer(self, id_, target, key, required=True):
+        """Sets an attribute of target, or an item of target if it is a list, to the object declared with id_, now if
+        it has been declared and else once it is
+
+        :param id_: @id or name of the object
+        :param target: Object or list referring to the object
+        :param key: Name of the attribute, or index of the list item, to set
+        :param required: False if the reference is to be dropped if the object is never declared
+        """
+        obj = self.get(id_, _UNDECLARED)
+        if obj is _UNDECLARED:
+            self.waiting.setdefault(id_, list()).append((target, key, required))
+        else:
+            _set_reference(target, key, obj)
+
+    def append(self, id_, target, required=True):
+        """Appends a reference to the object declared with id_ to a list"""
+        target.append(None)
+        self.refer(id_, target, len(target) - 1, required)
+
+    def close(self):
+        """Hands the references left waiting over to the parent, or else checks them"""
+        if self.parent is None:
+            self.check()
+            return
+        for id_, references in self.waiting.items():
+            for target, key, required in references:
+                self.parent.refer(id_, target, key, required)
+        self.waiting = dict()
+
+    def check(self):
+        """Drops references left waiting that are not required, and raises IOError if any that are required are left"""
+        for id_, references in self.waiting.items():
+            for target, key, required in references:
+                if required:
+                    raise IOError("Could not find {} referred to as {}".format(self.kind, id_))
+                if isinstance(target, list):
+                    target[:] = [x for x in target if x is not None]
+        self.waiting = dict()
+
+
+_UNDECLARED = object()
+
+
+def _set_reference(target, key, obj):
+    if isinstance(target, list):
+        target[key] = obj
+    else:
+        setattr(target, key, obj)
+
 
 def load(fp):
+    """Loads an ISA-JSON document into ISA model objects
+
+    The document is streamed rather than read whole: the materials, processes and assays of each study are built into
+    model objects as they are read, and their JSON dropped, so that loading a large document takes little more memory
+    than the objects loaded. References by @id are resolved whether the object referred to comes before or after the
+    reference in the document.
+
+    :param fp: File pointer to the ISA-JSON document
+    :return: Investigation object
+    """
 
     def get_comments(j):
         comments = None
@@ -32,148 +229,413 @@ def load(fp):
                 comments.append(comment)
         return comments
 
+    def get_annotation(term, term_source_ref, term_accession, id_=''):
+        annotation = OntologyAnnotation(term=term, term_accession=term_accession, id_=id_)
+        term_sources.refer(term_source_ref, annotation, 'term_source')
+        return annotation
+
     def get_roles(j):
         roles = None
         if "roles" in j.keys():
             roles = list()
             for role_json in j["roles"]:
-                term = role_json["annotationValue"]
-                term_accession = role_json["termAccession"]
-                term_source = term_source_dict[role_json["termSource"]]
-                role = OntologyAnnotation(term, term_source, term_accession)
+                role = get_annotation(role_json["annotationValue"], role_json["termSource"],
+                                      role_json["termAccession"])
                 roles.append(role)
         return roles
 
+    def get_value_annotation(term, term_source_ref, term_accession):
+        # values of characteristics, factors and parameters have no @id, so identical ones can share one object
+        key = (term, term_source_ref, term_accession)
+        try:
+            return value_annotations[key]
+        except KeyError:
+            value = get_annotation(term, term_source_ref, term_accession)
+            value_annotations[key] = value
+            return value
+
     def get_jvalue(dict, key):
         if key in dict.keys():
             return dict[key]
         else:
             return None
 
-    investigation_json = json.load(fp)
-    investigation = Investigation(
-        identifier=investigation_json["identifier"],
-        title=investigation_json["title"],
-        description=investigation_json["description"],
-        submission_date=investigation_json["submissionDate"],
-        public_release_date=investigation_json["publicReleaseDate"]
-    )
-    investigation.comments = get_comments(investigation_json)
-    term_source_dict = {"": None}
-    for ontologySourceReference_json in investigation_json["ontologySourceReferences"]:
-        ontology_source_reference = OntologySource(
-            name=ontologySourceReference_json["name"],
-            file=ontologySourceReference_json["file"],
-            version=ontologySourceReference_json["version"],
-            description=ontologySourceReference_json["description"]
-        )
-        term_source_dict[ontology_source_reference.name] = ontology_source_reference
-        investigation.ontology_source_references.append(ontology_source_reference)
-    for publication_json in investigation_json["publications"]:
+    def get_publication(publication_json):
         publication = Publication(
             pubmed_id=publication_json["pubMedID"],
             doi=publication_json["doi"],
             author_list=publication_json["authorList"],
             title=publication_json["title"],
-            status=OntologyAnnotation(
-                term=publication_json["status"]["annotationValue"],
-                term_accession=publication_json["status"]["termAccession"],
-                term_source=term_source_dict[publication_json["status"]["termSource"]]
+            status=get_annotation(
+                publication_json["status"]["annotationValue"],
+                publication_json["status"]["termSource"],
+                publication_json["status"]["termAccession"]
             )
         )
         try:
             publication.comments = get_comments(publication_json)
         except KeyError:
             pass
-        investigation.publications.append(publication)
-    for person_json in investigation_json["people"]:
-        person = Person(
-            last_name=person_json["lastName"],
-            first_name=person_json["firstName"],
-            mid_initials=person_json["midInitials"],
-            email=person_json["email"],
-            phone=person_json["phone"],
-            fax=person_json["fax"],
-            address=person_json["address"],
-            affiliation=person_json["affiliation"],
-            roles=[]
+        return publication
+
+    def get_characteristic_category(characteristic_category_json):
+        characteristic_category = get_annotation(
+            characteristic_category_json["characteristicType"]["annotationValue"],
+            characteristic_category_json["characteristicType"]["termSource"],
+            characteristic_category_json["characteristicType"]["termAccession"],
+            id_=characteristic_category_json["@id"]
         )
-        for role_json in person_json["roles"]:
-            role = OntologyAnnotation(
-                term=role_json["annotationValue"],
-                term_accession=role_json["termAccession"],
-                term_source=term_source_dict[role_json["termSource"]]
+        categories.declare(characteristic_category.id, characteristic_category)
+        return characteristic_category
+
+    def get_unit_category(unit_json):
+        unit = get_annotation(unit_json["annotationValue"], unit_json["termSource"], unit_json["termAccession"],
+                              id_=unit_json["@id"])
+        units.declare(unit.id, unit)
+        return unit
+
+    def get_protocol(protocol_json):
+        protocol_type = OntologyAnnotation(
+            term=protocol_json["protocolType"]["annotationValue"],
+            term_accession=protocol_json["protocolType"]["termAccession"] if "termAccession" in protocol_json["protocolType"].keys() else "",
+        )
+        if "termSource" in protocol_json["protocolType"].keys():
+            term_sources.refer(protocol_json["protocolType"]["termSource"], protocol_type, 'term_source')
+        protocol = Protocol(
+            id_=protocol_json["@id"],
+            name=protocol_json["name"],
+            uri=protocol_json["uri"],
+            description=protocol_json["description"],
+            version=protocol_json["version"],
+            protocol_type=protocol_type
+        )
+        for parameter_json in protocol_json["parameters"]:
+            parameter = ProtocolParameter(
+                id_=parameter_json["@id"],
+                parameter_name=get_annotation(
+                    parameter_json["parameterName"]["annotationValue"],
+                    parameter_json["parameterName"]["termSource"],
+                    parameter_json["parameterName"]["termAccession"]
+                )
             )
-            person.roles.append(role)
-        person.comments = get_comments(person_json)
-        investigation.contacts.append(person)
-    samples_dict = dict()
-    sources_dict = dict()
-    categories_dict = dict()
-    protocols_dict = dict()
-    factors_dict = dict()
-    parameters_dict = dict()
-    units_dict = dict()
-
-    # populate assay characteristicCategories first
-    for study_json in investigation_json["studies"]:
-        for assay_json in study_json["assays"]:
-            for assay_characteristics_category_json in assay_json["characteristicCategories"]:
-                characteristic_category = OntologyAnnotation(
-                    id_=assay_characteristics_category_json["@id"],
-                    term=assay_characteristics_category_json["characteristicType"]["annotationValue"],
-                    term_source=term_source_dict[assay_characteristics_category_json["characteristicType"]["termSource"]],
-                    term_accession=assay_characteristics_category_json["characteristicType"]["termAccession"],
+            protocol.parameters.append(parameter)
+            parameters.declare(parameter.id, parameter)
+        for component_json in protocol_json["components"]:
+            component = ProtocolComponent(
+                name=component_json["componentName"],
+                component_type=get_annotation(
+                    component_json["componentType"]["annotationValue"],
+                    component_json["componentType"]["termSource"],
+                    component_json["componentType"]["termAccession"]
+                )
+            )
+            protocol.components.append(component)
+        protocols.declare(protocol.id, protocol)
+        return protocol
+
+    def get_factor(factor_json):
+        factor = StudyFactor(
+            id_=factor_json["@id"],
+            name=factor_json["factorName"],
+            factor_type=get_annotation(
+                factor_json["factorType"]["annotationValue"],
+                factor_json["factorType"]["termSource"],
+                factor_json["factorType"]["termAccession"]
+            )
+        )
+        factors.declare(factor.id, factor)
+        return factor
+
+    def get_source(source_json):
+        source = Source(
+            id_=source_json["@id"],
+            name=source_json["name"][7:],
+        )
+        for characteristic_json in source_json["characteristics"]:
+            value = characteristic_json["value"]
+            characteristic = Characteristic()
+            categories.refer(characteristic_json["category"]["@id"], characteristic, 'category')
+            if isinstance(value, dict):
+                try:
+                    term = characteristic_json["value"]["annotationValue"]
+                    if isinstance(term, (int, float)):
+                        term = str(term)
+                    value = get_value_annotation(
+                        term,
+                        characteristic_json["value"]["termSource"],
+                        characteristic_json["value"]["termAccession"])
+                except KeyError:
+                    raise IOError("Can't create value as annotation")
+            elif isinstance(value, (int, float)):
+                try:
+                    units.refer(characteristic_json["unit"]["@id"], characteristic, 'unit', required=False)
+                except KeyError:
+                    pass
+            elif not isinstance(value, str):
+                raise IOError("Unexpected type in characteristic value")
+            characteristic.value = value
+            source.characteristics.append(characteristic)
+        materials.declare(source.id, source)
+        return source
+
+    def get_sample(sample_json):
+        sample = Sample(
+            id_=sample_json["@id"],
+            name=sample_json["name"][7:]
+        )
+        for characteristic_json in sample_json["characteristics"]:
+            value = characteristic_json["value"]
+            characteristic = Characteristic()
+            categories.refer(characteristic_json["category"]["@id"], characteristic, 'category')
+            if isinstance(value, dict):
+                try:
+                    value = get_value_annotation(
+                        characteristic_json["value"]["annotationValue"],
+                        characteristic_json["value"]["termSource"],
+                        characteristic_json["value"]["termAccession"])
+                except KeyError:
+                    raise IOError("Can't create value as annotation")
+            elif isinstance(value, int) or isinstance(value, float):
+                try:
+                    units.refer(characteristic_json["unit"]["@id"], characteristic, 'unit')
+                except KeyError:
+                    raise IOError("Can't create unit annotation")
+            elif not isinstance(value, str):
+                raise IOError("Unexpected type in characteristic value")
+            characteristic.value = value
+            sample.characteristics.append(characteristic)
+        for factor_value_json in sample_json["factorValues"]:
+            factor_value = FactorValue()
+            factors.refer(factor_value_json["category"]["@id"], factor_value, 'factor_name')
+            if isinstance(factor_value_json["value"], dict):
+                factor_value.value = get_value_annotation(
+                    factor_value_json["value"]["annotationValue"],
+                    factor_value_json["value"]["termSource"],
+                    factor_value_json["value"]["termAccession"],
                 )
-                # study.characteristic_categories.append(characteristic_category)
-                categories_dict[characteristic_category.id] = characteristic_category
-    for study_json in investigation_json["studies"]:
-        process_dict = dict()
-        study = Study(
-            identifier=study_json["identifier"],
-            title=study_json["title"],
-            description=study_json["description"],
-            submission_date=study_json["submissionDate"],
-            public_release_date=study_json["publicReleaseDate"],
-            filename=study_json["filename"]
+            else:
+                factor_value.value = factor_value_json["value"]
+                units.refer(factor_value_json["unit"]["@id"], factor_value, 'unit')
+            sample.factor_values.append(factor_value)
+        if "derivesFrom" in sample_json.keys():
+            for source_id_ref_json in sample_json["derivesFrom"]:
+                materials.append(source_id_ref_json["@id"], sample.derives_from, required=False)
+        materials.declare(sample.id, sample)
+        return sample
+
+    def get_process(process_json, processes):
+        process = Process(id_=process_json["@id"])
+        protocols.refer(process_json["executesProtocol"]["@id"], process, 'executes_protocol')
+        try:
+            process.comments = get_comments(process_json)
+        except KeyError:
+            pass
+        try:
+            prev_proc = process_json["previousProcess"]["@id"]
+            processes.refer(prev_proc, process, 'prev_process', required=False)
+        except KeyError:
+            pass
+        try:
+            next_proc = process_json["nextProcess"]["@id"]
+            processes.refer(next_proc, process, 'next_process', required=False)
+        except KeyError:
+            pass
+        processes.declare(process.id, process)
+        return process
+
+    def get_parameter_value(parameter_value_json):
+        parameter_value = ParameterValue()
+        parameters.refer(parameter_value_json["category"]["@id"], parameter_value, 'category')
+        if isinstance(parameter_value_json["value"], int) or isinstance(parameter_value_json["value"], float):
+            parameter_value.value = parameter_value_json["value"]
+            if "unit" in parameter_value_json.keys():
+                units.refer(parameter_value_json["unit"]["@id"], parameter_value, 'unit')
+        elif isinstance(parameter_value_json["value"], dict):
+            parameter_value.value = get_value_annotation(
+                parameter_value_json["value"]["annotationValue"],
+                parameter_value_json["value"]["termSource"],
+                parameter_value_json["value"]["termAccession"])
+        else:
+            parameter_value.value = parameter_value_json["value"]
+        return parameter_value
+
+    def get_study_process(study_process_json, processes):
+        process = get_process(study_process_json, processes)
+        try:
+            process.date = study_process_json["date"]
+        except KeyError:
+            pass
+        try:
+            process.performer = study_process_json["performer"]
+        except KeyError:
+            pass
+        for parameter_value_json in study_process_json["parameterValues"]:
+            process.parameter_values.append(get_parameter_value(parameter_value_json))
+        for input_json in study_process_json["inputs"]:
+            materials.append(input_json["@id"], process.inputs)
+        for output_json in study_process_json["outputs"]:
+            materials.append(output_json["@id"], process.outputs)
+        return process
+
+    def get_data_file(data_json):
+        data_file = DataFile(
+            id_=data_json["@id"],
+            filename=data_json["name"],
+            label=data_json["type"],
         )
         try:
-            study.comments = get_comments(study_json)
+            data_file.comments = get_comments(data_json)
         except KeyError:
             pass
-        for study_characteristics_category_json in study_json["characteristicCategories"]:
-            characteristic_category = OntologyAnnotation(
-                id_=study_characteristics_category_json["@id"],
-                term=study_characteristics_category_json["characteristicType"]["annotationValue"],
-                term_source=term_source_dict[study_characteristics_category_json["characteristicType"]["termSource"]],
-                term_accession=study_characteristics_category_json["characteristicType"]["termAccession"],
-            )
-            study.characteristic_categories.append(characteristic_category)
-            categories_dict[characteristic_category.id] = characteristic_category
-        for study_unit_json in study_json["unitCategories"]:
-            unit = OntologyAnnotation(id_=study_unit_json["@id"],
-                                      term=study_unit_json["annotationValue"],
-                                      term_source=term_source_dict[study_unit_json["termSource"]],
-                                      term_accession=study_unit_json["termAccession"])
-            units_dict[unit.id] = unit
-            study.units.append(unit)
-        for study_publication_json in study_json["publications"]:
-            study_publication = Publication(
-                pubmed_id=study_publication_json["pubMedID"],
-                doi=study_publication_json["doi"],
-                author_list=study_publication_json["authorList"],
-                title=study_publication_json["title"],
-                status=OntologyAnnotation(
-                    term=study_publication_json["status"]["annotationValue"],
-                    term_source=term_source_dict[study_publication_json["status"]["termSource"]],
-                    term_accession=study_publication_json["status"]["termAccession"],
+        data_file.derives_from = None
+        try:
+            materials.refer(data_json["derivesFrom"][0]["@id"], data_file, 'derives_from', required=False)
+        except KeyError:
+            pass
+        return data_file
+
+    def get_other_material(other_material_json):
+        material_name = other_material_json["name"]
+        if material_name.startswith("labeledextract-"):
+            material_name = material_name[15:]
+        else:
+            material_name = material_name[8:]
+        material = Material(
+            id_=other_material_json["@id"],
+            name=material_name,
+            type_=other_material_json["type"],
+        )
+        for characteristic_json in other_material_json["characteristics"]:
+            characteristic = Characteristic(
+                value=get_value_annotation(
+                    characteristic_json["value"]["annotationValue"],
+                    characteristic_json["value"]["termSource"],
+                    characteristic_json["value"]["termAccession"],
                 )
             )
-            try:
-                study_publication.comments = get_comments(study_publication_json)
-            except KeyError:
-                pass
-            study.publications.append(study_publication)
+            categories.refer(characteristic_json["category"]["@id"], characteristic, 'category')
+            material.characteristics.append(characteristic)
+        return material
+
+    def get_assay_process(assay_process_json, assay, processes, assay_materials):
+        process = get_process(assay_process_json, processes)
+        if "name" in assay_process_json.keys():  # set once protocols and technology types are all read
+            named_assay_processes.append((process, assay_process_json["name"], assay))
+        for input_json in assay_process_json["inputs"]:
+            assay_materials.append(input_json["@id"], process.inputs)
+        for output_json in assay_process_json["outputs"]:
+            assay_materials.append(output_json["@id"], process.outputs)
+        for parameter_value_json in assay_process_json["parameterValues"]:
+            if "category" in parameter_value_json.keys():
+                if parameter_value_json["category"]["@id"] == "#parameter/Array_Design_REF":  # Special case
+                    process.array_design_ref = parameter_value_json["value"]
+                else:
+                    process.parameter_values.append(get_parameter_value(parameter_value_json))
+            else:
+                print("warning: parameter category not found for instance {}".format(parameter_value_json))
+        return process
+
+    def read_assay(study_assay_categories):
+        assay = Assay()
+        assay_json = dict()
+        processes = _References('process')
+        assay_materials = _References('material or data file', parent=materials)
+        for key in reader.iter_object():
+            if key == "unitCategories":
+                for assay_unit_json in reader.read_value():
+                    assay.units.append(get_unit_category(assay_unit_json))
+            elif key == "characteristicCategories":
+                for assay_characteristics_category_json in reader.read_value():
+                    study_assay_categories.append(get_characteristic_category(assay_characteristics_category_json))
+            elif key == "dataFiles":
+                for _ in reader.iter_array():
+                    data_file = get_data_file(reader.read_value())
+                    assay_materials.declare(data_file.id, data_file)
+                    assay.data_files.append(data_file)
+            elif key == "materials":
+                for materials_key in reader.iter_object():
+                    if materials_key == "samples":
+                        for sample_json in reader.read_value():
+                            materials.append(sample_json["@id"], assay.materials["samples"])
+                    elif materials_key == "otherMaterials":
+                        for _ in reader.iter_array():
+                            material = get_other_material(reader.read_value())
+                            assay_materials.declare(material.id, material)
+                            assay.materials["other_material"].append(material)
+                    else:
+                        reader.read_value()
+            elif key == "processSequence":
+                for _ in reader.iter_array():
+                    assay.process_sequence.append(get_assay_process(reader.read_value(), assay, processes,
+                                                                    assay_materials))
+            else:
+                assay_json[key] = reader.read_value()
+        assay.measurement_type = get_annotation(
+            assay_json["measurementType"]["annotationValue"],
+            assay_json["measurementType"]["termSource"],
+            assay_json["measurementType"]["termAccession"]
+        )
+        assay.technology_type = get_annotation(
+            assay_json["technologyType"]["annotationValue"],
+            assay_json["technologyType"]["termSource"],
+            assay_json["technologyType"]["termAccession"]
+        )
+        assay.technology_platform = assay_json["technologyPlatform"]
+        assay.filename = assay_json["filename"]
+        processes.check()
+        assay_materials.close()
+        return assay
+
+    def read_study():
+        study = Study()
+        study_json = dict()
+        study_assay_categories = list()
+        for key in reader.iter_object():
+            if key == "characteristicCategories":
+                for study_characteristics_category_json in reader.read_value():
+                    study.characteristic_categories.append(
+                        get_characteristic_category(study_characteristics_category_json))
+            elif key == "unitCategories":
+                for study_unit_json in reader.read_value():
+                    study.units.append(get_unit_category(study_unit_json))
+            elif key == "protocols":
+                for protocol_json in reader.read_value():
+                    study.protocols.append(get_protocol(protocol_json))
+            elif key == "factors":
+                for factor_json in reader.read_value():
+                    study.factors.append(get_factor(factor_json))
+            elif key == "materials":
+                for materials_key in reader.iter_object():
+                    if materials_key == "sources":
+                        for _ in reader.iter_array():
+                            study.materials["sources"].append(get_source(reader.read_value()))
+                    elif materials_key == "samples":
+                        for _ in reader.iter_array():
+                            study.materials["samples"].append(get_sample(reader.read_value()))
+                    else:
+                        reader.read_value()
+            elif key == "processSequence":
+                processes = _References('process')
+                for _ in reader.iter_array():
+                    study.process_sequence.append(get_study_process(reader.read_value(), processes))
+                processes.check()
+            elif key == "assays":
+                for _ in reader.iter_array():
+                    study.assays.append(read_assay(study_assay_categories))
+            else:
+                study_json[key] = reader.read_value()
+        study.identifier = study_json["identifier"]
+        study.title = study_json["title"]
+        study.description = study_json["description"]
+        study.submission_date = study_json["submissionDate"]
+        study.public_release_date = study_json["publicReleaseDate"]
+        study.filename = study_json["filename"]
+        try:
+            study.comments = get_comments(study_json)
+        except KeyError:
+            pass
+        for study_publication_json in study_json["publications"]:
+            study.publications.append(get_publication(study_publication_json))
         for study_person_json in study_json["people"]:
             study_person = Person(
                 last_name=study_person_json["lastName"],
@@ -192,410 +654,208 @@ def load(fp):
                 pass
             study.contacts.append(study_person)
         for design_descriptor_json in study_json["studyDesignDescriptors"]:
-            design_descriptor = OntologyAnnotation(
-                term=design_descriptor_json["annotationValue"],
-                term_accession=design_descriptor_json["termAccession"],
-                term_source=term_source_dict[design_descriptor_json["termSource"]]
+            design_descriptor = get_annotation(
+                design_descriptor_json["annotationValue"],
+                design_descriptor_json["termSource"],
+                design_descriptor_json["termAccession"]
             )
             study.design_descriptors.append(design_descriptor)
-        for protocol_json in study_json["protocols"]:
-            protocol = Protocol(
-                id_=protocol_json["@id"],
-                name=protocol_json["name"],
-                uri=protocol_json["uri"],
-                description=protocol_json["description"],
-                version=protocol_json["version"],
-                protocol_type=OntologyAnnotation(
-                    term=protocol_json["protocolType"]["annotationValue"],
-                    term_accession=protocol_json["protocolType"]["termAccession"] if "termAccession" in protocol_json["protocolType"].keys() else "",
-                    term_source=term_source_dict[protocol_json["protocolType"]["termSource"]] if "termSource" in protocol_json["protocolType"].keys() else None,
-                )
-            )
-            for parameter_json in protocol_json["parameters"]:
-                parameter = ProtocolParameter(
-                    id_=parameter_json["@id"],
-                    parameter_name=OntologyAnnotation(
-                        term=parameter_json["parameterName"]["annotationValue"],
-                        term_source=term_source_dict[parameter_json["parameterName"]["termSource"]],
-                        term_accession=parameter_json["parameterName"]["termAccession"]
-                    )
-                )
-                protocol.parameters.append(parameter)
-                parameters_dict[parameter.id] = parameter
-            for component_json in protocol_json["components"]:
-                component = ProtocolComponent(
-                    name=component_json["componentName"],
-                    component_type=OntologyAnnotation(
-                        term=component_json["componentType"]["annotationValue"],
-                        term_source=term_source_dict[component_json["componentType"]["termSource"]],
-                        term_accession=component_json["componentType"]["termAccession"]
-                    )
-                )
-                protocol.components.append(component)
-            study.protocols.append(protocol)
-            protocols_dict[protocol.id] = protocol
-        for factor_json in study_json["factors"]:
-            factor = StudyFactor(
-                id_=factor_json["@id"],
-                name=factor_json["factorName"],
-                factor_type=OntologyAnnotation(
-                    term=factor_json["factorType"]["annotationValue"],
-                    term_accession=factor_json["factorType"]["termAccession"],
-                    term_source=term_source_dict[factor_json["factorType"]["termSource"]]
+        study.characteristic_categories.extend(study_assay_categories)
+        return study
+
+    term_sources = _References('term source')
+    term_sources.declare("", None)
+    materials = _References('source or sample')
+    categories = _References('characteristic category')
+    units = _References('unit category')
+    protocols = _References('protocol')
+    parameters = _References('protocol parameter')
+    factors = _References('study factor')
+    value_annotations = dict()
+    named_assay_processes = list()
+
+    reader = _JSONReader(fp)
+    investigation = Investigation()
+    investigation_json = dict()
+    for key in reader.iter_object():
+        if key == "ontologySourceReferences":
+            for ontologySourceReference_json in reader.read_value():
+                ontology_source_reference = OntologySource(
+                    name=ontologySourceReference_json["name"],
+                    file=ontologySourceReference_json["file"],
+                    version=ontologySourceReference_json["version"],
+                    description=ontologySourceReference_json["description"]
                 )
-            )
-            study.factors.append(factor)
-            factors_dict[factor.id] = factor
-        for source_json in study_json["materials"]["sources"]:
-            source = Source(
-                id_=source_json["@id"],
-                name=source_json["name"][7:],
-            )
-            for characteristic_json in source_json["characteristics"]:
-                value = characteristic_json["value"]
-                unit = None
-                characteristic = Characteristic(category=categories_dict[characteristic_json["category"]["@id"]])
-                if isinstance(value, dict):
-                    try:
-                        term = characteristic_json["value"]["annotationValue"]
-                        if isinstance(term, (int, float)):
-                            term = str(term)
-                        value = OntologyAnnotation(
-                            term=term,
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"])
-                    except KeyError:
-                        raise IOError("Can't create value as annotation")
-                elif isinstance(value, (int, float)):
-                    try:
-                        unit = units_dict[characteristic_json["unit"]["@id"]]
-                    except KeyError:
-                        unit = None
-                elif not isinstance(value, str):
-                    raise IOError("Unexpected type in characteristic value")
-                characteristic.value = value
-                characteristic.unit = unit
-                source.characteristics.append(characteristic)
-            sources_dict[source.id] = source
-            study.materials["sources"].append(source)
-        for sample_json in study_json["materials"]["samples"]:
-            sample = Sample(
-                id_=sample_json["@id"],
-                name=sample_json["name"][7:]
-            )
-            for characteristic_json in sample_json["characteristics"]:
-                value = characteristic_json["value"]
-                unit = None
-                characteristic = Characteristic(
-                        category=categories_dict[characteristic_json["category"]["@id"]])
-                if isinstance(value, dict):
-                    try:
-                        value = OntologyAnnotation(
-                            term=characteristic_json["value"]["annotationValue"],
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"])
-                    except KeyError:
-                        raise IOError("Can't create value as annotation")
-                elif isinstance(value, int) or isinstance(value, float):
-                    try:
-                        unit = units_dict[characteristic_json["unit"]["@id"]]
-                    except KeyError:
-                        raise IOError("Can't create unit annotation")
-                elif not isinstance(value, str):
-                    raise IOError("Unexpected type in characteristic value")
-                characteristic.value = value
-                characteristic.unit = unit
-                sample.characteristics.append(characteristic)
-            for factor_value_json in sample_json["factorValues"]:
-                try:
-                    factor_value = FactorValue(
-                        factor_name=factors_dict[factor_value_json["category"]["@id"]],
-                        value=OntologyAnnotation(
-                            term=factor_value_json["value"]["annotationValue"],
-                            term_accession=factor_value_json["value"]["termAccession"],
-                            term_source=term_source_dict[factor_value_json["value"]["termSource"]],
-                        ),
-
-                    )
-                except TypeError:
-                    factor_value = FactorValue(
-                        factor_name=factors_dict[factor_value_json["category"]["@id"]],
-                        value=factor_value_json["value"],
-                        unit=units_dict[factor_value_json["unit"]["@id"]],
-                    )
-                sample.factor_values.append(factor_value)
-            samples_dict[sample.id] = sample
-            study.materials["samples"].append(sample)
-            try:
-                for source_id_ref_json in sample_json["derivesFrom"]:
-                    sample.derives_from.append(sources_dict[source_id_ref_json["@id"]])
-            except KeyError:
-                sample.derives_from = []
-        for study_process_json in study_json["processSequence"]:
-            process = Process(
-                id_=study_process_json["@id"],
-                executes_protocol=protocols_dict[study_process_json["executesProtocol"]["@id"]],
-            )
-            try:
-                process.comments = get_comments(study_process_json)
-            except KeyError:
-                pass
-            try:
-                process.date = study_process_json["date"]
-            except KeyError:
-                pass
-            try:
-                process.performer = study_process_json["performer"]
-            except KeyError:
-                pass
-            for parameter_value_json in study_process_json["parameterValues"]:
-                if isinstance(parameter_value_json["value"], int) or isinstance(parameter_value_json["value"], float):
-                    parameter_value = ParameterValue(
-                        category=parameters_dict[parameter_value_json["category"]["@id"]],
-                        value=parameter_value_json["value"],
-                        unit=units_dict[parameter_value_json["unit"]["@id"]],
-                    )
-                    process.parameter_values.append(parameter_value)
-                else:
-                    parameter_value = ParameterValue(
-                        category=parameters_dict[parameter_value_json["category"]["@id"]],
-                        )
-                    try:
-                        parameter_value.value = OntologyAnnotation(
-                            term=parameter_value_json["value"]["annotationValue"],
-                            term_accession=parameter_value_json["value"]["termAccession"],
-                            term_source=term_source_dict[parameter_value_json["value"]["termSource"]],)
-                    except TypeError:
-                        parameter_value.value = parameter_value_json["value"]
-                    process.parameter_values.append(parameter_value)
-            for input_json in study_process_json["inputs"]:
-                input_ = None
-                try:
-                    input_ = sources_dict[input_json["@id"]]
-                except KeyError:
-                    pass
-                finally:
-                    try:
-                        input_ = samples_dict[input_json["@id"]]
-                    except KeyError:
-                        pass
-                if input_ is None:
-                    raise IOError("Could not find input node in sources or samples dicts: " + input_json["@id"])
-                process.inputs.append(input_)
-            for output_json in study_process_json["outputs"]:
-                output = None
-                try:
-                    output = sources_dict[output_json["@id"]]
-                except KeyError:
-                    pass
-                finally:
-                    try:
-                        output = samples_dict[output_json["@id"]]
-                    except KeyError:
-                        pass
-                if output is None:
-                    raise IOError("Could not find output node in sources or samples dicts: " + output_json["@id"])
-                process.outputs.append(output)
-            study.process_sequence.append(process)
-            process_dict[process.id] = process
-        for study_process_json in study_json["processSequence"]:  # 2nd pass
-            try:
-                prev_proc = study_process_json["previousProcess"]["@id"]
-                process_dict[study_process_json["@id"]].prev_process = process_dict[prev_proc]
-            except KeyError:
-                pass
+                term_sources.declare(ontology_source_reference.name, ontology_source_reference)
+                investigation.ontology_source_references.append(ontology_source_reference)
+        elif key == "studies":
+            for _ in reader.iter_array():
+                investigation.studies.append(read_study())
+        else:
+            investigation_json[key] = reader.read_value()
+    reader.read_end()
+    investigation.identifier = investigation_json["identifier"]
+    investigation.title = investigation_json["title"]
+    investigation.description = investigation_json["description"]
+    investigation.submission_date = investigation_json["submissionDate"]
+    investigation.public_release_date = investigation_json["publicReleaseDate"]
+    investigation.comments = get_comments(investigation_json)
+    for publication_json in investigation_json["publications"]:
+        investigation.publications.append(get_publication(publication_json))
+    for person_json in investigation_json["people"]:
+        person = Person(
+            last_name=person_json["lastName"],
+            first_name=person_json["firstName"],
+            mid_initials=person_json["midInitials"],
+            email=person_json["email"],
+            phone=person_json["phone"],
+            fax=person_json["fax"],
+            address=person_json["address"],
+            affiliation=person_json["affiliation"],
+            roles=[]
+        )
+        for role_json in person_json["roles"]:
+            role = get_annotation(role_json["annotationValue"], role_json["termSource"], role_json["termAccession"])
+            person.roles.append(role)
+        person.comments = get_comments(person_json)
+        investigation.contacts.append(person)
+    for references in (term_sources, materials, categories, units, protocols, parameters, factors):
+        references.check()
+
+    # additional properties, currently hard-coded special cases
+    for process, name, assay in named_assay_processes:
+        if process.executes_protocol.protocol_type.term == "data collection" and assay.technology_type.term == "DNA microarray":
+            process.name = name
+        elif process.executes_protocol.protocol_type.term == "nucleic acid sequencing":
+            process.name = name
+        elif process.executes_protocol.protocol_type.term == "nucleic acid hybridization":
+            process.name = name
+        elif process.executes_protocol.protocol_type.term == "data transformation":
+            process.name = name
+        elif process.executes_protocol.protocol_type.term == "data normalization":
+            process.name = name
+    return investigation
 
+
+"""Everything below here is for the validator"""
+
+
+class StudyIdIndex(object):
+    """The @ids declared and used in a study and its assays, collected in one pass for the rules on references
+    between them (1002-1005, 1007-1009 and 1013-1022)
+
+    Ids of each kind are kept in document order, along with a set of them for the rules comparing what is declared with
+    what is used. If a part of the study holding ids of some kind is missing a key, the error is kept and raised again
+    when ids of that kind are asked for, so that a rule fails as it would collecting the ids itself.
+    """
+    kinds = ('source_ids', 'sample_ids', 'material_ids', 'data_file_ids', 'io_ids',
+             'protocol_ids', 'protocol_ids_used', 'parameter_ids', 'parameter_ids_used',
+             'factor_ids', 'factor_ids_used', 'characteristic_category_ids', 'characteristic_category_ids_used',
+             'unit_ids', 'unit_ids_used')
+
+    def __init__(self, study_json):
+        self.__ids = dict((kind, list()) for kind in self.kinds)
+        self.__id_sets = dict()
+        self.__errors = dict()
+        part = self.__part
+        extend = self.__extend
+        for material in part(study_json, ("materials", "sources"),
+                             ('source_ids', 'characteristic_category_ids_used', 'unit_ids_used')):
+            extend('source_ids', lambda: [material["@id"]])
+            self.__add_characteristics(material)
+        for material in part(study_json, ("materials", "samples"),
+                             ('sample_ids', 'characteristic_category_ids_used', 'unit_ids_used', 'factor_ids_used')):
+            extend('sample_ids', lambda: [material["@id"]])
+            self.__add_characteristics(material)
+            extend('factor_ids_used', lambda: [factor_value["category"]["@id"]
+                                               for factor_value in material["factorValues"]])
+            extend('unit_ids_used', lambda: [factor_value["unit"]["@id"] for factor_value in material["factorValues"]
+                                             if "unit" in factor_value.keys()])
+        for protocol in part(study_json, ("protocols",), ('protocol_ids', 'parameter_ids')):
+            extend('protocol_ids', lambda: [protocol["@id"]])
+            extend('parameter_ids', lambda: [parameter["@id"] for parameter in protocol["parameters"]])
+        extend('factor_ids', lambda: [factor["@id"] for factor in study_json["factors"]])
+        self.__add_categories(study_json)
+        self.__add_process_sequence(study_json)
+        for assay_json in part(study_json, ("assays",),
+                               ('material_ids', 'data_file_ids', 'io_ids', 'protocol_ids_used', 'parameter_ids_used',
+                                'characteristic_category_ids', 'characteristic_category_ids_used', 'unit_ids',
+                                'unit_ids_used')):
+            for material in part(assay_json, ("materials", "otherMaterials"),
+                                 ('material_ids', 'characteristic_category_ids_used', 'unit_ids_used')):
+                extend('material_ids', lambda: [material["@id"]])
+                if "characteristics" in material.keys():
+                    self.__add_characteristics(material)
+            for material in part(assay_json, ("materials", "samples"), ('characteristic_category_ids_used',)):
+                if "characteristics" in material.keys():
+                    extend('characteristic_category_ids_used', lambda: [characteristic["category"]["@id"]
+                                                                        for characteristic in material["characteristics"]])
+            extend('data_file_ids', lambda: [data_file["@id"] for data_file in assay_json["dataFiles"]])
+            self.__add_categories(assay_json)
+            self.__add_process_sequence(assay_json)
+
+    def __part(self, json_, keys, kinds):
+        """Gets a part of the study, or else keeps the error for the kinds of ids in it and gets nothing"""
+        try:
+            for key in keys:
+                json_ = json_[key]
+            return list(json_)
+        except (KeyError, TypeError) as e:
+            for kind in kinds:
+                self.__errors.setdefault(kind, e)
+            return list()
+
+    def __extend(self, kind, get_ids):
+        try:
+            self.__ids[kind].extend(get_ids())
+        except (KeyError, TypeError) as e:
+            self.__errors.setdefault(kind, e)
+
+    def __add_characteristics(self, material):
+        self.__extend('characteristic_category_ids_used', lambda: [characteristic["category"]["@id"]
+                                                                   for characteristic in material["characteristics"]])
+        self.__extend('unit_ids_used', lambda: [characteristic["unit"]["@id"]
+                                                for characteristic in material["characteristics"]
+                                                if "unit" in characteristic.keys()])
+
+    def __add_categories(self, study_or_assay_json):
+        self.__extend('characteristic_category_ids', lambda: [category["@id"] for category in
+                                                              study_or_assay_json["characteristicCategories"]])
+        self.__extend('unit_ids', lambda: [category["@id"] for category in study_or_assay_json["unitCategories"]])
+
+    def __add_process_sequence(self, study_or_assay_json):
+        for process in self.__part(study_or_assay_json, ("processSequence",),
+                                   ('io_ids', 'protocol_ids_used', 'parameter_ids_used', 'unit_ids_used')):
+            self.__extend('io_ids', lambda: [i["@id"] for i in process["inputs"]] +
+                                            [o["@id"] for o in process["outputs"]])
             try:
-                next_proc = study_process_json["nextProcess"]["@id"]
-                process_dict[study_process_json["@id"]].next_process = process_dict[next_proc]
+                self.__ids['protocol_ids_used'].append(process["executesProtocol"]["@id"])
             except KeyError:
                 pass
+            self.__extend('parameter_ids_used', lambda: [parameter_value["category"]["@id"]
+                                                         for parameter_value in process["parameterValues"]])
+            self.__extend('unit_ids_used', lambda: [parameter_value["unit"]["@id"]
+                                                    for parameter_value in process["parameterValues"]
+                                                    if "unit" in parameter_value.keys()])
+
+    def ids(self, kind):
+        """Gets the ids of a kind, such as 'sample_ids' or 'unit_ids_used', in document order
+
+        :param kind: One of StudyIdIndex.kinds
+        :return: list of ids
+        :raises KeyError: or TypeError, if a part of the study holding ids of that kind is malformed
+        """
+        if kind in self.__errors:
+            raise self.__errors[kind]
+        return self.__ids[kind]
 
-        for assay_json in study_json["assays"]:
-            process_dict = dict()
-            assay = Assay(
-                measurement_type=OntologyAnnotation(
-                    term=assay_json["measurementType"]["annotationValue"],
-                    term_accession=assay_json["measurementType"]["termAccession"],
-                    term_source=term_source_dict[assay_json["measurementType"]["termSource"]]
-                ),
-                technology_type=OntologyAnnotation(
-                    term=assay_json["technologyType"]["annotationValue"],
-                    term_accession=assay_json["technologyType"]["termAccession"],
-                    term_source=term_source_dict[assay_json["technologyType"]["termSource"]]
-                ),
-                technology_platform=assay_json["technologyPlatform"],
-                filename=assay_json["filename"]
-            )
-            for assay_unit_json in assay_json["unitCategories"]:
-                unit = OntologyAnnotation(id_=assay_unit_json["@id"],
-                                          term=assay_unit_json["annotationValue"],
-                                          term_source=term_source_dict[assay_unit_json["termSource"]],
-                                          term_accession=assay_unit_json["termAccession"])
-                units_dict[unit.id] = unit
-                assay.units.append(unit)
-            data_dict = dict()
-            for data_json in assay_json["dataFiles"]:
-                data_file = DataFile(
-                    id_=data_json["@id"],
-                    filename=data_json["name"],
-                    label=data_json["type"],
-                )
-                try:
-                    data_file.comments = get_comments(data_json)
-                except KeyError:
-                    pass
-                data_dict[data_file.id] = data_file
-                try:
-                    data_file.derives_from = samples_dict[data_json["derivesFrom"][0]["@id"]]
-                except KeyError:
-                    data_file.derives_from = None
-                assay.data_files.append(data_file)
-            for sample_json in assay_json["materials"]["samples"]:
-                sample = samples_dict[sample_json["@id"]]
-                assay.materials["samples"].append(sample)
-            for assay_characteristics_category_json in assay_json["characteristicCategories"]:
-                characteristic_category =OntologyAnnotation(
-                    id_=assay_characteristics_category_json["@id"],
-                    term=assay_characteristics_category_json["characteristicType"]["annotationValue"],
-                    term_source=term_source_dict[assay_characteristics_category_json["characteristicType"]["termSource"]],
-                    term_accession=assay_characteristics_category_json["characteristicType"]["termAccession"],
-                )
-                study.characteristic_categories.append(characteristic_category)
-                categories_dict[characteristic_category.id] = characteristic_category
-            other_materials_dict = dict()
-            for other_material_json in assay_json["materials"]["otherMaterials"]:
-                material_name = other_material_json["name"]
-                if material_name.startswith("labeledextract-"):
-                    material_name = material_name[15:]
-                else:
-                    material_name = material_name[8:]
-                material = Material(
-                    id_=other_material_json["@id"],
-                    name=material_name,
-                    type_=other_material_json["type"],
-                )
-                for characteristic_json in other_material_json["characteristics"]:
-                    characteristic = Characteristic(
-                        category=categories_dict[characteristic_json["category"]["@id"]],
-                        value=OntologyAnnotation(
-                            term=characteristic_json["value"]["annotationValue"],
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"],
-                        )
-                    )
-                    material.characteristics.append(characteristic)
-                assay.materials["other_material"].append(material)
-                other_materials_dict[material.id] = material
-            for assay_process_json in assay_json["processSequence"]:
-                process = Process(
-                    id_=assay_process_json["@id"],
-                    executes_protocol=protocols_dict[assay_process_json["executesProtocol"]["@id"]]
-                )
-                try:
-                    process.comments = get_comments(assay_process_json)
-                except KeyError:
-                    pass
-                # additional properties, currently hard-coded special cases
-                if process.executes_protocol.protocol_type.term == "data collection" and assay.technology_type.term == "DNA microarray":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "nucleic acid sequencing":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "nucleic acid hybridization":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "data transformation":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "data normalization":
-                    process.name = assay_process_json["name"]
-                for input_json in assay_process_json["inputs"]:
-                    input_ = None
-                    try:
-                        input_ = samples_dict[input_json["@id"]]
-                    except KeyError:
-                        pass
-                    finally:
-                        try:
-                            input_ = other_materials_dict[input_json["@id"]]
-                        except KeyError:
-                            pass
-                        finally:
-                            try:
-                                input_ = data_dict[input_json["@id"]]
-                            except KeyError:
-                                pass
-                    if input_ is None:
-                        raise IOError("Could not find input node in samples or materials or data dicts: " +
-                                      input_json["@id"])
-                    process.inputs.append(input_)
-                for output_json in assay_process_json["outputs"]:
-                    output = None
-                    try:
-                        output = samples_dict[output_json["@id"]]
-                    except KeyError:
-                        pass
-                    finally:
-                        try:
-                            output = other_materials_dict[output_json["@id"]]
-                        except KeyError:
-                            pass
-                        finally:
-                                try:
-                                    output = data_dict[output_json["@id"]]
-                                except KeyError:
-                                    pass
-                    if output is None:
-                        raise IOError("Could not find output node in samples or materials or data dicts: " +
-                                      output_json["@id"])
-                    process.outputs.append(output)
-                for parameter_value_json in assay_process_json["parameterValues"]:
-                    if "category" in parameter_value_json.keys():
-                        if parameter_value_json["category"]["@id"] == "#parameter/Array_Design_REF":  # Special case
-                            process.array_design_ref = parameter_value_json["value"]
-                        elif isinstance(parameter_value_json["value"], int) or \
-                                isinstance(parameter_value_json["value"], float):
-                            parameter_value = ParameterValue(
-                                category=parameters_dict[parameter_value_json["category"]["@id"]],
-                                value=parameter_value_json["value"],
-                            )
-                            if "unit" in parameter_value_json.keys():
-                                parameter_value.unit = units_dict[parameter_value_json["unit"]["@id"]]
-                            process.parameter_values.append(parameter_value)
-                        else:
-                            parameter_value = ParameterValue(
-                                category=parameters_dict[parameter_value_json["category"]["@id"]],
-                                )
-                            try:
-                                parameter_value.value = OntologyAnnotation(
-                                    term=parameter_value_json["value"]["annotationValue"],
-                                    term_accession=parameter_value_json["value"]["termAccession"],
-                                    term_source=term_source_dict[parameter_value_json["value"]["termSource"]],)
-                            except TypeError:
-                                parameter_value.value = parameter_value_json["value"]
-                            process.parameter_values.append(parameter_value)
-                    else:
-                        print("warning: parameter category not found for instance {}".format(parameter_json))
-                assay.process_sequence.append(process)
-                process_dict[process.id] = process
-
-                for assay_process_json in assay_json["processSequence"]:  # 2nd pass
-                    try:
-                        prev_proc = assay_process_json["previousProcess"]["@id"]
-                        process_dict[assay_process_json["@id"]].prev_process = process_dict[prev_proc]
-                    except KeyError:
-                        pass
-
-                    try:
-                        next_proc = assay_process_json["nextProcess"]["@id"]
-                        process_dict[assay_process_json["@id"]].next_process = process_dict[next_proc]
-                    except KeyError:
-                        pass
-
-            study.assays.append(assay)
-        investigation.studies.append(study)
-    return investigation
-
-
-"""Everything below here is for the validator"""
+    def id_set(self, kind):
+        """Gets the ids of a kind as a set, made once"""
+        try:
+            return self.__id_sets[kind]
+        except KeyError:
+            self.__id_sets[kind] = set(self.ids(kind))
+            return self.__id_sets[kind]
 
 
 def get_source_ids(study_json):
@@ -633,11 +893,24 @@ def get_io_ids_in_process_sequence(study_json):
                                  all_process_sequences] for elem in iterabl]
 
 
-def check_material_ids_declared_used(study_json, id_collector_func):
+_ID_COLLECTOR_KINDS = {
+    get_source_ids: 'source_ids',
+    get_sample_ids: 'sample_ids',
+    get_material_ids: 'material_ids',
+    get_data_file_ids: 'data_file_ids'
+}
+
+
+def check_material_ids_declared_used(study_json, id_collector_func, id_index=None):
     """Used for rules 1015-1018"""
-    node_ids = id_collector_func(study_json)
-    io_ids_in_process_sequence = get_io_ids_in_process_sequence(study_json)
-    is_node_ids_used = set(node_ids).issubset(set(io_ids_in_process_sequence))
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
+    if id_collector_func in _ID_COLLECTOR_KINDS:
+        node_ids = id_index.ids(_ID_COLLECTOR_KINDS[id_collector_func])
+    else:
+        node_ids = id_collector_func(study_json)
+    io_ids_in_process_sequence = id_index.ids('io_ids')
+    is_node_ids_used = set(node_ids).issubset(id_index.id_set('io_ids'))
     if not is_node_ids_used:
         warnings.append({
             "message": "Material declared but not used",
@@ -648,13 +921,15 @@ def check_material_ids_declared_used(study_json, id_collector_func):
                                                                                      io_ids_in_process_sequence))
 
 
-def check_material_ids_not_declared_used(study_json):
+def check_material_ids_not_declared_used(study_json, id_index=None):
     """Used for rules 1002-1005"""
-    node_ids = get_source_ids(study_json) + get_sample_ids(study_json) + get_material_ids(study_json) + \
-               get_data_file_ids(study_json)
-    io_ids_in_process_sequence = get_io_ids_in_process_sequence(study_json)
-    if len(set(io_ids_in_process_sequence)) - len(set(node_ids)) > 0:
-        diff = set(io_ids_in_process_sequence) - set(node_ids)
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
+    node_ids = set(id_index.ids('source_ids') + id_index.ids('sample_ids') + id_index.ids('material_ids') +
+                   id_index.ids('data_file_ids'))
+    io_ids_in_process_sequence = id_index.id_set('io_ids')
+    if len(io_ids_in_process_sequence) - len(node_ids) > 0:
+        diff = io_ids_in_process_sequence - node_ids
         errors.append({
             "message": "Missing Material",
             "supplemental": "Inputs/outputs in {}  not found in sources, samples, materials or datafiles "
@@ -667,7 +942,7 @@ def check_material_ids_not_declared_used(study_json):
 
 def check_process_sequence_links(process_sequence_json):
     """Used for rule 1006"""
-    process_ids = [process["@id"] for process in process_sequence_json]
+    process_ids = set([process["@id"] for process in process_sequence_json])
     for process in process_sequence_json:
         try:
             if process["previousProcess"]["@id"] not in process_ids:
@@ -700,25 +975,14 @@ def get_study_protocol_ids(study_json):
     return [protocol["@id"] for protocol in study_json["protocols"]]
 
 
-def check_process_protocol_ids_usage(study_json):
+def check_process_protocol_ids_usage(study_json, id_index=None):
     """Used for rules 1007 and 1019"""
-    protocol_ids_declared = get_study_protocol_ids(study_json)
-    process_sequence = study_json["processSequence"]
-    protocol_ids_used = list()
-    for process in process_sequence:
-        try:
-            protocol_ids_used.append(process["executesProtocol"]["@id"])
-        except KeyError:
-            pass
-    for assay in study_json["assays"]:
-        process_sequence = assay["processSequence"]
-        for process in process_sequence:
-            try:
-                protocol_ids_used.append(process["executesProtocol"]["@id"])
-            except KeyError:
-                pass
-    if len(set(protocol_ids_used) - set(protocol_ids_declared)) > 0:
-        diff = set(protocol_ids_used) - set(protocol_ids_declared)
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
+    protocol_ids_declared = id_index.id_set('protocol_ids')
+    protocol_ids_used = id_index.id_set('protocol_ids_used')
+    if len(protocol_ids_used - protocol_ids_declared) > 0:
+        diff = protocol_ids_used - protocol_ids_declared
         errors.append({
             "message": "Missing Protocol declaration",
             "supplemental": "protocol IDs {} not declared".format(list(diff)),
@@ -726,8 +990,8 @@ def check_process_protocol_ids_usage(study_json):
         })
         logger.error("(E) There are protocol IDs {} used in a study or assay process sequence not declared".format(
             list(diff)))
-    elif len(set(protocol_ids_declared) - set(protocol_ids_used)) > 0:
-        diff = set(protocol_ids_declared) - set(protocol_ids_used)
+    elif len(protocol_ids_declared - protocol_ids_used) > 0:
+        diff = protocol_ids_declared - protocol_ids_used
         warnings.append({
             "message": "Protocol declared but not used",
             "supplemental": "protocol IDs declared {} not used".format(list(diff)),
@@ -757,12 +1021,14 @@ def get_parameter_value_parameter_ids(study_json):
     return study_pv_parameter_ids
 
 
-def check_protocol_parameter_ids_usage(study_json):
+def check_protocol_parameter_ids_usage(study_json, id_index=None):
     """Used for rule 1009 and 1020"""
-    protocols_declared = get_study_protocols_parameter_ids(study_json) + ["#parameter/Array_Design_REF"] # + special case
-    protocols_used = get_parameter_value_parameter_ids(study_json)
-    if len(set(protocols_used) - set(protocols_declared)) > 0:
-        diff = set(protocols_used) - set(protocols_declared)
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
+    protocols_declared = set(id_index.ids('parameter_ids') + ["#parameter/Array_Design_REF"])  # + special case
+    protocols_used = id_index.id_set('parameter_ids_used')
+    if len(protocols_used - protocols_declared) > 0:
+        diff = protocols_used - protocols_declared
         errors.append({
             "message": "Missing Protocol Parameter declaration",
             "supplemental": "protocol parameters {} used".format(list(diff)),
@@ -770,8 +1036,8 @@ def check_protocol_parameter_ids_usage(study_json):
         })
         logger.error("(E) There are protocol parameters {} used in a study or assay process not declared in any "
                      "protocol".format(list(diff)))
-    elif len(set(protocols_declared) - set(protocols_used)) > 0:
-        diff = set(protocols_declared) - set(protocols_used)
+    elif len(protocols_declared - protocols_used) > 0:
+        diff = protocols_declared - protocols_used
         warnings.append({
             "message": "Protocol parameter declared in a protocol but never used",
             "supplemental": "protocol declared {} are not used".format(list(diff)),
@@ -800,21 +1066,21 @@ def get_characteristic_category_ids_in_assay_materials(assay_json):
               assay_json["materials"]["samples"] + assay_json["materials"]["otherMaterials"]] for elem in iterabl]
 
 
-def check_characteristic_category_ids_usage(studies_json):
-    """Used for rule 1013"""
-    characteristic_categories_declared = list()
-    characteristic_categories_used = list()
-    for study_json in studies_json:
-        characteristic_categories_declared += get_characteristic_category_ids(study_json)
-        for assay in study_json["assays"]:
-            characteristic_categories_declared_in_assay = get_characteristic_category_ids(assay)
-            characteristic_categories_declared += characteristic_categories_declared_in_assay
-        characteristic_categories_used += get_characteristic_category_ids_in_study_materials(study_json)
-        for assay in study_json["assays"]:
-            characteristic_categories_used_in_assay = get_characteristic_category_ids_in_assay_materials(assay)
-            characteristic_categories_used += characteristic_categories_used_in_assay
-    if len(set(characteristic_categories_used) - set(characteristic_categories_declared)) > 0:
-        diff = set(characteristic_categories_used) - set(characteristic_categories_declared)
+def check_characteristic_category_ids_usage(studies_json, id_indexes=None):
+    """Used for rule 1013
+
+    :param studies_json: The studies, as JSON
+    :param id_indexes: StudyIdIndex of each study, in the same order, if already made
+    """
+    if id_indexes is None:
+        id_indexes = [StudyIdIndex(study_json) for study_json in studies_json]
+    characteristic_categories_declared = set()
+    characteristic_categories_used = set()
+    for id_index in id_indexes:
+        characteristic_categories_declared |= id_index.id_set('characteristic_category_ids')
+        characteristic_categories_used |= id_index.id_set('characteristic_category_ids_used')
+    if len(characteristic_categories_used - characteristic_categories_declared) > 0:
+        diff = characteristic_categories_used - characteristic_categories_declared
         errors.append({
                 "message": "Missing Characteristic Category declaration",
                 "supplemental": "Characteristic Categories {} used not declared".format(list(diff)),
@@ -822,8 +1088,8 @@ def check_characteristic_category_ids_usage(studies_json):
             })
         logger.error("(E) There are characteristic categories {} used in a source or sample characteristic that have "
                      "not been not declared".format(list(diff)))
-    elif len(set(characteristic_categories_declared) - set(characteristic_categories_used)) > 0:
-        diff = set(characteristic_categories_declared) - set(characteristic_categories_used)
+    elif len(characteristic_categories_declared - characteristic_categories_used) > 0:
+        diff = characteristic_categories_declared - characteristic_categories_used
         warnings.append({
             "message": "Characteristic Category not used",
             "supplemental": "Characteristic Categories {} declared".format(list(diff)),
@@ -844,12 +1110,14 @@ def get_study_factor_ids_in_sample_factor_values(study_json):
                                  study_json["materials"]["samples"]] for elem in iterabl]
 
 
-def check_study_factor_usage(study_json):
+def check_study_factor_usage(study_json, id_index=None):
     """Used for rules 1008 and 1021"""
-    factors_declared = get_study_factor_ids(study_json)
-    factors_used = get_study_factor_ids_in_sample_factor_values(study_json)
-    if len(set(factors_used) - set(factors_declared)) > 0:
-        diff = set(factors_used) - set(factors_declared)
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
+    factors_declared = id_index.id_set('factor_ids')
+    factors_used = id_index.id_set('factor_ids_used')
+    if len(factors_used - factors_declared) > 0:
+        diff = factors_used - factors_declared
         errors.append({
             "message": "Missing Study Factor declaration",
             "supplemental": "Study Factors {} used".format(list(diff)),
@@ -857,8 +1125,8 @@ def check_study_factor_usage(study_json):
         })
         logger.error("(E) There are study factors {} used in a sample factor value that have not been not declared"
               .format(list(diff)))
-    elif len(set(factors_declared) - set(factors_used)) > 0:
-        diff = set(factors_declared) - set(factors_used)
+    elif len(factors_declared - factors_used) > 0:
+        diff = factors_declared - factors_used
         warnings.append({
             "message": "Study Factor is not used",
             "supplemental": "Study Factors {} are not used".format(list(diff)),
@@ -909,24 +1177,21 @@ def get_assay_unit_category_ids_in_materials_and_processes(assay_json):
     return [x for x in assay_characteristics_units_used + parameter_value_units_used if x is not None]
 
 
-def check_unit_category_ids_usage(study_json):
+def check_unit_category_ids_usage(study_json, id_index=None):
     """Used for rules 1014 and 1022"""
+    if id_index is None:
+        id_index = StudyIdIndex(study_json)
     logger.info("Getting units declared...")
-    units_declared = get_unit_category_ids(study_json)
-    for assay in study_json["assays"]:
-        units_declared.extend(get_unit_category_ids(assay))
-    logger.info("Getting units used (study)...")
-    units_used = get_study_unit_category_ids_in_materials_and_processes(study_json)
-    logger.info("Getting units used (assay)...")
-    for assay in study_json["assays"]:
-        units_used.extend(get_assay_unit_category_ids_in_materials_and_processes(assay))
+    units_declared = id_index.id_set('unit_ids')
+    logger.info("Getting units used...")
+    units_used = id_index.id_set('unit_ids_used')
     logger.info("Comparing units declared vs units used...")
-    if len(set(units_used) - set(units_declared)) > 0:
-        diff = set(units_used) - set(units_declared)
+    if len(units_used - units_declared) > 0:
+        diff = units_used - units_declared
         logger.error("(E) There are units {} used in a material or parameter value that have not been not declared"
               .format(list(diff)))
-    elif len(set(units_declared) - set(units_used)) > 0:
-        diff = set(units_declared) - set(units_used)
+    elif len(units_declared - units_used) > 0:
+        diff = units_declared - units_used
         warnings.append({
             "message": "Unit declared but not used",
             "supplemental": "Units declared {} not used".format(list(diff)),
@@ -952,15 +1217,15 @@ def check_utf8(fp):
             raise SystemError()
 
 
-def check_isa_schemas(isa_json, investigation_schema_path):
-    """Used for rule 0003 and 4003"""
-    try:
-        with open(investigation_schema_path) as fp:
-            investigation_schema = json.load(fp)
-            resolver = RefResolver("file://" + investigation_schema_path, investigation_schema)
-            validator = Draft4Validator(investigation_schema, resolver=resolver)
-            validator.validate(isa_json)
-    except ValidationError as ve:
+def check_isa_schemas(isa_json, investigation_schema_path, max_errors=1):
+    """Used for rule 0003 and 4003
+
+    :param isa_json: The ISA-JSON to validate
+    :param investigation_schema_path: Path to the investigation schema, whose validator is kept by schema_registry
+    :param max_errors: Number of schema errors to report before stopping, or None to report them all
+    """
+    schema_errors = list(schema_registry.iter_errors(isa_json, investigation_schema_path, max_errors=max_errors))
+    for ve in schema_errors:
         errors.append({
             "message": "Invalid JSON against ISA-JSON schemas",
             "supplemental": str(ve),
@@ -968,6 +1233,7 @@ def check_isa_schemas(isa_json, investigation_schema_path):
         })
         logger.fatal("(F) The JSON does not validate against the provided ISA-JSON schemas!")
         logger.fatal("Fatal error: " + str(ve))
+    if schema_errors:
         raise SystemError("(F) The JSON does not validate against the provided ISA-JSON schemas!")
 
 
@@ -1131,6 +1397,48 @@ def get_ontology_source_refs(isa_json):
     return [ontology_source_ref["name"] for ontology_source_ref in isa_json["ontologySourceReferences"]]
 
 
+def is_annotation(json_dict):
+    """Tells if a JSON object is an ontology annotation, having exactly the keys of one, with or without an @id"""
+    return 3 <= len(json_dict) <= 4 and "annotationValue" in json_dict and "termAccession" in json_dict and \
+        "termSource" in json_dict and (len(json_dict) == 3 or "@id" in json_dict)
+
+
+def _iter_children(json_value):
+    if isinstance(json_value, dict):
+        return iter(json_value.items())
+    elif isinstance(json_value, list):
+        return enumerate(json_value)
+    return iter(())
+
+
+def iter_annotations(isa_json):
+    """Used for rules 3007, 3009 and 3010
+
+    Walks the JSON tree for ontology annotations without recursion, so that deeply nested documents do not hit the
+    recursion limit, keeping the objects and lists being walked on a stack.
+
+    :param isa_json: The ISA-JSON, or any part of it
+    :return: iterator over (path, annotation) in document order, where path is a tuple of the keys and list indices
+    leading to the annotation, as in the absolute_path of a jsonschema ValidationError
+    """
+    if isinstance(isa_json, dict) and is_annotation(isa_json):
+        yield (), isa_json
+    path = list()
+    stack = [_iter_children(isa_json)]
+    while stack:
+        for key, value in stack[-1]:
+            if isinstance(value, (dict, list)):
+                path.append(key)
+                if isinstance(value, dict) and is_annotation(value):
+                    yield tuple(path), value
+                stack.append(_iter_children(value))
+                break
+        else:
+            stack.pop()
+            if path:
+                path.pop()
+
+
 def walk_and_get_annotations(isa_json, collector):
     """Used for rules 3007 and 3009
 
@@ -1139,24 +1447,20 @@ def walk_and_get_annotations(isa_json, collector):
       walk_and_get_annotations(isa_json, collector)
       # and then like magic all your annotations from the JSON should be in the collector list
     """
-    #  Walk JSON tree looking for ontology annotation structures in the JSON
-    if isinstance(isa_json, dict):
-        if set(isa_json.keys()) == {"annotationValue", "termAccession", "termSource"} or \
-                        set(isa_json.keys()) == {"@id", "annotationValue", "termAccession", "termSource"}:
-            collector.append(isa_json)
-        for i in isa_json.keys():
-            walk_and_get_annotations(isa_json[i], collector)
-    elif isinstance(isa_json, list):
-        for j in isa_json:
-            walk_and_get_annotations(j, collector)
-
-
-def check_term_source_refs(isa_json):
-    """Used for rules 3007 and 3009"""
+    collector.extend(annotation for path, annotation in iter_annotations(isa_json))
+
+
+def check_term_source_refs(isa_json, annotations=None):
+    """Used for rules 3007 and 3009
+
+    :param isa_json: The ISA-JSON
+    :param annotations: (path, annotation) of each annotation in the ISA-JSON, if already got with iter_annotations
+    """
     term_sources_declared = get_ontology_source_refs(isa_json)
-    collector = list()
-    walk_and_get_annotations(isa_json, collector)
-    term_sources_used = [annotation["termSource"] for annotation in collector if annotation["termSource"] is not ""]
+    if annotations is None:
+        annotations = iter_annotations(isa_json)
+    term_sources_used = [annotation["termSource"] for path, annotation in annotations
+                         if annotation["termSource"] is not ""]
     if len(set(term_sources_used) - set(term_sources_declared)) > 0:
         diff = set(term_sources_used) - set(term_sources_declared)
         errors.append({
@@ -1177,12 +1481,16 @@ def check_term_source_refs(isa_json):
                        .format(list(diff)))
 
 
-def check_term_accession_used_no_source_ref(isa_json):
-    """Used for rule 3010"""
-    collector = list()
-    walk_and_get_annotations(isa_json, collector)
-    terms_using_accession_no_source_ref = [annotation for annotation in collector if annotation["termAccession"]
-                                           is not "" and annotation["termSource"] is ""]
+def check_term_accession_used_no_source_ref(isa_json, annotations=None):
+    """Used for rule 3010
+
+    :param isa_json: The ISA-JSON
+    :param annotations: (path, annotation) of each annotation in the ISA-JSON, if already got with iter_annotations
+    """
+    if annotations is None:
+        annotations = iter_annotations(isa_json)
+    terms_using_accession_no_source_ref = [annotation for path, annotation in annotations if
+                                           annotation["termAccession"] is not "" and annotation["termSource"] is ""]
     if len(terms_using_accession_no_source_ref) > 0:
         warnings.append({
             "message": "Missing Term Source REF in annotation",
@@ -1235,46 +1543,79 @@ def check_measurement_technology_types(assay_json, configs):
 
 def check_study_and_assay_graphs(study_json, configs):
 
+    def get_process_protocol_sequence(process):
+        """Gets the protocol types in the graph of a process, raising KeyError if it cannot be built"""
+        process_graph = list()
+        if "outputs" in process.keys():
+            outputs = process["outputs"]
+            if len(outputs) > 0:
+                for output in outputs:
+                    output_id = output["@id"]
+                    process_graph.append(output_id)
+        protocol_id = protocols_and_types[process["executesProtocol"]["@id"]]
+        process_graph.append(protocol_id)
+        if "inputs" in process.keys():
+            inputs = process["inputs"]
+            if len(inputs) > 0:
+                for input_ in inputs:
+                    input_id = input_["@id"]
+                    process_graph.append(input_id)
+        process_graph.reverse()
+        return [i for i in process_graph if not i.startswith("#")]
+
+    def to_list(linked_list):
+        items = list()
+        while linked_list is not None:
+            item, linked_list = linked_list
+            items.append(item)
+        items.reverse()
+        return items
+
     def check_assay_graph(process_sequence_json, config):
         list_of_last_processes_in_sequence = [i for i in process_sequence_json if "nextProcess" not in i.keys()]
         logger.info("Checking against assay protocol sequence configuration {}".format(config["description"]))
         config_protocol_sequence = [i["protocol"] for i in config["protocols"]]
+        config_protocols = set(config_protocol_sequence)
+        processes = dict()
+        for process in process_sequence_json:
+            if "@id" in process.keys():
+                processes.setdefault(process["@id"], process)  # the first process with an ID is the one linked to
+        # The protocol sequence of the graph ending at a process is that of the graph ending at its previousProcess,
+        # followed by its own, so the sequences are kept for each process walked as linked lists of (protocol, rest),
+        # which the graphs of the processes after it share. Each process is then walked once, however many graphs it
+        # is in. A sequence of interest leaves out protocols not in the configuration, and consecutive same ones.
+        sequences = dict()  # id() of process -> (linked sequence of interest, linked sequence)
+        from isatools.utils import contains
         for process in list_of_last_processes_in_sequence:  # build graphs backwards
-            assay_graph = list()
-            try:
-                while True:
-                    process_graph = list()
-                    if "outputs" in process.keys():
-                        outputs = process["outputs"]
-                        if len(outputs) > 0:
-                            for output in outputs:
-                                output_id = output["@id"]
-                                process_graph.append(output_id)
-                    protocol_id = protocols_and_types[process["executesProtocol"]["@id"]]
-                    process_graph.append(protocol_id)
-                    if "inputs" in process.keys():
-                        inputs = process["inputs"]
-                        if len(inputs) > 0:
-                            for input_ in inputs:
-                                input_id = input_["@id"]
-                                process_graph.append(input_id)
-                    process_graph.reverse()
-                    assay_graph.append(process_graph)
-                    process = [i for i in process_sequence_json if i["@id"] == process["previousProcess"]["@id"]][0]
-            except KeyError:  # this happens when we can"t find a previousProcess
-                pass
-            assay_graph.reverse()
-            assay_protocol_sequence = [[j for j in i if not j.startswith("#")] for i in assay_graph]
-            assay_protocol_sequence = [i for j in assay_protocol_sequence for i in j]  # flatten list
-            assay_protocol_sequence_of_interest = [i for i in assay_protocol_sequence if i in config_protocol_sequence]
-            #  filter out protocols in sequence that are not of interest (additional ones to required by config)
-            squished_assay_protocol_sequence_of_interest = list()
-            prev_prot = None
-            for prot in assay_protocol_sequence_of_interest:  # remove consecutive same protocols
-                if prev_prot != prot:
-                    squished_assay_protocol_sequence_of_interest.append(prot)
-                prev_prot = prot
-            from isatools.utils import contains
+            not_walked = list()
+            not_walked_ids = set()
+            sequence_of_interest, sequence = None, None
+            while True:
+                if id(process) in sequences:
+                    sequence_of_interest, sequence = sequences[id(process)]
+                    break
+                try:
+                    process_protocol_sequence = get_process_protocol_sequence(process)
+                except KeyError:  # the graph stops after a process whose own graph cannot be built
+                    sequences[id(process)] = (None, None)
+                    break
+                not_walked.append((process, process_protocol_sequence))
+                not_walked_ids.add(id(process))
+                try:
+                    process = processes[process["previousProcess"]["@id"]]
+                except KeyError:  # this happens when we can"t find a previousProcess
+                    break
+                if id(process) in not_walked_ids:  # previousProcess links going round in a loop
+                    break
+            for process, process_protocol_sequence in reversed(not_walked):
+                for prot in process_protocol_sequence:
+                    sequence = (prot, sequence)
+                    #  filter out protocols in sequence that are not of interest (additional ones to required by config)
+                    #  and remove consecutive same protocols
+                    if prot in config_protocols and (sequence_of_interest is None or sequence_of_interest[0] != prot):
+                        sequence_of_interest = (prot, sequence_of_interest)
+                sequences[id(process)] = (sequence_of_interest, sequence)
+            squished_assay_protocol_sequence_of_interest = to_list(sequence_of_interest)
             if not contains(squished_assay_protocol_sequence_of_interest, config_protocol_sequence):
                 warnings.append({
                     "message": "Process sequence is not valid against configuration",
@@ -1283,7 +1624,7 @@ def check_study_and_assay_graphs(study_json, configs):
                     "code": 4004
                 })
                 logger.warn("Configuration protocol sequence {} does not match study graph found in {}"
-                            .format(config_protocol_sequence, assay_protocol_sequence))
+                            .format(config_protocol_sequence, to_list(sequence)))
 
     protocols_and_types = dict([(i["@id"], i["protocolType"]["annotationValue"]) for i in study_json["protocols"]])
     # first check study graph
@@ -1302,126 +1643,120 @@ BASE_DIR = os.path.dirname(__file__)
 default_config_dir = os.path.join(BASE_DIR, "config", "json", "default")
 
 
-def validate(fp, config_dir=default_config_dir, log_level=logging.INFO, base_schemas_dir="isa_model_version_1_0_schemas"):
+def validate(fp, config_dir=default_config_dir, log_level=logging.INFO, base_schemas_dir="isa_model_version_1_0_schemas",
+             max_schema_errors=1):
     if config_dir is None:
         config_dir = default_config_dir
-    logger.setLevel(log_level)
-    logger.info("ISA JSON Validator from ISA tools API v0.3")
-    from io import StringIO
-    stream = StringIO()
-    handler = logging.StreamHandler(stream)
-    logger.addHandler(handler)
-    try:
-        global errors
-        errors = list()
-        global warnings
-        warnings = list()
-        logger.info("Checking if encoding is UTF8")
-        check_utf8(fp=fp)  # Rule 0010
-        logger.info("Loading json from " + fp.name)
-        isa_json = json.load(fp=fp)  # Rule 0002
-        logger.info("Validating JSON against schemas using Draft4Validator")
-        check_isa_schemas(isa_json=isa_json,
-                          investigation_schema_path=os.path.join(BASE_DIR, "schemas", base_schemas_dir,
-                                                                 "core", "investigation_schema.json"))  # Rule 0003
-        logger.info("Checking if material IDs used are declared...")
-        for study_json in isa_json["studies"]:
-            check_material_ids_not_declared_used(study_json)  # Rules 1002-1005
-        for study_json in isa_json["studies"]:
-            check_material_ids_declared_used(study_json, get_source_ids)  # Rule 1015
-            check_material_ids_declared_used(study_json, get_sample_ids)  # Rule 1016
-            check_material_ids_declared_used(study_json, get_material_ids)  # Rule 1017
-            check_material_ids_declared_used(study_json, get_data_file_ids)  # Rule 1018
-        logger.info("Checking characteristic categories usage...")
-        check_characteristic_category_ids_usage(isa_json["studies"])  # Rules 1013 and 1022
-        logger.info("Checking study factor usage...")
-        for study_json in isa_json["studies"]:
-            check_study_factor_usage(study_json)  # Rules 1008 and 1021
-        logger.info("Checking protocol parameter usage...")
-        for study_json in isa_json["studies"]:
-            check_protocol_parameter_ids_usage(study_json)  # Rules 1009 and 1020
-        logger.info("Checking unit category usage...")
-        for study_json in isa_json["studies"]:
-            check_unit_category_ids_usage(study_json)  # Rules 1014 and 1022
-        logger.info("Checking process sequences (study)...")
-        for study_json in isa_json["studies"]:
-            check_process_sequence_links(study_json["processSequence"])  # Rule 1006
-            logger.info("Checking process sequences (assay)...")
-            for assay_json in study_json["assays"]:
-                check_process_sequence_links(assay_json["processSequence"])  # Rule 1006
-        logger.info("Checking process protocol usage...")
-        for study_json in isa_json["studies"]:
-            check_process_protocol_ids_usage(study_json)  # Rules 1007 and 1019
-        logger.info("Checking date formats...")
-        check_date_formats(isa_json)  # Rule 3001
-        logger.info("Checking DOI formats...")
-        check_dois(isa_json)  # Rule 3002
-        logger.info("Checking Pubmed ID formats...")
-        check_pubmed_ids_format(isa_json)  # Rule 3003
-        logger.info("Checking filenames are present...")
-        check_filenames_present(isa_json)  # Rule 3005
-        logger.info("Checking protocol names...")
-        check_protocol_names(isa_json)  # Rule 1010
-        logger.info("Checking protocol parameter names...")
-        check_protocol_parameter_names(isa_json)  # Rule 1011
-        logger.info("Checking study factor names...")
-        check_study_factor_names(isa_json)  # Rule 1012
-        logger.info("Checking ontology sources...")
-        check_ontology_sources(isa_json)  # Rule 3008
-        logger.info("Checking term source REFs...")
-        check_term_source_refs(isa_json)  # Rules 3007 and 3009
-        logger.info("Checking missing term source REFs...")
-        check_term_accession_used_no_source_ref(isa_json)  # Rule 3010
-        logger.info("Loading configurations from " + config_dir)
-        configs = load_config(config_dir)  # Rule 4001
-        logger.info("Checking measurement and technology types...")
-        for study_json in isa_json["studies"]:
-            for assay_json in study_json["assays"]:
-                check_measurement_technology_types(assay_json, configs)  # Rule 4002
-        logger.info("Checking against configuration schemas...")
-        check_isa_schemas(isa_json=isa_json,
-                          investigation_schema_path=os.path.join(config_dir, "schemas",
-                                                                 "investigation_schema.json"))  # Rule 4003
-        # if all ERRORS are resolved, then try and validate against configuration
-        handler.flush()
-        if "(E)" in stream.getvalue():
-            logger.fatal("(F) There are some errors that mean validation against configurations cannot proceed.")
-            return stream
-        fp.seek(0)  # reset file pointer
-        logger.info("Checking study and assay graphs...")
-        for study_json in isa_json["studies"]:
-            check_study_and_assay_graphs(study_json, configs)  # Rule 4004
-        logger.info("Finished validation...")
-    except KeyError as k:
-        errors.append({
-            "message": "JSON Error",
-            "supplemental": "Error when reading JSON; key: {}".format(str(k)),
-            "code": 2
-        })
-        logger.fatal("(F) There was an error when trying to read the JSON")
-        logger.fatal("Key: " + str(k))
-    except ValueError as v:
-        errors.append({
-            "message": "JSON Error",
-            "supplemental": "Error when parsing JSON; key: {}".format(str(v)),
-            "code": 2
-        })
-        logger.fatal("(F) There was an error when trying to parse the JSON")
-        logger.fatal("Value: " + str(v))
-    except SystemError as e:
-        errors.append({
-            "message": "Unknown/System Error",
-            "supplemental": str(e),
-            "code": 0
-        })
-        logger.fatal("(F) Something went very very wrong! :(")
-    finally:
-        handler.flush()
-        return {
-            "errors": errors,
-            "warnings": warnings,
-            "validation_finished": True
-        }
+    # the check functions report into the context current in this thread
+    with ValidationContext(log_level=log_level) as context:
+        logger.info("ISA JSON Validator from ISA tools API v0.3")
+        try:
+            logger.info("Checking if encoding is UTF8")
+            check_utf8(fp=fp)  # Rule 0010
+            logger.info("Loading json from " + fp.name)
+            isa_json = json.load(fp=fp)  # Rule 0002
+            logger.info("Validating JSON against schemas using Draft4Validator")
+            check_isa_schemas(isa_json=isa_json,
+                              investigation_schema_path=os.path.join(BASE_DIR, "schemas", base_schemas_dir,
+                                                                     "core", "investigation_schema.json"),
+                              max_errors=max_schema_errors)  # Rule 0003
+            logger.info("Indexing IDs declared and used...")
+            id_indexes = [StudyIdIndex(study_json) for study_json in isa_json["studies"]]
+            logger.info("Checking if material IDs used are declared...")
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_material_ids_not_declared_used(study_json, id_index)  # Rules 1002-1005
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_material_ids_declared_used(study_json, get_source_ids, id_index)  # Rule 1015
+                check_material_ids_declared_used(study_json, get_sample_ids, id_index)  # Rule 1016
+                check_material_ids_declared_used(study_json, get_material_ids, id_index)  # Rule 1017
+                check_material_ids_declared_used(study_json, get_data_file_ids, id_index)  # Rule 1018
+            logger.info("Checking characteristic categories usage...")
+            check_characteristic_category_ids_usage(isa_json["studies"], id_indexes)  # Rules 1013 and 1022
+            logger.info("Checking study factor usage...")
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_study_factor_usage(study_json, id_index)  # Rules 1008 and 1021
+            logger.info("Checking protocol parameter usage...")
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_protocol_parameter_ids_usage(study_json, id_index)  # Rules 1009 and 1020
+            logger.info("Checking unit category usage...")
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_unit_category_ids_usage(study_json, id_index)  # Rules 1014 and 1022
+            logger.info("Checking process sequences (study)...")
+            for study_json in isa_json["studies"]:
+                check_process_sequence_links(study_json["processSequence"])  # Rule 1006
+                logger.info("Checking process sequences (assay)...")
+                for assay_json in study_json["assays"]:
+                    check_process_sequence_links(assay_json["processSequence"])  # Rule 1006
+            logger.info("Checking process protocol usage...")
+            for study_json, id_index in zip(isa_json["studies"], id_indexes):
+                check_process_protocol_ids_usage(study_json, id_index)  # Rules 1007 and 1019
+            logger.info("Checking date formats...")
+            check_date_formats(isa_json)  # Rule 3001
+            logger.info("Checking DOI formats...")
+            check_dois(isa_json)  # Rule 3002
+            logger.info("Checking Pubmed ID formats...")
+            check_pubmed_ids_format(isa_json)  # Rule 3003
+            logger.info("Checking filenames are present...")
+            check_filenames_present(isa_json)  # Rule 3005
+            logger.info("Checking protocol names...")
+            check_protocol_names(isa_json)  # Rule 1010
+            logger.info("Checking protocol parameter names...")
+            check_protocol_parameter_names(isa_json)  # Rule 1011
+            logger.info("Checking study factor names...")
+            check_study_factor_names(isa_json)  # Rule 1012
+            logger.info("Checking ontology sources...")
+            check_ontology_sources(isa_json)  # Rule 3008
+            logger.info("Collecting ontology annotations...")
+            annotations = list(iter_annotations(isa_json))
+            logger.info("Checking term source REFs...")
+            check_term_source_refs(isa_json, annotations)  # Rules 3007 and 3009
+            logger.info("Checking missing term source REFs...")
+            check_term_accession_used_no_source_ref(isa_json, annotations)  # Rule 3010
+            logger.info("Loading configurations from " + config_dir)
+            configs = load_config(config_dir)  # Rule 4001
+            logger.info("Checking measurement and technology types...")
+            for study_json in isa_json["studies"]:
+                for assay_json in study_json["assays"]:
+                    check_measurement_technology_types(assay_json, configs)  # Rule 4002
+            logger.info("Checking against configuration schemas...")
+            check_isa_schemas(isa_json=isa_json,
+                              investigation_schema_path=os.path.join(config_dir, "schemas",
+                                                                     "investigation_schema.json"),
+                              max_errors=max_schema_errors)  # Rule 4003
+            # if all ERRORS are resolved, then try and validate against configuration
+            if "(E)" in context.log.getvalue():
+                logger.fatal("(F) There are some errors that mean validation against configurations cannot proceed.")
+                return context.log
+            fp.seek(0)  # reset file pointer
+            logger.info("Checking study and assay graphs...")
+            for study_json in isa_json["studies"]:
+                check_study_and_assay_graphs(study_json, configs)  # Rule 4004
+            logger.info("Finished validation...")
+        except KeyError as k:
+            errors.append({
+                "message": "JSON Error",
+                "supplemental": "Error when reading JSON; key: {}".format(str(k)),
+                "code": 2
+            })
+            logger.fatal("(F) There was an error when trying to read the JSON")
+            logger.fatal("Key: " + str(k))
+        except ValueError as v:
+            errors.append({
+                "message": "JSON Error",
+                "supplemental": "Error when parsing JSON; key: {}".format(str(v)),
+                "code": 2
+            })
+            logger.fatal("(F) There was an error when trying to parse the JSON")
+            logger.fatal("Value: " + str(v))
+        except SystemError as e:
+            errors.append({
+                "message": "Unknown/System Error",
+                "supplemental": str(e),
+                "code": 0
+            })
+            logger.fatal("(F) Something went very very wrong! :(")
+        finally:
+            return context.report(True)
 
 
 def batch_validate(json_file_list):
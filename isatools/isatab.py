@@ -6,21 +6,28 @@ import networkx as nx
 import logging
 import re
 import math
+import numbers
 import iso8601
 import csv
+from collections import namedtuple
 import numpy as np
 from bisect import bisect_left, bisect_right
 from itertools import tee
+from functools import partial
 import pandas as pd
-from progressbar import ProgressBar, SimpleProgress, Bar, ETA
+from isatools.reporting import get_reporter, reported, Reporter
+from isatools.validate.context import ValidationContext, CurrentContextList, add_context_logging
 import io
+import pickle
 
 
 logging.basicConfig(format='%(asctime)s %(levelname)s: %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
+add_context_logging(logger)
 
-errors = list()
-warnings = list()
+# errors and warnings of the validation running in the calling thread, see isatools.validate.context
+errors = CurrentContextList('errors')
+warnings = CurrentContextList('warnings')
 
 
 ## REGEXES
@@ -34,6 +41,18 @@ _RX_CHARACTERISTICS = re.compile('Characteristics\[(.*?)\]')
 _RX_PARAMETER_VALUE = re.compile('Parameter Value\[(.*?)\]')
 _RX_FACTOR_VALUE = re.compile('Factor Value\[(.*?)\]')
 _RX_INDEXED_COL = re.compile('(.*?)\.\d+')
+_RX_INT = re.compile('[+-]?[0-9]+$')
+_RX_FLOAT = re.compile('[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][+-]?[0-9]+)?$|[+-]?(inf|infinity)$', re.IGNORECASE)
+
+# investigation file sections, in the order they appear in; the study sections repeat for each study
+_I_SECTIONS = ['ONTOLOGY SOURCE REFERENCE', 'INVESTIGATION', 'INVESTIGATION PUBLICATIONS', 'INVESTIGATION CONTACTS']
+_I_STUDY_SECTIONS = ['STUDY', 'STUDY DESIGN DESCRIPTORS', 'STUDY PUBLICATIONS', 'STUDY FACTORS', 'STUDY ASSAYS',
+                     'STUDY PROTOCOLS', 'STUDY CONTACTS']
+_I_SECTION_KEYS = frozenset(_I_SECTIONS + _I_STUDY_SECTIONS)
+# investigation file cells read as missing values, as pandas reads them
+_NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'n/a', 'nan', 'null'])
+_BOOL_VALUES = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
 
 # column labels
 _LABELS_MATERIAL_NODES = ['Source Name', 'Sample Name', 'Extract Name', 'Labeled Extract Name']
@@ -46,6 +65,7 @@ _LABELS_ASSAY_NODES = ['Assay Name', 'MS Assay Name', 'Hybridization Assay Name'
                        'Data Transformation Name', 'Normalization Name']
 
 
+@reported
 def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tables=False):
 
     def _build_roles_str(roles):
@@ -424,26 +444,144 @@ def _get_start_end_nodes(G):
     return start_nodes, end_nodes
 
 
+def _path_node_length(n):
+    length = 1
+    if isinstance(n, Source):
+        length += len(n.characteristics)
+    elif isinstance(n, Sample):
+        length += (len(n.characteristics) + len(n.factor_values))
+    elif isinstance(n, Material):
+        length += (len(n.characteristics))
+    elif isinstance(n, Process):
+        length += len([o for o in n.outputs if isinstance(o, DataFile)])
+    if n.comments is not None:
+        length += len(n.comments)
+    return length
+
+
 def _longest_path_and_attrs(paths):
     longest = (0, None)
     for path in paths:
-        length = len(path)
-        for n in path:
-            if isinstance(n, Source):
-                length += len(n.characteristics)
-            elif isinstance(n, Sample):
-                length += (len(n.characteristics) + len(n.factor_values))
-            elif isinstance(n, Material):
-                length += (len(n.characteristics))
-            elif isinstance(n, Process):
-                length += len([o for o in n.outputs if isinstance(o, DataFile)])
-            if n.comments is not None:
-                length += len(n.comments)
+        length = sum(_path_node_length(n) for n in path)
         if length > longest[0]:
             longest = (length, path)
     return longest[1]
 
 
+def _topological_order(G):
+    """Orders the nodes of a graph so that every edge goes from an earlier node to a later one
+
+    Unlike nx.topological_sort, this copes with the None node that assay graphs get when a last process has only data
+    file outputs.
+
+    :param G: A directed graph
+    :return: list of nodes, or None if the graph has cycles
+    """
+    if isinstance(G, ProcessGraph):
+        return G.topological_order()
+    in_degrees = dict((node, len(predecessors)) for node, predecessors in G.pred.items())
+    ready = [node for node, in_degree in in_degrees.items() if in_degree == 0]
+    ordered_nodes = list()
+    while ready:
+        node = ready.pop()
+        ordered_nodes.append(node)
+        for successor in G.succ[node]:
+            in_degrees[successor] -= 1
+            if in_degrees[successor] == 0:
+                ready.append(successor)
+    if len(ordered_nodes) < len(in_degrees):
+        return None
+    return ordered_nodes
+
+
+class EndToEndPaths(object):
+    """The paths of a process graph from each start node to the end nodes that can be reached from it
+
+    Paths are generated one at a time, rather than all listed before writing. The paths from each node on to the end
+    nodes, its suffixes, are worked out once, going through the graph in reverse topological order, and are kept as
+    linked (node, rest of suffix) pairs. A suffix shared by many paths, such as everything after a pooling step, is
+    then only built once.
+    """
+
+    def __init__(self, G, start_nodes, is_end):
+        """
+        :param G: The process graph of a study or assay
+        :param start_nodes: Nodes the paths start from
+        :param is_end: Function telling if a node is one the paths end at
+        """
+        self.start_nodes = list(start_nodes)
+        self.__paths = None
+        self.__suffixes = dict()
+        self.__longest_suffixes = dict()
+        self.__successors = dict((start, list(G.succ[start])) for start in self.start_nodes)
+        ordered_nodes = _topological_order(G)
+        if ordered_nodes is None:  # cycles in the graph, so fall back to listing the simple paths
+            if isinstance(G, ProcessGraph):
+                self.__paths = list(G.end_to_end_paths(self.start_nodes, is_end))
+            else:
+                self.__paths = _all_end_to_end_paths(G, self.start_nodes) if self.start_nodes else []
+            return
+        for node in reversed(ordered_nodes):
+            if not G.pred[node]:
+                continue  # suffixes of nodes nothing leads to are only needed once, when generating their paths
+            suffixes = list()
+            longest = (0, None)
+            if is_end(node):
+                suffixes.append((node, None))
+            for successor in G.succ[node]:
+                suffixes.extend((node, suffix) for suffix in self.__suffixes[successor])
+            if suffixes:
+                node_length = _path_node_length(node)
+                if is_end(node):
+                    longest = (node_length, (node, None))
+                for successor in G.succ[node]:
+                    length, suffix = self.__longest_suffixes[successor]
+                    if suffix is not None and node_length + length > longest[0]:
+                        longest = (node_length + length, (node, suffix))
+            self.__suffixes[node] = suffixes
+            self.__longest_suffixes[node] = longest
+
+    @staticmethod
+    def _unlink(suffix):
+        path = list()
+        while suffix is not None:
+            node, suffix = suffix
+            path.append(node)
+        return path
+
+    def __iter__(self):
+        if self.__paths is not None:
+            for path in self.__paths:
+                yield path
+            return
+        for start in self.start_nodes:
+            for successor in self.__successors[start]:
+                for suffix in self.__suffixes[successor]:
+                    yield [start] + self._unlink(suffix)
+
+    def __len__(self):
+        if self.__paths is not None:
+            return len(self.__paths)
+        return sum(len(self.__suffixes[successor]) for start in self.start_nodes
+                   for successor in self.__successors[start])
+
+    def longest(self):
+        """Gets the path with the most nodes and node attributes, which sets the columns of the table written out
+
+        :return: The longest path as a list of nodes, or None if there are no paths
+        """
+        if self.__paths is not None:
+            return _longest_path_and_attrs(self.__paths)
+        longest = (0, None)
+        for start in self.start_nodes:
+            start_length = _path_node_length(start)
+            for successor in self.__successors[start]:
+                length, suffix = self.__longest_suffixes[successor]
+                if suffix is not None and start_length + length > longest[0]:
+                    longest = (start_length + length, (start, suffix))
+        return self._unlink(longest[1]) if longest[1] is not None else None
+
+
 def _all_end_to_end_paths(G, start_nodes):  # we know graphs start with Source or Sample and end with Process
     paths = []
     num_start_nodes = len(start_nodes)
@@ -452,10 +590,8 @@ def _all_end_to_end_paths(G, start_nodes):  # we know graphs start with Source o
         message = 'Calculating for paths for {} sources: '.format(num_start_nodes)
     elif isinstance(start_nodes[0], Sample):
         message = 'Calculating for paths for {} samples: '.format(num_start_nodes)
-    pbar = ProgressBar(min_value=0, max_value=num_start_nodes, widgets=[message,
-                                                                       SimpleProgress(),
-                                                                       Bar(left=" |", right="| "), ETA()]).start()
-    for start in pbar(start_nodes):
+    reporter = get_reporter()
+    for start in reporter.progress(start_nodes, message):
         # Find ends
         if isinstance(start, Source):  # only look for Sample ends if start is a Source
             for end in [x for x in nx.algorithms.descendants(G, start) if
@@ -465,12 +601,105 @@ def _all_end_to_end_paths(G, start_nodes):  # we know graphs start with Source o
             for end in [x for x in nx.algorithms.descendants(G, start) if
                         isinstance(x, Process) and x.next_process is None]:
                 paths += list(nx.algorithms.all_simple_paths(G, start, end))
-    print("Found {} paths!".format(len(paths)))
+    reporter.info("Found {} paths!".format(len(paths)))
     if len(paths) == 0:
-        print([x.name for x in start_nodes])  # TODO: Find out why no paths in BII-I-1
+        reporter.info(str([x.name for x in start_nodes]))  # TODO: Find out why no paths in BII-I-1
     return paths
 
 
+class TableRows(object):
+    """Rows of a study or assay table being written out, one per path through the process graph
+
+    Each column label gets a slot in the rows once, up front, so rows are built straight into lists of cells. Rows
+    that duplicate one already added are dropped as they are added, by hashing. Only one copy of the table is kept,
+    rather than the copies the DataFrame sort, duplicate drop and empty column drop each made.
+    """
+
+    def __init__(self, labels):
+        """
+        :param labels: Column labels, in order. A label can appear more than once, in which case its columns all
+        get the same value
+        """
+        self.labels = list(labels)
+        self.slots = dict()
+        for label in self.labels:
+            self.slots.setdefault(label, len(self.slots))
+        self.rows = list()
+        self.num_added = 0
+        self.__seen = set()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def new_row(self):
+        return [''] * len(self.slots)
+
+    def add(self, row):
+        self.num_added += 1
+        row = tuple(row)
+        if row not in self.__seen:
+            self.__seen.add(row)
+            self.rows.append(row)
+
+    @staticmethod
+    def _is_missing(value):
+        return value is None or value == '' or (isinstance(value, float) and math.isnan(value))
+
+    def get_slot_formats(self):
+        """Works out how the values of each slot are written, the way pandas wrote a DataFrame of the rows
+
+        :return: list with, for each slot, None if it has no values and its columns are left out, 'float' if its
+        values are all numbers and pandas would have turned them into floats, or 'str' otherwise
+        """
+        formats = list()
+        for slot in range(len(self.slots)):
+            has_values = has_missing = has_float = False
+            all_numbers = True
+            for row in self.rows:
+                value = row[slot]
+                if self._is_missing(value):
+                    has_missing = True
+                    continue
+                has_values = True
+                if isinstance(value, bool) or not isinstance(value, numbers.Number):
+                    all_numbers = False
+                elif isinstance(value, float):
+                    has_float = True
+            if not has_values:
+                formats.append(None)
+            elif all_numbers and (has_float or has_missing):
+                formats.append('float')
+            else:
+                formats.append('str')
+        return formats
+
+    def write(self, out_fp, header):
+        """Writes the rows out as tab-separated values, sorted on the first column, leaving out empty columns
+
+        :param out_fp: File to write to
+        :param header: Column headers to write, one per label
+        """
+        formats = self.get_slot_formats()
+        out_slots = [self.slots[label] for label in self.labels]
+        out_columns = [i for i, slot in enumerate(out_slots) if formats[slot] is not None]
+        writer = csv.writer(out_fp, delimiter='\t', lineterminator='\n')
+        writer.writerow([header[i] for i in out_columns])
+        out_slots = [out_slots[i] for i in out_columns]
+        first_slot = self.slots[self.labels[0]]
+        self.rows.sort(key=lambda row: row[first_slot])
+        for row in self.rows:
+            cells = list()
+            for slot in out_slots:
+                value = row[slot]
+                if self._is_missing(value):
+                    cells.append('')
+                elif formats[slot] == 'float':
+                    cells.append(str(float(value)))
+                else:
+                    cells.append(str(value))
+            writer.writerow(cells)
+
+
 def write_study_table_files(inv_obj, output_dir):
     """
         Writes out study table files according to pattern defined by
@@ -486,6 +715,7 @@ def write_study_table_files(inv_obj, output_dir):
 
     if not isinstance(inv_obj, Investigation):
         raise NotImplementedError
+    reporter = get_reporter()
     for study_obj in inv_obj.studies:
         if study_obj.graph is None: break
         protrefcount = 0
@@ -495,9 +725,13 @@ def write_study_table_files(inv_obj, output_dir):
         columns = []
 
         # start_nodes, end_nodes = _get_start_end_nodes(study_obj.graph)
-        paths = _all_end_to_end_paths(study_obj.graph, [x for x in study_obj.graph.nodes() if isinstance(x, Source)])
+        G = study_obj.graph
+        paths = EndToEndPaths(G, [x for x in G.nodes() if isinstance(x, Source)],
+                              lambda x: isinstance(x, Sample) and G.out_degree(x) == 0)
+        num_paths = len(paths)
+        reporter.info("Found {} paths!".format(num_paths))
         sample_in_path_count = 0
-        for node in _longest_path_and_attrs(paths):
+        for node in paths.longest():
             if isinstance(node, Source):
                 olabel = "Source Name"
                 columns.append(olabel)
@@ -521,61 +755,61 @@ def write_study_table_files(inv_obj, output_dir):
                 columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
                 columns += flatten(map(lambda x: get_fv_columns(olabel, x), node.factor_values))
 
-        omap = get_object_column_map(columns, columns)
-        # load into dictionary
-        df_dict = dict(map(lambda k: (k, []), flatten(omap)))
-
-        pbar = ProgressBar(min_value=0, max_value=len(paths), widgets=['Writing {} paths: '.format(len(paths)),
-                                                                       SimpleProgress(),
-                                                                       Bar(left=" |", right="| "), ETA()]).start()
-
-        for path in pbar(paths):
-            for k in df_dict.keys():  # add a row per path
-                df_dict[k].extend([""])
+        rows = TableRows(columns)
+        slots = rows.slots
+        node_cells = dict()  # cells each node fills in, worked out once however many paths go through it
 
+        def get_node_cells(node, olabel):
+            try:
+                return node_cells[(node, olabel)]
+            except KeyError:
+                pass
+            if isinstance(node, Source):
+                cells = [(olabel, node.name)]
+                for c in node.characteristics:
+                    clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                    cells.extend(get_value_cells(clabel, c))
+            elif isinstance(node, Process):
+                cells = [(olabel, node.executes_protocol.name)]
+                if node.date is not None:
+                    cells.append((olabel + ".Date", node.date))
+                if node.performer is not None:
+                    cells.append((olabel + ".Performer", node.performer))
+                for pv in node.parameter_values:
+                    pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
+                    cells.extend(get_value_cells(pvlabel, pv))
+            else:
+                cells = [(olabel, node.name)]
+                for c in node.characteristics:
+                    clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                    cells.extend(get_value_cells(clabel, c))
+                for fv in node.factor_values:
+                    fvlabel = "{0}.Factor Value[{1}]".format(olabel, fv.factor_name.name)
+                    cells.extend(get_value_cells(fvlabel, fv))
+            node_cells[(node, olabel)] = [(slots[label], value) for label, value in cells]
+            return node_cells[(node, olabel)]
+
+        for path in reporter.progress(paths, 'Writing {} paths: '.format(num_paths)):
+            row = rows.new_row()
             sample_in_path_count = 0
             for node in path:
                 if isinstance(node, Source):
                     olabel = "Source Name"
-                    df_dict[olabel][-1] = node.name
-                    for c in node.characteristics:
-                        clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                        write_value_columns(df_dict, clabel, c)
-
                 elif isinstance(node, Process):
                     olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                    df_dict[olabel][-1] = node.executes_protocol.name
-                    if node.date is not None:
-                        df_dict[olabel + ".Date"][-1] = node.date
-                    if node.performer is not None:
-                        df_dict[olabel + ".Performer"][-1] = node.performer
-                    for pv in node.parameter_values:
-                        pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
-                        write_value_columns(df_dict, pvlabel, pv)
-
                 elif isinstance(node, Sample):
                     olabel = "Sample Name.{}".format(sample_in_path_count)
                     sample_in_path_count += 1
-                    df_dict[olabel][-1] = node.name
-                    for c in node.characteristics:
-                        clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                        write_value_columns(df_dict, clabel, c)
-                    for fv in node.factor_values:
-                        fvlabel = "{0}.Factor Value[{1}]".format(olabel, fv.factor_name.name)
-                        write_value_columns(df_dict, fvlabel, fv)
-        pbar.finish()
-
-        DF = pd.DataFrame(columns=columns)
-        DF = DF.from_dict(data=df_dict)
-        DF = DF[columns]  # reorder columns
-        DF = DF.sort_values(by=DF.columns[0], ascending=True)  # arbitrary sort on column 0
+                else:
+                    continue
+                for slot, value in get_node_cells(node, olabel):
+                    row[slot] = value
+            rows.add(row)
 
         for dup_item in set([x for x in columns if columns.count(x) > 1]):
             for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
                 columns[each] = dup_item + str(j)
 
-        DF.columns = columns  # reset columns after checking for dups
-
         for i, col in enumerate(columns):
             if col.endswith("Term Source REF"):
                 columns[i] = "Term Source REF"
@@ -601,21 +835,13 @@ def write_study_table_files(inv_obj, output_dir):
             elif col.startswith("Sample Name."):
                 columns[i] = "Sample Name"
 
-        print("Rendered {} paths".format(len(DF.index)))
-
-        DF_no_dups = DF.drop_duplicates()
-        if len(DF.index) > len(DF_no_dups.index):
-            print("Dropping duplicates...")
-            DF = DF_no_dups
-
-        print("Writing {} rows".format(len(DF.index)))
-        # reset columns, replace nan with empty string, drop empty columns
-        DF.columns = columns
-        DF = DF.replace('', np.nan)
-        DF = DF.dropna(axis=1, how='all')
+        reporter.info("Rendered {} paths".format(rows.num_added))
+        if rows.num_added > len(rows):
+            reporter.info("Dropping duplicates...")
 
+        reporter.info("Writing {} rows".format(len(rows)))
         with open(os.path.join(output_dir, study_obj.filename), 'w') as out_fp:
-            DF.to_csv(path_or_buf=out_fp, index=False, sep='\t', encoding='utf-8')
+            rows.write(out_fp, columns)
 
 
 def write_assay_table_files(inv_obj, output_dir):
@@ -632,6 +858,7 @@ def write_assay_table_files(inv_obj, output_dir):
 
     if not isinstance(inv_obj, Investigation):
         raise NotImplementedError
+    reporter = get_reporter()
     for study_obj in inv_obj.studies:
         for assay_obj in study_obj.assays:
             if assay_obj.graph is None: break
@@ -642,13 +869,17 @@ def write_assay_table_files(inv_obj, output_dir):
             columns = []
 
             # start_nodes, end_nodes = _get_start_end_nodes(assay_obj.graph)
-            paths = _all_end_to_end_paths(assay_obj.graph, [x for x in assay_obj.graph.nodes() if isinstance(x, Sample)])
-            if len(paths) == 0:
-                print("No paths found, skipping writing assay file")
+            paths = EndToEndPaths(assay_obj.graph, [x for x in assay_obj.graph.nodes() if isinstance(x, Sample)],
+                                  lambda x: isinstance(x, Process) and x.next_process is None)
+            num_paths = len(paths)
+            reporter.info("Found {} paths!".format(num_paths))
+            if num_paths == 0:
+                reporter.info("No paths found, skipping writing assay file")
                 continue
-            if _longest_path_and_attrs(paths) is None:
+            longest_path = paths.longest()
+            if longest_path is None:
                 raise IOError("Could not find any valid end-to-end paths in assay graph")
-            for node in _longest_path_and_attrs(paths):
+            for node in longest_path:
                 if isinstance(node, Sample):
                     olabel = "Sample Name"
                     columns.append(olabel)
@@ -698,87 +929,79 @@ def write_assay_table_files(inv_obj, output_dir):
                 elif isinstance(node, DataFile):
                     pass  # handled in process
 
-            omap = get_object_column_map(columns, columns)
+            rows = TableRows(columns)
+            slots = rows.slots
+            node_cells = dict()  # cells each node fills in, worked out once however many paths go through it
+
+            def get_node_cells(node):
+                try:
+                    return node_cells[node]
+                except KeyError:
+                    pass
+                cells = list()
+                if isinstance(node, Process):
+                    olabel = "Protocol REF.{}".format(node.executes_protocol.name)
+                    cells.append((olabel, node.executes_protocol.name))
+                    if node.date is not None:
+                        cells.append((olabel + ".Date", node.date))
+                    if node.performer is not None:
+                        cells.append((olabel + ".Performer", node.performer))
+                    for pv in node.parameter_values:
+                        pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
+                        cells.extend(get_value_cells(pvlabel, pv))
+                    oname_label = None
+                    if node.executes_protocol.protocol_type:
+                        if node.executes_protocol.protocol_type.term == "nucleic acid sequencing":
+                            oname_label = "Assay Name"
+                        elif node.executes_protocol.protocol_type.term == "data collection":
+                            oname_label = "Scan Name"
+                        elif node.executes_protocol.protocol_type.term == "mass spectrometry":
+                            oname_label = "MS Assay Name"
+                        elif node.executes_protocol.protocol_type.term == "data transformation":
+                            oname_label = "Data Transformation Name"
+                        elif node.executes_protocol.protocol_type.term == "sequence analysis data transformation":
+                            oname_label = "Normalization Name"
+                        elif node.executes_protocol.protocol_type.term == "normalization":
+                            oname_label = "Normalization Name"
+                        if node.executes_protocol.protocol_type.term == "unknown protocol":
+                            oname_label = "Unknown Protocol Name"
+                        if oname_label is not None:
+                            cells.append((oname_label, node.name))
+                        elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
+                            cells.append(("Hybridization Assay Name", node.name))
+                            cells.append(("Array Design REF", node.array_design_ref))
+                    for output in [x for x in node.outputs if isinstance(x, DataFile)]:
+                        olabel = output.label
+                        cells.append((olabel, output.filename))
+                        for co in output.comments:
+                            colabel = "{0}.Comment[{1}]".format(olabel, co.name)
+                            cells.append((colabel, co.value))
 
-            # load into dictionary
-            df_dict = dict(map(lambda k: (k, []), flatten(omap)))
+                elif isinstance(node, Sample):
+                    cells.append(("Sample Name", node.name))
 
-            from progressbar import ProgressBar, SimpleProgress, Bar, ETA
-            pbar = ProgressBar(min_value=0, max_value=len(paths), widgets=['Writing {} paths: '.format(len(paths)),
-                                                                           SimpleProgress(),
-                                                                           Bar(left=" |", right="| "), ETA()]).start()
+                elif isinstance(node, Material):
+                    olabel = node.type
+                    cells.append((olabel, node.name))
+                    for c in node.characteristics:
+                        clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                        cells.extend(get_value_cells(clabel, c))
 
-            for path in pbar(paths):
-                for k in df_dict.keys():  # add a row per path
-                    df_dict[k].extend([""])
+                # DataFile nodes are handled in the process that outputs them
+                node_cells[node] = [(slots[label], value) for label, value in cells]
+                return node_cells[node]
 
+            for path in reporter.progress(paths, 'Writing {} paths: '.format(num_paths)):
+                row = rows.new_row()
                 for node in path:
-
-                    if isinstance(node, Process):
-                        olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                        df_dict[olabel][-1] = node.executes_protocol.name
-                        if node.date is not None:
-                            df_dict[olabel + ".Date"][-1] = node.date
-                        if node.performer is not None:
-                            df_dict[olabel + ".Performer"][-1] = node.performer
-                        for pv in node.parameter_values:
-                            pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
-                            write_value_columns(df_dict, pvlabel, pv)
-                        oname_label = None
-                        if node.executes_protocol.protocol_type:
-                            if node.executes_protocol.protocol_type.term == "nucleic acid sequencing":
-                                oname_label = "Assay Name"
-                            elif node.executes_protocol.protocol_type.term == "data collection":
-                                oname_label = "Scan Name"
-                            elif node.executes_protocol.protocol_type.term == "mass spectrometry":
-                                oname_label = "MS Assay Name"
-                            elif node.executes_protocol.protocol_type.term == "data transformation":
-                                oname_label = "Data Transformation Name"
-                            elif node.executes_protocol.protocol_type.term == "sequence analysis data transformation":
-                                oname_label = "Normalization Name"
-                            elif node.executes_protocol.protocol_type.term == "normalization":
-                                oname_label = "Normalization Name"
-                            if node.executes_protocol.protocol_type.term == "unknown protocol":
-                                oname_label = "Unknown Protocol Name"
-                            if oname_label is not None:
-                                df_dict[oname_label][-1] = node.name
-                            elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
-                                df_dict["Hybridization Assay Name"][-1] = node.name
-                                df_dict["Array Design REF"][-1] = node.array_design_ref
-                        for output in [x for x in node.outputs if isinstance(x, DataFile)]:
-                            olabel = output.label
-                            df_dict[olabel][-1] = output.filename
-                            for co in output.comments:
-                                colabel = "{0}.Comment[{1}]".format(olabel, co.name)
-                                df_dict[colabel][-1] = co.value
-
-                    elif isinstance(node, Sample):
-                        olabel = "Sample Name"
-                        df_dict[olabel][-1] = node.name
-
-                    elif isinstance(node, Material):
-                        olabel = node.type
-                        df_dict[olabel][-1] = node.name
-                        for c in node.characteristics:
-                            clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                            write_value_columns(df_dict, clabel, c)
-
-                    elif isinstance(node, DataFile):
-                        pass  # handled in process
-
-            pbar.finish()
-
-            DF = pd.DataFrame(columns=columns)
-            DF = DF.from_dict(data=df_dict)
-            DF = DF[columns]  # reorder columns
-            DF = DF.sort_values(by=DF.columns[0], ascending=True)  # arbitrary sort on column 0
+                    for slot, value in get_node_cells(node):
+                        row[slot] = value
+                rows.add(row)
 
             for dup_item in set([x for x in columns if columns.count(x) > 1]):
                 for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
                     columns[each] = ".".join([dup_item, str(j)])
 
-            DF.columns = columns
-
             for i, col in enumerate(columns):
                 if col.endswith("Term Source REF"):
                     columns[i] = "Term Source REF"
@@ -808,20 +1031,13 @@ def write_assay_table_files(inv_obj, output_dir):
                 elif "." in col:
                         columns[i] = col[:col.rindex(".")]
 
-            print("Rendered {} paths".format(len(DF.index)))
-            if len(DF.index) > 1:
-                if len(DF.index) > len(DF.drop_duplicates().index):
-                    print("Dropping duplicates...")
-                    DF = DF.drop_duplicates()
-
-            print("Writing {} rows".format(len(DF.index)))
-            # reset columns, replace nan with empty string, drop empty columns
-            DF.columns = columns
-            DF = DF.replace('', np.nan)
-            DF = DF.dropna(axis=1, how='all')
+            reporter.info("Rendered {} paths".format(rows.num_added))
+            if rows.num_added > len(rows):
+                reporter.info("Dropping duplicates...")
 
+            reporter.info("Writing {} rows".format(len(rows)))
             with open(os.path.join(output_dir, assay_obj.filename), 'w') as out_fp:
-                DF.to_csv(path_or_buf=out_fp, index=False, sep='\t', encoding='utf-8')
+                rows.write(out_fp, columns)
 
 
 def get_value_columns(label, x):
@@ -854,22 +1070,28 @@ def get_comment_column(label, c):
     return columns
 
 
-def write_value_columns(df_dict, label, x):
+def get_value_cells(label, x):
+    """Gets the (column label, value) cells written out for a characteristic, factor value or parameter value
+
+    :param label: The label of the value column, as made by get_characteristic_columns and the like
+    :param x: The characteristic, factor value or parameter value
+    :return: list of (column label, value), the value column followed by its unit or term source columns
+    """
     if isinstance(x.value, (int, float)) and x.unit:
         if isinstance(x.unit, OntologyAnnotation):
-            df_dict[label][-1] = x.value
-            df_dict[label + ".Unit"][-1] = x.unit.term
-            df_dict[label + ".Unit.Term Source REF"][-1] = x.unit.term_source.name if x.unit.term_source else ""
-            df_dict[label + ".Unit.Term Accession Number"][-1] = x.unit.term_accession
+            return [(label, x.value),
+                    (label + ".Unit", x.unit.term),
+                    (label + ".Unit.Term Source REF", x.unit.term_source.name if x.unit.term_source else ""),
+                    (label + ".Unit.Term Accession Number", x.unit.term_accession)]
         else:
-            df_dict[label][-1] = x.value
-            df_dict[label + ".Unit"][-1] = x.unit
+            return [(label, x.value),
+                    (label + ".Unit", x.unit)]
     elif isinstance(x.value, OntologyAnnotation):
-        df_dict[label][-1] = x.value.term
-        df_dict[label + ".Term Source REF"][-1] = x.value.term_source.name if x.value.term_source else ""
-        df_dict[label + ".Term Accession Number"][-1] = x.value.term_accession
+        return [(label, x.value.term),
+                (label + ".Term Source REF", x.value.term_source.name if x.value.term_source else ""),
+                (label + ".Term Accession Number", x.value.term_accession)]
     else:
-        df_dict[label][-1] = x.value
+        return [(label, x.value)]
 
 
 def get_pv_columns(label, pv):
@@ -878,128 +1100,120 @@ def get_pv_columns(label, pv):
     return columns
 
 
+# a row of an investigation file section, as its label and the values after it
+InvestigationRow = namedtuple('InvestigationRow', ['label', 'values'])
+
+
+def iter_investigation_sections(fp):
+    """Reads an investigation file one section at a time, in a single pass over its lines
+
+    Sections are yielded as they are read, each as its key, such as 'STUDY PROTOCOLS', and its rows, as
+    InvestigationRow records of the row label and the list of values after it. Comment lines starting with '#' and
+    blank lines are skipped.
+
+    :param fp: File pointer to the investigation file
+    :return: generator of (section key, list of InvestigationRow) pairs
+    """
+    def _lines():
+        for line in fp:
+            if not line.lstrip().startswith('#'):
+                yield line.rstrip() + '\n'
+
+    section_key = None
+    rows = list()
+    for record in csv.reader(_lines(), delimiter='\t'):
+        if not record:
+            continue
+        if len(record) == 1 and record[0] in _I_SECTION_KEYS:
+            if section_key is not None:
+                yield section_key, rows
+            section_key = record[0]
+            rows = list()
+        elif section_key is None:
+            raise IOError("Expected: " + _I_SECTIONS[0] + " section, but got: " + '\t'.join(record))
+        else:
+            rows.append(InvestigationRow(record[0], record[1:]))
+    if section_key is not None:
+        yield section_key, rows
+
+
+def _typed_values(values):
+    """Types a run of values as pandas types a column, as int, float or bool if all of them are, else as str, with
+    missing values as ''"""
+    present = [value for value in values if value is not None and value not in _NA_VALUES]
+    if present:
+        if len(present) == len(values) and all(_RX_INT.match(value.strip()) for value in present):
+            return [int(value) for value in values]
+        if all(_RX_INT.match(value.strip()) or _RX_FLOAT.match(value.strip()) for value in present):
+            return [float(value) if value is not None and value not in _NA_VALUES else '' for value in values]
+        if all(value in _BOOL_VALUES for value in present):
+            return [_BOOL_VALUES.get(value, '') if value is not None else '' for value in values]
+    return [value if value is not None and value not in _NA_VALUES else '' for value in values]
+
+
+def _build_section_df(rows):
+    """Builds the DataFrame of an investigation file section, with a column for each row label and a row for each
+    position of values, as read_investigation_file has always returned it"""
+    if not rows:
+        return pd.DataFrame()
+    width = 1 + max(len(row.values) for row in rows)
+    labels = [rows[0].label] + rows[0].values + [''] * (width - 1 - len(rows[0].values))
+    columns = list()
+    seen_labels = dict()
+    for i, label in enumerate(labels):
+        if label == '':
+            label = 'Unnamed: {}'.format(i)
+        count = seen_labels.get(label, 0)
+        while count > 0:  # numbers repeated labels as pandas does, so Comment[x] repeated becomes Comment[x].1
+            seen_labels[label] = count + 1
+            label = '{}.{}'.format(label, count)
+            count = seen_labels.get(label, 0)
+        seen_labels[label] = count + 1
+        columns.append(label)
+    table = [_typed_values([row.label for row in rows[1:]])]
+    for i in range(width - 1):
+        table.append(_typed_values([row.values[i] if i < len(row.values) else None for row in rows[1:]]))
+    df = pd.DataFrame([[columns[i]] + table[i] for i in range(1, width)], index=range(1, width),
+                      columns=[columns[0]] + table[0], dtype=object)
+    df.columns.name = 0
+    return df
+
+
 def read_investigation_file(fp):
+    """Reads an investigation file into a DataFrame for each section
 
-    def _peek(f):
-        position = f.tell()
-        l = f.readline()
-        f.seek(position)
-        return l
-
-    def _read_tab_section(f, sec_key, next_sec_key=None):
-
-        line = f.readline()
-        normed_line = line.rstrip()
-        if normed_line[0] == '"':
-            normed_line = normed_line[1:]
-        if normed_line[len(normed_line)-1] == '"':
-            normed_line = normed_line[:len(normed_line)-1]
-        if not normed_line == sec_key:
-            raise IOError("Expected: " + sec_key + " section, but got: " + normed_line)
-        memf = io.StringIO()
-        while not _peek(f=f).rstrip() == next_sec_key:
-            line = f.readline()
-            if not line:
-                break
-            memf.write(line.rstrip() + '\n')
-        memf.seek(0)
-        return memf
-
-    def _build_section_df(f):
-        # find tab dimension
-        # print('Max width = {}'.format(max([len(line.split('\t')) for line in f])))
-        f.seek(0)
+    Each DataFrame has a column for each row label of the section and a row for each position of values, so that a
+    row is one ontology source, publication, contact, factor, assay or protocol. Repeated labels are numbered as
+    pandas numbers them, so a second Comment[x] becomes Comment[x].1, and values are typed as pandas would type them
+    reading the section, with missing values as ''. The file is read in a single pass with iter_investigation_sections.
+
+    :param fp: File pointer to the investigation file
+    :return: dict of the DataFrames of the investigation sections, and of lists of the DataFrames of each study section
+    """
+    sections = iter_investigation_sections(fp)
+
+    def _read_section(sec_key):
         try:
-            df = pd.read_csv(f, sep='\t', encoding='utf-8', comment='#').T  # Load and transpose ISA file section
-            # df = pd.read_csv(f, names=range(0, 128), sep='\t', engine='python', encoding='utf-8',
-            #                  comment='#', converters={'Term Source Name': str}).dropna(axis=1, how='all')
-            # df = df.T
-        except CParserError:
-            f.seek(0)
-            raise IOError("There was a problem parsing the investigation section:\n\n{}".format(f.read()))
-        df.replace(np.nan, '', regex=True, inplace=True)  # Strip out the nan entries
-        df.reset_index(inplace=True)  # Reset index so it is accessible as column
-        df.columns = df.iloc[0]  # If all was OK, promote this row to the column headers
-        df = df.reindex(df.index.drop(0))  # Reindex the DataFrame
-        return df
-
-    memf = io.StringIO()
-    while True:
-        line = fp.readline()
-        if not line:
-            break
-        if not line.lstrip().startswith('#'):
-            memf.write(line)
-    memf.seek(0)
+            key, rows = next(sections)
+        except StopIteration:
+            raise IOError("Expected: " + sec_key + " section, but got: end of file")
+        if not key == sec_key:
+            raise IOError("Expected: " + sec_key + " section, but got: " + key)
+        return _build_section_df(rows)
 
     df_dict = dict()
-
-    # Read in investigation file into DataFrames first
-    df_dict['ontology_sources'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='ONTOLOGY SOURCE REFERENCE',
-        next_sec_key='INVESTIGATION'
-    ))
-    # assert({'Term Source Name', 'Term Source File', 'Term Source Version', 'Term Source Description'}
-    #        .issubset(set(ontology_sources_df.columns.values)))  # Check required labels are present
-    df_dict['investigation'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION',
-        next_sec_key='INVESTIGATION PUBLICATIONS'
-    ))
-    df_dict['i_publications'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION PUBLICATIONS',
-        next_sec_key='INVESTIGATION CONTACTS'
-    ))
-    df_dict['i_contacts'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION CONTACTS',
-        next_sec_key='STUDY'
-    ))
-    df_dict['studies'] = list()
-    df_dict['s_design_descriptors'] = list()
-    df_dict['s_publications'] = list()
-    df_dict['s_factors'] = list()
-    df_dict['s_assays'] = list()
-    df_dict['s_protocols'] = list()
-    df_dict['s_contacts'] = list()
-    while _peek(memf):  # Iterate through STUDY blocks until end of file
-        df_dict['studies'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY',
-            next_sec_key='STUDY DESIGN DESCRIPTORS'
-        )))
-        df_dict['s_design_descriptors'] .append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY DESIGN DESCRIPTORS',
-            next_sec_key='STUDY PUBLICATIONS'
-        )))
-        df_dict['s_publications'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY PUBLICATIONS',
-            next_sec_key='STUDY FACTORS'
-        )))
-        df_dict['s_factors'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY FACTORS',
-            next_sec_key='STUDY ASSAYS'
-        )))
-        df_dict['s_assays'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY ASSAYS',
-            next_sec_key='STUDY PROTOCOLS'
-        )))
-        df_dict['s_protocols'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY PROTOCOLS',
-            next_sec_key='STUDY CONTACTS'
-        )))
-        df_dict['s_contacts'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY CONTACTS',
-            next_sec_key='STUDY'
-        )))
+    for sec_key, name in zip(_I_SECTIONS, ['ontology_sources', 'investigation', 'i_publications', 'i_contacts']):
+        df_dict[name] = _read_section(sec_key)
+    study_names = ['studies', 's_design_descriptors', 's_publications', 's_factors', 's_assays', 's_protocols',
+                   's_contacts']
+    for name in study_names:
+        df_dict[name] = list()
+    for sec_key, rows in sections:  # Iterate through STUDY blocks until end of file
+        if not sec_key == 'STUDY':
+            raise IOError("Expected: STUDY section, but got: " + sec_key)
+        df_dict['studies'].append(_build_section_df(rows))
+        for study_sec_key, name in zip(_I_STUDY_SECTIONS[1:], study_names[1:]):
+            df_dict[name].append(_read_section(study_sec_key))
     return df_dict
 
 
@@ -1322,40 +1536,62 @@ def check_table_files_load(i_df, dir_context):
                     pass
 
 
-def check_samples_not_declared_in_study_used_in_assay(i_df, dir_context):
+def check_samples_not_declared_in_study_used_in_assay(i_df, dir_context, table_cache=None):
+    if table_cache is None:
+        table_cache = TableCache()
     for i, study_df in enumerate(i_df['studies']):
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_samples = set(study_df['Sample Name'])
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                study_samples = set(study_df['Sample Name'])
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        assay_samples = set(assay_df['Sample Name'])
-                        if not assay_samples.issubset(study_samples):
-                            logger.error("(E) Some samples in an assay file {} are not declared in the study file {}: {}".format(assay_filename, study_filename, list(assay_samples - study_samples)))
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    assay_samples = set(assay_df['Sample Name'])
+                    if not assay_samples.issubset(study_samples):
+                        logger.error("(E) Some samples in an assay file {} are not declared in the study file {}: {}".format(assay_filename, study_filename, list(assay_samples - study_samples)))
                 except FileNotFoundError:
                     pass
 
 
-def check_protocol_usage(i_df, dir_context):
+def check_protocol_usage(i_df, dir_context, table_cache=None):
     """Used for rules 1007 and 1019"""
+    if table_cache is None:
+        table_cache = TableCache()
     for i, study_df in enumerate(i_df['studies']):
         protocols_declared = set(i_df['s_protocols'][i]['Study Protocol Name'].tolist())
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
                 protocol_refs_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
-                        protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
+                    protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
+                diff = list(protocol_refs_used - protocols_declared)
+                if len(diff) > 0:
+                    errors.append({
+                        "message": "Missing Protocol declaration",
+                        "supplemental": "protocols in study file {} are not declared in the investigation file: "
+                                        "{}".format(study_filename, diff),
+                        "code": 1007
+                    })
+                    logger.error(
+                        "(E) Some protocols used in a study file {} are not declared in the investigation file: "
+                        "{}".format(study_filename, diff))
+            except FileNotFoundError:
+                pass
+        for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
+            if assay_filename is not '':
+                try:
+                    protocol_refs_used = set()
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
+                        protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
                     protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
                     diff = list(protocol_refs_used - protocols_declared)
                     if len(diff) > 0:
@@ -1365,49 +1601,25 @@ def check_protocol_usage(i_df, dir_context):
                                             "{}".format(study_filename, diff),
                             "code": 1007
                         })
-                        logger.error(
-                            "(E) Some protocols used in a study file {} are not declared in the investigation file: "
-                            "{}".format(study_filename, diff))
-            except FileNotFoundError:
-                pass
-        for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
-            if assay_filename is not '':
-                try:
-                    protocol_refs_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
-                            protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
-                        protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
-                        diff = list(protocol_refs_used - protocols_declared)
-                        if len(diff) > 0:
-                            errors.append({
-                                "message": "Missing Protocol declaration",
-                                "supplemental": "protocols in study file {} are not declared in the investigation file: "
-                                                "{}".format(study_filename, diff),
-                                "code": 1007
-                            })
-                            logger.error("(E) Some protocols used in an assay file {} are not declared in the "
-                                         "investigation file: {}".format(assay_filename, diff))
+                        logger.error("(E) Some protocols used in an assay file {} are not declared in the "
+                                     "investigation file: {}".format(assay_filename, diff))
                 except FileNotFoundError:
                     pass
         # now collect all protocols in all assays to compare to declared protocols
         protocol_refs_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
-                        protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
+                    protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
-                            protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
+                        protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
                 except FileNotFoundError:
                     pass
         diff = protocols_declared - protocol_refs_used
@@ -1425,13 +1637,44 @@ def check_protocol_usage(i_df, dir_context):
 
 def load_table(fp):
     try:
-        df = pd.read_csv(fp, sep='\t', encoding='utf-8', comment='#')
+        df = read_table(fp, encoding='utf-8')
     except UnicodeDecodeError:
         logger.warning("Could not load file with UTF-8, trying ISO-8859-1")
-        df = pd.read_csv(fp, sep='\t', encoding='latin1', comment='#')
+        fp.seek(0)
+        df = read_table(fp, encoding='latin1')
     return df
 
 
+class TableCache(object):
+    """Parse-once cache of the study and assay table files read during a validation run
+
+    Tables are keyed by path and modification time, so that every rule reading the same file gets the same DataFrame
+    and a file is only parsed again if it changes. The cached DataFrames are shared and should not be modified.
+    """
+
+    def __init__(self):
+        self.__tables = dict()
+
+    def load(self, table_path):
+        """Loads a table file, parsing it only on first use
+
+        :param table_path: Path to the table file
+        :return: DataFrame of the table, as returned by load_table()
+        :raises FileNotFoundError: if the file does not exist
+        """
+        table_key = (os.path.abspath(table_path), os.path.getmtime(table_path))
+        try:
+            return self.__tables[table_key]
+        except KeyError:
+            with open(table_path, 'rb') as table_fp:
+                table = load_table(table_fp)
+            self.__tables[table_key] = table
+            return table
+
+    def __len__(self):
+        return len(self.__tables)
+
+
 def load_table_checks(fp):
 
     df = load_table(fp)
@@ -1545,62 +1788,60 @@ def load_table_checks(fp):
     return df
 
 
-def check_study_factor_usage(i_df, dir_context):
+def check_study_factor_usage(i_df, dir_context, table_cache=None):
     """Used for rules 1008 and 1021"""
+    if table_cache is None:
+        table_cache = TableCache()
     for i, study_df in enumerate(i_df['studies']):
         study_factors_declared = set(i_df['s_factors'][i]['Study Factor Name'].tolist())
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
                 study_factors_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
-                    for col in study_factor_ref_cols:
-                        fv = _RX_FACTOR_VALUE.findall(col)
-                        study_factors_used = study_factors_used.union(set(fv))
-                    if not study_factors_used.issubset(study_factors_declared):
-                        logger.error(
-                            "(E) Some factors used in an study file {} are not declared in the investigation file: {}".format(
-                                study_filename, list(study_factors_used - study_factors_declared)))
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
+                for col in study_factor_ref_cols:
+                    fv = _RX_FACTOR_VALUE.findall(col)
+                    study_factors_used = study_factors_used.union(set(fv))
+                if not study_factors_used.issubset(study_factors_declared):
+                    logger.error(
+                        "(E) Some factors used in an study file {} are not declared in the investigation file: {}".format(
+                            study_filename, list(study_factors_used - study_factors_declared)))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
                     study_factors_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
-                        for col in study_factor_ref_cols:
-                            fv = _RX_FACTOR_VALUE.findall(col)
-                            study_factors_used = study_factors_used.union(set(fv))
-                        if not study_factors_used.issubset(study_factors_declared):
-                            logger.error(
-                                "(E) Some factors used in an assay file {} are not declared in the investigation file: {}".format(
-                                    assay_filename, list(study_factors_used - study_factors_declared)))
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
+                    for col in study_factor_ref_cols:
+                        fv = _RX_FACTOR_VALUE.findall(col)
+                        study_factors_used = study_factors_used.union(set(fv))
+                    if not study_factors_used.issubset(study_factors_declared):
+                        logger.error(
+                            "(E) Some factors used in an assay file {} are not declared in the investigation file: {}".format(
+                                assay_filename, list(study_factors_used - study_factors_declared)))
                 except FileNotFoundError:
                     pass
         study_factors_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
-                    for col in study_factor_ref_cols:
-                        fv = _RX_FACTOR_VALUE.findall(col)
-                        study_factors_used = study_factors_used.union(set(fv))
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
+                for col in study_factor_ref_cols:
+                    fv = _RX_FACTOR_VALUE.findall(col)
+                    study_factors_used = study_factors_used.union(set(fv))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
-                        for col in study_factor_ref_cols:
-                            fv = _RX_FACTOR_VALUE.findall(col)
-                            study_factors_used = study_factors_used.union(set(fv))
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
+                    for col in study_factor_ref_cols:
+                        fv = _RX_FACTOR_VALUE.findall(col)
+                        study_factors_used = study_factors_used.union(set(fv))
                 except FileNotFoundError:
                     pass
         if len(study_factors_declared - study_factors_used) > 0:
@@ -1609,8 +1850,10 @@ def check_study_factor_usage(i_df, dir_context):
                     list(study_factors_declared - study_factors_used)))
 
 
-def check_protocol_parameter_usage(i_df, dir_context):
+def check_protocol_parameter_usage(i_df, dir_context, table_cache=None):
     """Used for rules 1009 and 1020"""
+    if table_cache is None:
+        table_cache = TableCache()
     for i, study_df in enumerate(i_df['studies']):
         protocol_parameters_declared = set()
         protocol_parameters_per_protocol = set(i_df['s_protocols'][i]['Study Protocol Parameters Name'].tolist())
@@ -1622,55 +1865,51 @@ def check_protocol_parameter_usage(i_df, dir_context):
         if study_filename is not '':
             try:
                 protocol_parameters_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                    for col in parameter_value_cols:
-                        pv = _RX_PARAMETER_VALUE.findall(col)
-                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
-                    if not protocol_parameters_used.issubset(protocol_parameters_declared):
-                        logger.error(
-                            "(E) Some protocol parameters referenced in an study file {} are not declared in the investigation file: {}".format(
-                                study_filename, list(protocol_parameters_used - protocol_parameters_declared)))
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                for col in parameter_value_cols:
+                    pv = _RX_PARAMETER_VALUE.findall(col)
+                    protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                if not protocol_parameters_used.issubset(protocol_parameters_declared):
+                    logger.error(
+                        "(E) Some protocol parameters referenced in an study file {} are not declared in the investigation file: {}".format(
+                            study_filename, list(protocol_parameters_used - protocol_parameters_declared)))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
                     protocol_parameters_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                        for col in parameter_value_cols:
-                            pv = _RX_PARAMETER_VALUE.findall(col)
-                            protocol_parameters_used = protocol_parameters_used.union(set(pv))
-                        if not protocol_parameters_used.issubset(protocol_parameters_declared):
-                            logger.error(
-                                "(E) Some protocol parameters referenced in an assay file {} are not declared in the investigation file: {}".format(
-                                    assay_filename, list(protocol_parameters_used - protocol_parameters_declared)))
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                    for col in parameter_value_cols:
+                        pv = _RX_PARAMETER_VALUE.findall(col)
+                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                    if not protocol_parameters_used.issubset(protocol_parameters_declared):
+                        logger.error(
+                            "(E) Some protocol parameters referenced in an assay file {} are not declared in the investigation file: {}".format(
+                                assay_filename, list(protocol_parameters_used - protocol_parameters_declared)))
                 except FileNotFoundError:
                     pass
         # now collect all protocol parameters in all assays to compare to declared protocol parameters
         protocol_parameters_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                    for col in parameter_value_cols:
-                        pv = _RX_PARAMETER_VALUE.findall(col)
-                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                study_df = table_cache.load(os.path.join(dir_context, study_filename))
+                parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                for col in parameter_value_cols:
+                    pv = _RX_PARAMETER_VALUE.findall(col)
+                    protocol_parameters_used = protocol_parameters_used.union(set(pv))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                        for col in parameter_value_cols:
-                            pv = _RX_PARAMETER_VALUE.findall(col)
-                            protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                    assay_df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                    for col in parameter_value_cols:
+                        pv = _RX_PARAMETER_VALUE.findall(col)
+                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
                 except FileNotFoundError:
                     pass
         if len(protocol_parameters_declared - protocol_parameters_used) > 0:
@@ -1740,118 +1979,118 @@ def check_term_source_refs_in_investigation(i_df):
         check_study_term_sources_in_secton_field('s_contacts', i, 'Study Person Roles Term Source REF')
 
 
-def check_term_source_refs_in_assay_tables(i_df, dir_context):
+def check_term_source_refs_in_assay_tables(i_df, dir_context, table_cache=None):
     """Used for rules 3007 and 3009"""
+    if table_cache is None:
+        table_cache = TableCache()
     import math
     ontology_sources_list = set(get_ontology_source_refs(i_df))
     for i, study_df in enumerate(i_df['studies']):
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    df = load_table(s_fp)
-                    columns = df.columns
-                    object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
-                    prev_i = object_index[0]
-                    object_columns_list = [columns[prev_i]]
-                    for curr_i in object_index:  # collect each object's columns
-                        if prev_i == curr_i:
-                            pass  # skip if there's no diff, i.e. first one
-                        else:
-                            object_columns_list.append(columns[curr_i])
-                        prev_i = curr_i
-                    for x, col in enumerate(object_columns_list):
-                        for y, row in enumerate(df[col]):
-                            if row not in ontology_sources_list:
-                                if isinstance(row, float):
-                                    if not math.isnan(row):
-                                        warnings.append({
-                                            "message": "Missing Term Source",
-                                            "supplemental": "Ontology sources missing {} at column position {} and row {} "
-                                                            "in {} not declared in ontology "
-                                                            "sources {}".format(row+1, object_index[x], y+1, study_filename,
-                                                                                list(ontology_sources_list)),
-                                            "code": 3009
-                                        })
-                                        logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not "
-                                                    "declared in ontology sources {}".format(row+1, object_index[x], y+1,
-                                                                                             study_filename,
-                                                                                             list(ontology_sources_list)))
-                                else:
+                df = table_cache.load(os.path.join(dir_context, study_filename))
+                columns = df.columns
+                object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
+                prev_i = object_index[0]
+                object_columns_list = [columns[prev_i]]
+                for curr_i in object_index:  # collect each object's columns
+                    if prev_i == curr_i:
+                        pass  # skip if there's no diff, i.e. first one
+                    else:
+                        object_columns_list.append(columns[curr_i])
+                    prev_i = curr_i
+                for x, col in enumerate(object_columns_list):
+                    for y, row in enumerate(df[col]):
+                        if row not in ontology_sources_list:
+                            if isinstance(row, float):
+                                if not math.isnan(row):
                                     warnings.append({
                                         "message": "Missing Term Source",
                                         "supplemental": "Ontology sources missing {} at column position {} and row {} "
                                                         "in {} not declared in ontology "
-                                                        "sources {}".format(row + 1, object_index[x], y + 1, study_filename,
+                                                        "sources {}".format(row+1, object_index[x], y+1, study_filename,
                                                                             list(ontology_sources_list)),
                                         "code": 3009
                                     })
-                                    logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not in "
-                                                "declared ontology sources {}"
-                                                .format(row+1, object_index[x], y+1, study_filename,
-                                                        list(ontology_sources_list)))
+                                    logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not "
+                                                "declared in ontology sources {}".format(row+1, object_index[x], y+1,
+                                                                                         study_filename,
+                                                                                         list(ontology_sources_list)))
+                            else:
+                                warnings.append({
+                                    "message": "Missing Term Source",
+                                    "supplemental": "Ontology sources missing {} at column position {} and row {} "
+                                                    "in {} not declared in ontology "
+                                                    "sources {}".format(row + 1, object_index[x], y + 1, study_filename,
+                                                                        list(ontology_sources_list)),
+                                    "code": 3009
+                                })
+                                logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not in "
+                                            "declared ontology sources {}"
+                                            .format(row+1, object_index[x], y+1, study_filename,
+                                                    list(ontology_sources_list)))
             except FileNotFoundError:
                 pass
             for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
                 if assay_filename is not '':
                     try:
-                        with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                            df = load_table(a_fp)
-                            columns = df.columns
-                            object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
-                            prev_i = object_index[0]
-                            object_columns_list = [columns[prev_i]]
-                            for curr_i in object_index:  # collect each object's columns
-                                if prev_i == curr_i:
-                                    pass  # skip if there's no diff, i.e. first one
-                                else:
-                                    object_columns_list.append(columns[curr_i])
-                                prev_i = curr_i
-                            for x, col in enumerate(object_columns_list):
-                                for y, row in enumerate(df[col]):
-                                    if row not in ontology_sources_list:
-                                        if isinstance(row, float):
-                                            if not math.isnan(row):
-                                                warnings.append({
-                                                    "message": "Missing Term Source",
-                                                    "supplemental": "Ontology sources missing {} at column position {} and "
-                                                                    "row {} in {} not declared in ontology sources {}"
-                                                        .format(row + 1, object_index[x], y + 1, study_filename,
-                                                                list(ontology_sources_list)),
-                                                    "code": 3009
-                                                })
-                                                logger.warn("(W) Term Source REF {} at column position {} and row {} in {} "
-                                                            "not declared in ontology sources {}"
-                                                            .format(row+1, object_index[x], y+1, study_filename,
-                                                                    list(ontology_sources_list)))
-                                        else:
+                        df = table_cache.load(os.path.join(dir_context, assay_filename))
+                        columns = df.columns
+                        object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
+                        prev_i = object_index[0]
+                        object_columns_list = [columns[prev_i]]
+                        for curr_i in object_index:  # collect each object's columns
+                            if prev_i == curr_i:
+                                pass  # skip if there's no diff, i.e. first one
+                            else:
+                                object_columns_list.append(columns[curr_i])
+                            prev_i = curr_i
+                        for x, col in enumerate(object_columns_list):
+                            for y, row in enumerate(df[col]):
+                                if row not in ontology_sources_list:
+                                    if isinstance(row, float):
+                                        if not math.isnan(row):
                                             warnings.append({
                                                 "message": "Missing Term Source",
-                                                "supplemental": "Ontology sources missing {} at column position {} and row "
-                                                                "{} in {} not declared in ontology sources {}"
+                                                "supplemental": "Ontology sources missing {} at column position {} and "
+                                                                "row {} in {} not declared in ontology sources {}"
                                                     .format(row + 1, object_index[x], y + 1, study_filename,
                                                             list(ontology_sources_list)),
                                                 "code": 3009
                                             })
-                                            logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not "
-                                                        "in declared ontology sources {}"
+                                            logger.warn("(W) Term Source REF {} at column position {} and row {} in {} "
+                                                        "not declared in ontology sources {}"
                                                         .format(row+1, object_index[x], y+1, study_filename,
                                                                 list(ontology_sources_list)))
+                                    else:
+                                        warnings.append({
+                                            "message": "Missing Term Source",
+                                            "supplemental": "Ontology sources missing {} at column position {} and row "
+                                                            "{} in {} not declared in ontology sources {}"
+                                                .format(row + 1, object_index[x], y + 1, study_filename,
+                                                        list(ontology_sources_list)),
+                                            "code": 3009
+                                        })
+                                        logger.warn("(W) Term Source REF {} at column position {} and row {} in {} not "
+                                                    "in declared ontology sources {}"
+                                                    .format(row+1, object_index[x], y+1, study_filename,
+                                                            list(ontology_sources_list)))
                     except FileNotFoundError:
                         pass
 
 
-def check_term_source_refs_usage(i_df, dir_context):
+def check_term_source_refs_usage(i_df, dir_context, table_cache=None):
     check_term_source_refs_in_investigation(i_df)
-    check_term_source_refs_in_assay_tables(i_df, dir_context)
+    check_term_source_refs_in_assay_tables(i_df, dir_context, table_cache)
 
 
-def load_config(config_dir):
+def load_config(config_dir, cache_dir=None):
     """Rule 4001"""
     from isatools.io import isatab_configurator
     configs = None
     try:
-        configs = isatab_configurator.load(config_dir)
+        configs = isatab_configurator.load(config_dir, cache_dir=cache_dir)
     except FileNotFoundError:
         errors.append({
             "message": "Configurations could not be loaded",
@@ -1946,7 +2185,7 @@ def check_investigation_against_config(i_df, configs):
                                     "(W) A property value in {} of investigation file at column {} is required".format(
                                         col, x + 1))
 
-    required_fields = [i.header for i in configs[('[investigation]', '')].get_isatab_configuration()[0].get_field() if i.is_required]
+    required_fields = configs[('[investigation]', '')].required_headers
     check_section_against_required_fields_one_value(i_df['investigation'], required_fields)
     check_section_against_required_fields_one_value(i_df['i_publications'], required_fields)
     check_section_against_required_fields_one_value(i_df['i_contacts'], required_fields)
@@ -1974,8 +2213,8 @@ def check_study_table_against_config(s_df, protocols_declared, config):
                                                               'Derived Spectral Data File',
                                                               'Derived Array Data File'] or 'Protocol REF' in i or
                     'Characteristics[' in i or 'Factor Value[' in i or 'Parameter Value[ in i']
-    fields = [i.header for i in config.get_isatab_configuration()[0].get_field()]
-    protocols = [(i.pos, i.protocol_type) for i in config.get_isatab_configuration()[0].get_protocol_field()]
+    fields = list(config.headers)
+    protocols = [(i.pos, i.protocol_type) for i in config.protocol_fields]
     for protocol in protocols:
         fields.insert(protocol[0], 'Protocol REF')
     # strip out non-config columns
@@ -2017,8 +2256,8 @@ def check_assay_table_against_config(s_df, config):
                                                               'Derived Spectral Data File',
                                                               'Derived Array Data File', 'Assay Name'] or 'Protocol REF' in i or
                     'Characteristics[' in i or 'Factor Value[' in i or 'Parameter Value[ in i' or 'Comment[' in i]
-    fields = [i.header for i in config.get_isatab_configuration()[0].get_field()]
-    protocols = [(i.pos, i.protocol_type) for i in config.get_isatab_configuration()[0].get_protocol_field()]
+    fields = list(config.headers)
+    protocols = [(i.pos, i.protocol_type) for i in config.protocol_fields]
     for protocol in protocols:
         fields.insert(protocol[0], 'Protocol REF')
     # strip out non-config columns
@@ -2049,10 +2288,46 @@ def cell_has_value(cell):
             return True
 
 
+def get_flagged_rows(column_values, passes):
+    """Gets the rows of a column whose cells do not pass a check silently
+
+    The check is evaluated once per distinct cell value rather than once per cell. A check that raises counts as not
+    passing, so that the rule reporting on the flagged rows can raise in turn.
+
+    :param column_values: The cell values of a column, or tuples of the cell values of several columns, by row
+    :param passes: Function of a cell value returning True if the cell raises no warning and does not fail the rule
+    :return: list of the flagged row positions, in order
+    """
+    def evaluate(cell_value):
+        try:
+            return bool(passes(cell_value))
+        except Exception:
+            return False
+
+    results = dict()
+    nan_result = None
+    flagged_rows = list()
+    for irow, cell_value in enumerate(column_values):
+        if isinstance(cell_value, float) and math.isnan(cell_value):
+            if nan_result is None:
+                nan_result = evaluate(cell_value)
+            passed = nan_result
+        else:
+            try:
+                passed = results[cell_value]
+            except KeyError:
+                passed = results[cell_value] = evaluate(cell_value)
+            except TypeError:  # unhashable
+                passed = evaluate(cell_value)
+        if not passed:
+            flagged_rows.append(irow)
+    return flagged_rows
+
+
 def check_assay_table_with_config(df, config, filename, protocol_names_and_types):
     columns = list(df.columns)
     # Get required headers from config and check if they are present in the table; Rule 4010
-    required_fields = [i.header for i in config.get_isatab_configuration()[0].get_field() if i.is_required]
+    required_fields = config.required_headers
     for required_field in required_fields:
         if required_field not in columns:
             warnings.append({
@@ -2092,8 +2367,10 @@ def check_assay_table_with_config(df, config, filename, protocol_names_and_types
             prots_ok = False
 
 
-def check_study_assay_tables_against_config(i_df, dir_context, configs):
+def check_study_assay_tables_against_config(i_df, dir_context, configs, table_cache=None):
     """Used for rules 4003-4008"""
+    if table_cache is None:
+        table_cache = TableCache()
     for i, study_df in enumerate(i_df['studies']):
         study_filename = study_df.iloc[0]['Study File Name']
         protocol_names = i_df['s_protocols'][i]['Study Protocol Name'].tolist()
@@ -2101,11 +2378,10 @@ def check_study_assay_tables_against_config(i_df, dir_context, configs):
         protocol_names_and_types = dict(zip(protocol_names, protocol_types))
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    df = load_table(s_fp)
-                    config = configs[('[Sample]', '')]
-                    logger.info("Checking study file {} against default study table configuration...".format(study_filename))
-                    check_assay_table_with_config(df, config, study_filename, protocol_names_and_types)
+                df = table_cache.load(os.path.join(dir_context, study_filename))
+                config = configs[('[Sample]', '')]
+                logger.info("Checking study file {} against default study table configuration...".format(study_filename))
+                check_assay_table_with_config(df, config, study_filename, protocol_names_and_types)
             except FileNotFoundError:
                 pass
         for j, assay_df in enumerate(i_df['s_assays']):
@@ -2114,13 +2390,12 @@ def check_study_assay_tables_against_config(i_df, dir_context, configs):
             technology_type = assay_df['Study Assay Technology Type'].tolist()[0]
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        df = load_table(a_fp)
-                        config = configs[(measurement_type, technology_type)]
-                        logger.info(
-                            "Checking assay file {} against default table configuration ({}, {})...".format(assay_filename, measurement_type, technology_type))
-                        check_assay_table_with_config(df, config, assay_filename, protocol_names_and_types)
-                        # check_assay_table_with_config(df, protocols, config, assay_filename)
+                    df = table_cache.load(os.path.join(dir_context, assay_filename))
+                    config = configs[(measurement_type, technology_type)]
+                    logger.info(
+                        "Checking assay file {} against default table configuration ({}, {})...".format(assay_filename, measurement_type, technology_type))
+                    check_assay_table_with_config(df, config, assay_filename, protocol_names_and_types)
+                    # check_assay_table_with_config(df, protocols, config, assay_filename)
                 except FileNotFoundError:
                     pass
         # TODO: Check protocol usage - Rule 4009
@@ -2141,8 +2416,9 @@ def check_factor_value_presence(table):
 
 
 def check_required_fields(table, cfg):
-    for fheader in [i.header for i in cfg.get_isatab_configuration()[0].get_field() if i.is_required]:
-        found_field = [i for i in table.columns if i.lower() == fheader.lower()]
+    lower_columns = [i.lower() for i in table.columns]
+    for fheader in cfg.required_headers:
+        found_field = [i for i in lower_columns if i == fheader.lower()]
         if len(found_field) == 0:
             warnings.append({
                 "message": "A required column in assay table is not present",
@@ -2254,14 +2530,49 @@ def check_field_values(table, cfg):
                 logger.warn("(W) Value must be one of: " + cfg_field.list_values)
         return is_valid_value
 
+    def passes_silently(cell_value, cfg_field):
+        # True where check_single_field() would return True without raising a warning
+        if isinstance(cell_value, float) and math.isnan(cell_value) or \
+                isinstance(cell_value, str) and cell_value.strip() == '':
+            return not cfg_field.is_required
+        data_type = cfg_field.data_type.lower().strip()
+        if data_type in ['', 'string', 'ontology-term', 'ontology term']:
+            return True
+        if 'boolean' == data_type:
+            return cell_value.strip() in ('true', 'false')
+        elif 'date' == data_type:
+            try:
+                iso8601.parse_date(cell_value)
+            except iso8601.ParseError:
+                return False
+        elif 'integer' == data_type:
+            int(cell_value)
+        elif 'float' == data_type:
+            float(cell_value)
+        elif data_type == 'list':
+            if cfg_field.header not in list_values:
+                list_values[cfg_field.header] = set([i.lower() for i in cfg_field.list_values.split(',')])
+            return cell_value.lower() in list_values[cfg_field.header]
+        else:
+            return False
+        return True
+
+    # the cells are checked column by column, only reporting on the cells that do not pass silently; these are then
+    # reported on in row order, stopping at the first invalid cell, as a check going row by row would do
+    flagged_cells = list()
+    list_values = dict()
+    for icol, header in enumerate(table.columns):
+        cfield = cfg.get_field_by_header(header)
+        if cfield is not None:
+            for irow in get_flagged_rows(table.iloc[:, icol].tolist(), lambda v: passes_silently(v, cfield)):
+                flagged_cells.append((irow, icol, cfield))
+    flagged_cells.sort(key=lambda cell: cell[:2])
+
     result = True
-    for irow in range(len(table.index)):
-        ncols = len(table.columns)
-        for icol in range(0, ncols):
-            cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == table.columns[icol]]
-            if len(cfields) == 1:
-                cfield = cfields[0]
-                result = result and check_single_field(table.iloc[irow][cfield.header], cfield)
+    for irow, icol, cfield in flagged_cells:
+        result = check_single_field(table.iloc[irow][cfield.header], cfield)
+        if not result:
+            break
     return result
 
 
@@ -2280,14 +2591,12 @@ def check_unit_field(table, cfg):
 
     result = True
     for icol, header in enumerate(table.columns):
-        cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == header]
-        if len(cfields) != 1:
+        cfield = cfg.get_field_by_header(header)
+        if cfield is None:
             continue
-        cfield = cfields[0]
-        ucfields = [i for i in cfg.get_isatab_configuration()[0].get_unit_field() if i.pos == cfield.pos + 1]
-        if len(ucfields) != 1:
+        ucfield = cfg.get_unit_field_by_pos(cfield.pos + 1)
+        if ucfield is None:
             continue
-        ucfield = ucfields[0]
         if ucfield.is_required:
             rheader = None
             rindx = icol + 1
@@ -2303,10 +2612,14 @@ def check_unit_field(table, cfg):
                 logger.warn("(W) The field '" + header + "' in the file '" + table.filename +
                             "' misses a required 'Unit' column")
                 result = False
-            else:
-                for irow in range(len(table.index)):
-                    result = result and check_unit_value(table.iloc[irow][icol], table.iloc[irow][rindx],
-                                                         cfield, table.filename)
+            elif result:
+                # any cell with a value or a unit fails the rule, so only the first one is reported
+                flagged_rows = get_flagged_rows(
+                    zip(table.iloc[:, icol].tolist(), table.iloc[:, rindx].tolist()),
+                    lambda v: not cell_has_value(v[0]) and not cell_has_value(v[1]))
+                if len(flagged_rows) > 0:
+                    irow = flagged_rows[0]
+                    result = check_unit_value(table.iloc[irow][icol], table.iloc[irow][rindx], cfield, table.filename)
     return result
 
 
@@ -2341,18 +2654,10 @@ def check_protocol_fields(table, cfg, proto_map):
         if last_proto_indx > last_mat_or_dat_indx:
             logger.warn("(W) Protocol REF column without output in file '" + table.filename + "'")
         for left, right in pairwise(field_headers):
-            cleft = None
-            cright = None
-            clefts = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header.lower() == left.lower()]
-            if len(clefts) == 1:
-                cleft = clefts[0]
-            crights = [i for i in cfg.get_isatab_configuration()[0].get_field() if
-                       i.header.lower() == right.lower()]
-            if len(crights) == 1:
-                cright = crights[0]
+            cleft = cfg.get_field_by_lower_header(left)
+            cright = cfg.get_field_by_lower_header(right)
             if cleft is not None and cright is not None:
-                cprotos = [i.protocol_type for i in cfg.get_isatab_configuration()[0].get_protocol_field() if
-                           cleft.pos < i.pos and cright.pos > i.pos]
+                cprotos = cfg.get_protocol_types_between(cleft.pos, cright.pos)
                 fprotos_headers = [i for i in table.columns[
                                               table.columns.get_loc(cleft.header):table.columns.get_loc(
                                                   cright.header)] if
@@ -2410,10 +2715,9 @@ def check_ontology_fields(table, cfg):
     result = True
     nfields = len(table.columns)
     for icol, header in enumerate(table.columns):
-        cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == header]
-        if len(cfields) != 1:
+        cfield = cfg.get_field_by_header(header)
+        if cfield is None:
             continue
-        cfield = cfields[0]
         if cfield.get_recommended_ontologies() is None:
             continue
         rindx = icol + 1
@@ -2430,9 +2734,15 @@ def check_ontology_fields(table, cfg):
             result = False
             continue
 
-        for irow in range(len(table.index)):
-            result = result and check_single_field(table.iloc[irow][icol], table.iloc[irow][rindx],
-                                                   table.iloc[irow][rrindx], cfield, table.filename)
+        if result:
+            # any incomplete annotation fails the rule, so only the first one is reported
+            flagged_rows = get_flagged_rows(
+                zip(table.iloc[:, icol].tolist(), table.iloc[:, rindx].tolist(), table.iloc[:, rrindx].tolist()),
+                lambda v: not cell_has_value(v[0]) and not cell_has_value(v[1]) and not cell_has_value(v[2]))
+            if len(flagged_rows) > 0:
+                irow = flagged_rows[0]
+                result = check_single_field(table.iloc[irow][icol], table.iloc[irow][rindx],
+                                            table.iloc[irow][rrindx], cfield, table.filename)
 
     return result
 
@@ -2441,59 +2751,52 @@ BASE_DIR = os.path.dirname(__file__)
 default_config_dir = os.path.join(BASE_DIR, 'config', 'xml')
 
 
-def validate(fp, config_dir=default_config_dir, log_level=logging.INFO):
-    global errors
-    global warnings
-    errors = list()
-    warnings = list()
-    logger.setLevel(log_level)
-    logger.info("ISA tab Validator from ISA tools API v0.6")
-    from io import StringIO
-    stream = StringIO()
-    handler = logging.StreamHandler(stream)
-    logger.addHandler(handler)
+def validate(fp, config_dir=default_config_dir, log_level=logging.INFO, config_cache_dir=None):
     validation_finished = False
-    try:
-        # check_utf8(fp)  # skip as does not correctly report right now
-        logger.info("Loading... {}".format(fp.name))
-        i_df = load_investigation(fp=fp)
-        logger.info("Running prechecks...")
-        check_filenames_present(i_df)  # Rule 3005
-        check_table_files_read(i_df, os.path.dirname(fp.name))  # Rules 0006 and 0008
-        # check_table_files_load(i_df, os.path.dirname(fp.name))  # Rules 0007 and 0009, covered by later validation?
-        check_samples_not_declared_in_study_used_in_assay(i_df, os.path.dirname(fp.name))  # Rule 1003
-        check_study_factor_usage(i_df, os.path.dirname(fp.name))  # Rules 1008 and 1021
-        check_protocol_usage(i_df, os.path.dirname(fp.name))  # Rules 1007 and 1019
-        check_protocol_parameter_usage(i_df, os.path.dirname(fp.name))  # Rules 1009 and 1020
-        check_date_formats(i_df)  # Rule 3001
-        check_dois(i_df)  # Rule 3002
-        check_pubmed_ids_format(i_df)  # Rule 3003
-        check_protocol_names(i_df)  # Rule 1010
-        check_protocol_parameter_names(i_df)  # Rule 1011
-        check_study_factor_names(i_df)  # Rule 1012
-        check_ontology_sources(i_df)  # Rule 3008
-        logger.info("Finished prechecks...")
-        logger.info("Loading configurations found in {}".format(config_dir))
-        configs = load_config(config_dir)  # Rule 4001
-        if configs is None:
-            raise SystemError("No configuration to load so cannot proceed with validation!")
-        logger.info("Using configurations found in {}".format(config_dir))
-        check_measurement_technology_types(i_df, configs)  # Rule 4002
-        logger.info("Checking investigation file against configuration...")
-        check_investigation_against_config(i_df, configs)  # Rule 4003 for investigation file only
-        logger.info("Finished checking investigation file")
-        for i, study_df in enumerate(i_df['studies']):
-            study_filename = study_df.iloc[0]['Study File Name']
-            study_sample_table = None
-            assay_tables = list()
-            if study_filename is not '':
-                protocol_names = i_df['s_protocols'][i]['Study Protocol Name'].tolist()
-                protocol_types = i_df['s_protocols'][i]['Study Protocol Type'].tolist()
-                protocol_names_and_types = dict(zip(protocol_names, protocol_types))
-                try:
-                    logger.info("Loading... {}".format(study_filename))
-                    with open(os.path.join(os.path.dirname(fp.name), study_filename), encoding='utf-8') as s_fp:
-                        study_sample_table = load_table(s_fp)
+    # the check functions report into the context current in this thread
+    with ValidationContext(log_level=log_level) as context:
+        logger.info("ISA tab Validator from ISA tools API v0.6")
+        table_cache = TableCache()  # each table file is parsed once and shared by all the checks below
+        try:
+            # check_utf8(fp)  # skip as does not correctly report right now
+            logger.info("Loading... {}".format(fp.name))
+            i_df = load_investigation(fp=fp)
+            logger.info("Running prechecks...")
+            check_filenames_present(i_df)  # Rule 3005
+            check_table_files_read(i_df, os.path.dirname(fp.name))  # Rules 0006 and 0008
+            # check_table_files_load(i_df, os.path.dirname(fp.name))  # Rules 0007 and 0009, covered by later validation?
+            check_samples_not_declared_in_study_used_in_assay(i_df, os.path.dirname(fp.name), table_cache)  # Rule 1003
+            check_study_factor_usage(i_df, os.path.dirname(fp.name), table_cache)  # Rules 1008 and 1021
+            check_protocol_usage(i_df, os.path.dirname(fp.name), table_cache)  # Rules 1007 and 1019
+            check_protocol_parameter_usage(i_df, os.path.dirname(fp.name), table_cache)  # Rules 1009 and 1020
+            check_date_formats(i_df)  # Rule 3001
+            check_dois(i_df)  # Rule 3002
+            check_pubmed_ids_format(i_df)  # Rule 3003
+            check_protocol_names(i_df)  # Rule 1010
+            check_protocol_parameter_names(i_df)  # Rule 1011
+            check_study_factor_names(i_df)  # Rule 1012
+            check_ontology_sources(i_df)  # Rule 3008
+            logger.info("Finished prechecks...")
+            logger.info("Loading configurations found in {}".format(config_dir))
+            configs = load_config(config_dir, cache_dir=config_cache_dir)  # Rule 4001
+            if configs is None:
+                raise SystemError("No configuration to load so cannot proceed with validation!")
+            logger.info("Using configurations found in {}".format(config_dir))
+            check_measurement_technology_types(i_df, configs)  # Rule 4002
+            logger.info("Checking investigation file against configuration...")
+            check_investigation_against_config(i_df, configs)  # Rule 4003 for investigation file only
+            logger.info("Finished checking investigation file")
+            for i, study_df in enumerate(i_df['studies']):
+                study_filename = study_df.iloc[0]['Study File Name']
+                study_sample_table = None
+                assay_tables = list()
+                if study_filename is not '':
+                    protocol_names = i_df['s_protocols'][i]['Study Protocol Name'].tolist()
+                    protocol_types = i_df['s_protocols'][i]['Study Protocol Type'].tolist()
+                    protocol_names_and_types = dict(zip(protocol_names, protocol_types))
+                    try:
+                        logger.info("Loading... {}".format(study_filename))
+                        study_sample_table = table_cache.load(os.path.join(os.path.dirname(fp.name), study_filename))
                         study_sample_table.filename = study_filename
                         config = configs[('[Sample]', '')]
                         logger.info(
@@ -2519,27 +2822,26 @@ def validate(fp, config_dir=default_config_dir, log_level=logging.INFO):
                             logger.warn("(W) There are some ontology annotation inconsistencies in {} against {} "
                                         "configuration".format(study_sample_table.filename, 'Study Sample'))
                         logger.info("Finished validation on {}".format(study_filename))
-                except FileNotFoundError:
-                    pass
-                assay_df = i_df['s_assays'][i]
-                for x, assay_filename in enumerate(assay_df['Study Assay File Name'].tolist()):
-                    measurement_type = assay_df['Study Assay Measurement Type'].tolist()[x]
-                    technology_type = assay_df['Study Assay Technology Type'].tolist()[x]
-                    if assay_filename is not '':
-                        try:
-                            config = configs[(measurement_type, technology_type)]
-                        except KeyError:
-                            logger.error("Could not load config matching ({}, {})".format(measurement_type, technology_type))
-                            logger.error("Only have configs matching:")
-                            for k in configs.keys():
-                                logger.error(k)
-                        if config is None:
-                            logger.warn("Skipping configuration validation as could not load config...")
-                        else:
+                    except FileNotFoundError:
+                        pass
+                    assay_df = i_df['s_assays'][i]
+                    for x, assay_filename in enumerate(assay_df['Study Assay File Name'].tolist()):
+                        measurement_type = assay_df['Study Assay Measurement Type'].tolist()[x]
+                        technology_type = assay_df['Study Assay Technology Type'].tolist()[x]
+                        if assay_filename is not '':
                             try:
-                                logger.info("Loading... {}".format(assay_filename))
-                                with open(os.path.join(os.path.dirname(fp.name), assay_filename), encoding='utf-8') as a_fp:
-                                    assay_table = load_table(a_fp)
+                                config = configs[(measurement_type, technology_type)]
+                            except KeyError:
+                                logger.error("Could not load config matching ({}, {})".format(measurement_type, technology_type))
+                                logger.error("Only have configs matching:")
+                                for k in configs.keys():
+                                    logger.error(k)
+                            if config is None:
+                                logger.warn("Skipping configuration validation as could not load config...")
+                            else:
+                                try:
+                                    logger.info("Loading... {}".format(assay_filename))
+                                    assay_table = table_cache.load(os.path.join(os.path.dirname(fp.name), assay_filename))
                                     assay_table.filename = assay_filename
                                     assay_tables.append(assay_table)
                                     logger.info(
@@ -2568,68 +2870,69 @@ def validate(fp, config_dir=default_config_dir, log_level=logging.INFO):
                                         logger.warn("(W) There are some ontology annotation inconsistencies in {} against {} "
                                                     "configuration".format(assay_table.filename, (measurement_type, technology_type)))
                                     logger.info("Finished validation on {}".format(assay_filename))
-                            except FileNotFoundError:
-                                pass
-            if study_sample_table is not None:
-                logger.info("Checking consistencies between study sample table and assay tables...")
-                check_sample_names(study_sample_table, assay_tables)
-                logger.info("Finished checking study sample table against assay tables...")
-            if len(errors) != 0:
-                logger.info("Skipping pooling test as there are outstanding errors")
-            else:
-                from isatools import utils
-                try:
-                    fp.seek(0)
-                    utils.detect_isatab_process_pooling(fp)
-                except:
-                    pass
-        logger.info("Finished validation...")
-        validation_finished = True
-    except CParserError as cpe:
-        errors.append({
-            "message": "Unknown/System Error",
-            "supplemental": "The validator could not identify what the error is: {}".format(str(cpe)),
-            "code": 0
-        })
-        logger.fatal("(F) There was an error when trying to parse the ISA tab")
-        logger.fatal(cpe)
-    except ValueError as ve:
-        errors.append({
-            "message": "Unknown/System Error",
-            "supplemental": "The validator could not identify what the error is: {}".format(str(ve)),
-            "code": 0
-        })
-        logger.fatal("(F) There was an error when trying to parse the ISA tab")
-        logger.fatal(ve)
-    except SystemError as se:
-        errors.append({
-            "message": "Unknown/System Error",
-            "supplemental": "The validator could not identify what the error is: {}".format(str(se)),
-            "code": 0
-        })
-        logger.fatal("(F) Something went very very wrong! :(")
-        logger.fatal(se)
-    except Exception as e:
-        errors.append({
-            "message": "Unknown/System Error",
-            "supplemental": "The validator could not identify what the error is: {}".format(str(e)),
-            "code": 0
-        })
-        logger.fatal("(F) Something went very very wrong! :(")
-        logger.fatal(e)
-    finally:
-        handler.flush()
-        return {
-            "errors": errors,
-            "warnings": warnings,
-            "validation_finished": validation_finished
-        }
+                                except FileNotFoundError:
+                                    pass
+                if study_sample_table is not None:
+                    logger.info("Checking consistencies between study sample table and assay tables...")
+                    check_sample_names(study_sample_table, assay_tables)
+                    logger.info("Finished checking study sample table against assay tables...")
+                if len(errors) != 0:
+                    logger.info("Skipping pooling test as there are outstanding errors")
+                else:
+                    from isatools import utils
+                    try:
+                        fp.seek(0)
+                        utils.detect_isatab_process_pooling(fp)
+                    except Exception:
+                        pass
+            logger.info("Finished validation...")
+            validation_finished = True
+        except CParserError as cpe:
+            errors.append({
+                "message": "Unknown/System Error",
+                "supplemental": "The validator could not identify what the error is: {}".format(str(cpe)),
+                "code": 0
+            })
+            logger.fatal("(F) There was an error when trying to parse the ISA tab")
+            logger.fatal(cpe)
+        except ValueError as ve:
+            errors.append({
+                "message": "Unknown/System Error",
+                "supplemental": "The validator could not identify what the error is: {}".format(str(ve)),
+                "code": 0
+            })
+            logger.fatal("(F) There was an error when trying to parse the ISA tab")
+            logger.fatal(ve)
+        except SystemError as se:
+            errors.append({
+                "message": "Unknown/System Error",
+                "supplemental": "The validator could not identify what the error is: {}".format(str(se)),
+                "code": 0
+            })
+            logger.fatal("(F) Something went very very wrong! :(")
+            logger.fatal(se)
+        except Exception as e:
+            errors.append({
+                "message": "Unknown/System Error",
+                "supplemental": "The validator could not identify what the error is: {}".format(str(e)),
+                "code": 0
+            })
+            logger.fatal("(F) Something went very very wrong! :(")
+            logger.fatal(e)
+        finally:
+            return context.report(validation_finished)
 
 
-def batch_validate(tab_dir_list):
+def batch_validate(tab_dir_list, max_workers=1, timeout=None, config_dir=default_config_dir, config_cache_dir=None):
     """ Validate a batch of ISA-Tab archives
     :param tab_dir_list: List of file paths to the ISA-Tab archives to validate
-    :return: batch report as JSON
+    :param max_workers: Number of processes to validate the archives in. With 1, and no timeout, they are validated one
+    after another in this process
+    :param timeout: Seconds after which the validation of an archive is abandoned, or None to let each one finish. It is
+    only applied in worker processes, so with a timeout the archives are always validated in worker processes
+    :param config_dir: Path to the directory of XML configurations to validate against
+    :param config_cache_dir: Optional path to a directory in which to cache the parsed configurations
+    :return: batch report as JSON, with the archives' reports in the order of tab_dir_list
 
     Example:
         from isatools import isatab
@@ -2637,27 +2940,165 @@ def batch_validate(tab_dir_list):
             '/path/to/study1/',
             '/path/to/study2/'
         ]
-        batch_report = isatab.batch_validate(my_tabs, '/path/to/report.txt')
+        batch_report = isatab.batch_validate(my_tabs, max_workers=4, timeout=600)
     """
     batch_report = {
         "batch_report": []
     }
+    i_file_paths = list()
     for tab_dir in tab_dir_list:
-        logger.info("***Validating {}***\n".format(tab_dir))
         i_files = glob.glob(os.path.join(tab_dir, 'i_*.txt'))
         if len(i_files) != 1:
             logger.warn("Could not find an investigation file, skipping {}".format(tab_dir))
         else:
-            with open(i_files[0], encoding='utf-8') as fp:
-                batch_report['batch_report'].append(
-                    {
-                        "filename": fp.name,
-                        "report": validate(fp)
-                    }
-                )
+            i_file_paths.append(i_files[0])
+    if max_workers == 1 and timeout is None:
+        for i_file_path in i_file_paths:
+            batch_report['batch_report'].append(validate_archive(i_file_path, config_dir, config_cache_dir))
+    else:
+        batch_report['batch_report'].extend(_validate_archives_in_processes(i_file_paths, max_workers, timeout,
+                                                                            config_dir, config_cache_dir))
     return batch_report
 
 
+def _failed_archive_report(i_file_path, e):
+    logger.fatal("(F) Validation of {} failed: {}".format(i_file_path, e))
+    return {
+        "filename": i_file_path,
+        "report": {
+            "errors": [{
+                "message": "Unknown/System Error",
+                "supplemental": "The validator could not identify what the error is: {}".format(str(e)),
+                "code": 0
+            }],
+            "warnings": [],
+            "validation_finished": False
+        }
+    }
+
+
+def _validate_archives_in_processes(i_file_paths, max_workers, timeout, config_dir, config_cache_dir):
+    """Validates archives in a pool of worker processes, giving it no more archives at a time than it has workers
+
+    When a worker process dies, the pool breaks, and all the archives given to it and not yet validated fail with it.
+    Those are then validated again one by one, each in a pool of its own, so that only the archive that the worker
+    died on is reported as failed, and the archives not yet given to the pool go on in a new one.
+
+    :return: list of the archives' reports, in the order of i_file_paths
+    """
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+    reports = [None] * len(i_file_paths)
+    not_submitted = deque(range(len(i_file_paths)))
+
+    def submit(executor, i):
+        return executor.submit(_validate_archive_in_worker, i_file_paths[i], config_dir, config_cache_dir, timeout)
+
+    def get_result(i, future, broken_pool_archives):
+        try:
+            reports[i] = future.result()
+        except BrokenProcessPool:
+            broken_pool_archives.append(i)
+        except Exception as e:
+            reports[i] = _failed_archive_report(i_file_paths[i], e)
+
+    while not_submitted:
+        broken_pool_archives = list()
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            submitted = dict()
+            while (not_submitted or submitted) and not broken_pool_archives:
+                while not_submitted and len(submitted) < max_workers:
+                    i = not_submitted.popleft()
+                    submitted[submit(executor, i)] = i
+                done, _ = wait(submitted, return_when=FIRST_COMPLETED)
+                for future in done:
+                    get_result(submitted.pop(future), future, broken_pool_archives)
+            if broken_pool_archives:
+                wait(submitted)
+                for future, i in submitted.items():
+                    get_result(i, future, broken_pool_archives)
+        for i in sorted(broken_pool_archives):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                future = submit(executor, i)
+                try:
+                    reports[i] = future.result()
+                except Exception as e:  # e.g. the worker process died again
+                    reports[i] = _failed_archive_report(i_file_paths[i], e)
+    return reports
+
+
+def validate_archive(i_file_path, config_dir=default_config_dir, config_cache_dir=None):
+    """ Validate the ISA-Tab archive of an investigation file, as one of a batch
+    :param i_file_path: File path to the investigation file
+    :param config_dir: Path to the directory of XML configurations to validate against
+    :param config_cache_dir: Optional path to a directory in which to cache the parsed configurations
+    :return: dict of the file path and its validation report
+    """
+    logger.info("***Validating {}***\n".format(i_file_path))
+    with open(i_file_path, encoding='utf-8') as fp:
+        report = validate(fp, config_dir=config_dir, config_cache_dir=config_cache_dir)
+    return {
+        "filename": i_file_path,
+        "report": report
+    }
+
+
+class _ValidationTimedOut(BaseException):
+    """Raised in a worker process of batch_validate when the validation of an archive runs out of time
+
+    It is not an Exception, so that the checks that catch any Exception and carry on, such as those counting a cell
+    that raises as not passing, let it through and the validation stops where it is.
+    """
+    pass
+
+
+def _validate_archive_in_worker(i_file_path, config_dir, config_cache_dir, timeout):
+    """Validates an archive in a worker process of batch_validate, abandoning it after timeout seconds if not None
+
+    The timeout is enforced with a SIGALRM timer, which is only set in worker processes, so as not to take over the
+    signal handling of the caller's process, and only where SIGALRM is available.
+    """
+    import signal
+    if timeout is None or not hasattr(signal, 'setitimer'):
+        if timeout is not None:
+            logger.warn("Cannot time out the validation of {} here, so letting it run to the end".format(i_file_path))
+        return validate_archive(i_file_path, config_dir, config_cache_dir)
+    timed_out = list()
+
+    def on_timeout(signum, frame):
+        timed_out.append(signum)
+        raise _ValidationTimedOut("Validation did not finish within {} seconds".format(timeout))
+
+    report = None
+    previous_handler = signal.signal(signal.SIGALRM, on_timeout)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)  # fires once
+        try:
+            report = validate_archive(i_file_path, config_dir, config_cache_dir)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except _ValidationTimedOut:
+        pass
+    finally:
+        signal.signal(signal.SIGALRM, previous_handler)
+    if timed_out:  # validate() stops at _ValidationTimedOut and returns its own report, which is replaced here
+        logger.fatal("(F) Validation of {} did not finish within {} seconds".format(i_file_path, timeout))
+        report = {
+            "filename": i_file_path,
+            "report": {
+                "errors": [{
+                    "message": "Validation timed out",
+                    "supplemental": "Validation of {} did not finish within {} seconds".format(i_file_path, timeout),
+                    "code": 0
+                }],
+                "warnings": [],
+                "validation_finished": False
+            }
+        }
+    return report
+
+
 def dumps(isa_obj, skip_dump_tables=False):
     import tempfile
     import shutil
@@ -2685,7 +3126,100 @@ def dumps(isa_obj, skip_dump_tables=False):
     return output
 
 
-def load(FP, skip_load_tables=False):  # from DF of investigation file
+_SAMPLE_LISTS = ('characteristics', 'factor_values', 'comments', 'derives_from')
+
+
+class _SharedObjectsPickler(pickle.Pickler):
+    """Pickles objects, leaving some shared objects out as references to their position in a list of them"""
+
+    def __init__(self, file, shared_objects):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.shared_object_positions = dict((id(x), i) for i, x in enumerate(shared_objects))
+
+    def persistent_id(self, obj):
+        return self.shared_object_positions.get(id(obj))
+
+
+class _SharedObjectsUnpickler(pickle.Unpickler):
+    """Unpickles what _SharedObjectsPickler pickled, putting the given shared objects back in place"""
+
+    def __init__(self, file, shared_objects):
+        super().__init__(file)
+        self.shared_objects = shared_objects
+
+    def persistent_load(self, pid):
+        return self.shared_objects[pid]
+
+
+def _merge_sample_addition(sample_list, name, items):
+    """Adds to a list of a study sample what a worker added to it, as create_from_df would have added it there
+
+    Comments are added only if the sample has none of the same name yet, and links in derives_from only if they are
+    not there already, since the worker did not see what the other assay tables added to the sample.
+
+    :param sample_list: The list of the study sample, one of _SAMPLE_LISTS
+    :param name: The name of the list
+    :param items: What the worker added to the list
+    """
+    if name == 'comments':
+        names = set(x.name for x in sample_list)
+        for comment in items:
+            if comment.name not in names:
+                names.add(comment.name)
+                sample_list.append(comment)
+    elif name == 'derives_from':
+        ids = set(id(x) for x in sample_list)
+        sample_list.extend(x for x in items if id(x) not in ids)
+    else:
+        sample_list.extend(items)
+
+
+def _assay_shared_objects(ontology_sources, samples, protocols, factors):
+    shared_objects = list(ontology_sources) + list(samples) + list(protocols) + list(factors)
+    for protocol in protocols:
+        shared_objects.extend(protocol.parameters)
+    return shared_objects
+
+
+def _create_assay_from_tfile(tfile_path, ontology_sources, samples, protocols, factors):
+    """Reads an assay table file into processes and other nodes, in a worker process of isatab.load
+
+    :return: The nodes created, what was added to the study samples and the warnings counted, pickled with the ontology sources, samples,
+        protocols, protocol parameters and factors passed in left as references, so the objects they stand for in
+        the calling process can be put in their place
+    """
+    list_lengths = [(sample, [len(getattr(sample, name)) for name in _SAMPLE_LISTS]) for sample in samples]
+    with Reporter(logger=None) as reporter:
+        _, assay_samples, other, data, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
+            ontology_sources=ontology_sources,
+            study_samples=samples,
+            study_protocols=protocols,
+            study_factors=factors).create_from_df(read_tfile(tfile_path))
+    sample_additions = [(sample, name, getattr(sample, name)[length:]) for sample, lengths in list_lengths
+                        for name, length in zip(_SAMPLE_LISTS, lengths) if len(getattr(sample, name)) > length]
+    buffer = io.BytesIO()
+    _SharedObjectsPickler(buffer, _assay_shared_objects(ontology_sources, samples, protocols, factors)).dump(
+        (list(assay_samples.values()), list(other.values()), list(data.values()), list(processes.values()),
+         list(characteristic_categories.values()), list(unit_categories.values()), sample_additions,
+         reporter.warning_counts))
+    return buffer.getvalue()
+
+
+@reported
+def load(FP, skip_load_tables=False, lazy=False, max_workers=1):  # from DF of investigation file
+    """Loads an ISA-Tab investigation, with its study and assay table files
+
+    :param FP: The investigation file, opened for reading, whose directory holds the table files
+    :param skip_load_tables: Don't load the study and assay table files at all
+    :param lazy: Load each study or assay table file only when the materials, process sequence, data files, units or
+        characteristic categories of that study or assay are first used. The investigation file is read up front.
+        Loading an assay table loads that of its study first. The "unknown protocol" put in for Protocol REFs that
+        match no study protocol is only added to the study protocols once the table file using it is loaded.
+    :param max_workers: Number of processes to read the assay table files in, once their study table file is read.
+        With 1, they are read one after another in this process. Each assay table is read on its own, seeing the
+        study samples as they are after the study table file is read.
+    :return: Investigation
+    """
 
     def get_ontology_source(term_source_ref):
         try:
@@ -2779,7 +3313,78 @@ def load(FP, skip_load_tables=False):  # from DF of investigation file
             comments.append(comment)
         return comments
 
+    def set_executes_protocols(study, process_sequence, protocol_map):
+        for process in process_sequence:
+            try:
+                process.executes_protocol = protocol_map[process.executes_protocol]
+            except KeyError:
+                try:
+                    unknown_protocol = protocol_map['unknown']
+                except KeyError:
+                    protocol_map['unknown'] = Protocol(
+                        name="unknown protocol",
+                        description="This protocol was auto-generated where a protocol could not be determined.")
+                    unknown_protocol = protocol_map['unknown']
+                    study.protocols.append(unknown_protocol)
+                process.executes_protocol = unknown_protocol
+
+    def load_study_table(protocol_map, study):
+        study_tfile_df = read_tfile(os.path.join(tables_dir, study.filename))
+        sources, samples, _, __, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
+            ontology_sources=investigation.ontology_source_references, study_protocols=study.protocols,
+            study_factors=study.factors).create_from_df(study_tfile_df)
+        study.materials['sources'] = list(sources.values())
+        study.materials['samples'] = list(samples.values())
+        study.process_sequence = list(processes.values())
+        study.characteristic_categories = list(characteristic_categories.values())
+        study.units = list(unit_categories.values())
+        set_executes_protocols(study, study.process_sequence, protocol_map)
+
+    def load_assay_table(protocol_map, study, assay):
+        assay_tfile_df = read_tfile(os.path.join(tables_dir, assay.filename))
+        _, samples, other, data, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
+            ontology_sources=investigation.ontology_source_references,
+            study_samples=study.materials['samples'],
+            study_protocols=study.protocols,
+            study_factors=study.factors).create_from_df(assay_tfile_df)
+        set_assay_table(protocol_map, study, assay, list(samples.values()), list(other.values()),
+                        list(data.values()), list(processes.values()), list(characteristic_categories.values()),
+                        list(unit_categories.values()))
+
+    def submit_assay_table(protocol_map, study, assay):
+        future = executor.submit(_create_assay_from_tfile, os.path.join(tables_dir, assay.filename),
+                                 investigation.ontology_source_references, study.materials['samples'],
+                                 study.protocols, study.factors)
+        submitted_assay_tables.append((protocol_map, study, assay, list(study.protocols), future))
+
+    def merge_assay_table(protocol_map, study, assay, protocols, future):
+        shared_objects = _assay_shared_objects(investigation.ontology_source_references, study.materials['samples'],
+                                               protocols, study.factors)
+        samples, other, data, processes, characteristic_categories, unit_categories, sample_additions, \
+            warning_counts = _SharedObjectsUnpickler(io.BytesIO(future.result()), shared_objects).load()
+        get_reporter().add_warning_counts(warning_counts)
+        for sample, name, items in sample_additions:
+            _merge_sample_addition(getattr(sample, name), name, items)
+        set_assay_table(protocol_map, study, assay, samples, other, data, processes, characteristic_categories,
+                        unit_categories)
+
+    def set_assay_table(protocol_map, study, assay, samples, other, data, processes, characteristic_categories,
+                        unit_categories):
+        assay.materials['samples'] = samples
+        assay.materials['other_material'] = other
+        assay.data_files = data
+        assay.process_sequence = processes
+        assay.characteristic_categories = characteristic_categories
+        assay.units = unit_categories
+        set_executes_protocols(study, assay.process_sequence, protocol_map)
+
+    tables_dir = os.path.dirname(FP.name)
     df_dict = read_investigation_file(FP)
+    executor = None
+    submitted_assay_tables = list()
+    if max_workers > 1 and not (skip_load_tables or lazy):
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=max_workers)
 
     investigation = Investigation()
 
@@ -2803,233 +3408,298 @@ def load(FP, skip_load_tables=False):  # from DF of investigation file
         investigation.contacts = get_contacts(df_dict['i_contacts'])
         investigation.comments = get_comments(df_dict['investigation'])
 
-    for i in range(0, len(df_dict['studies'])):
-        row = df_dict['studies'][i].iloc[0]
-        study = Study()
-        study.identifier = row['Study Identifier']
-        study.title = row['Study Title']
-        study.description = row['Study Description']
-        study.submission_date = row['Study Submission Date']
-        study.public_release_date = row['Study Public Release Date']
-        study.filename = row['Study File Name']
-
-        study.publications = get_publications(df_dict['s_publications'][i])
-        study.contacts = get_contacts(df_dict['s_contacts'][i])
-        study.comments = get_comments(df_dict['studies'][i])
-
-        for _, row in df_dict['s_design_descriptors'][i].iterrows():
-            design_descriptor = get_oa(row['Study Design Type'],
-                                       row['Study Design Type Term Accession Number'],
-                                       row['Study Design Type Term Source REF'])
-            design_descriptor.comments = get_comments_row(df_dict['s_design_descriptors'][i].columns, row)
-            study.design_descriptors.append(design_descriptor)
-
-        for _, row in df_dict['s_factors'][i].iterrows():
-            factor = StudyFactor(name=row['Study Factor Name'])
-            factor.factor_type = get_oa(row['Study Factor Type'],
-                                        row['Study Factor Type Term Accession Number'],
-                                        row['Study Factor Type Term Source REF'])
-            factor.comments = get_comments_row(df_dict['s_factors'][i].columns, row)
-            study.factors.append(factor)
-
-        protocol_map = {}
-        for _, row in df_dict['s_protocols'][i].iterrows():
-            protocol = Protocol()
-            protocol.name = row['Study Protocol Name']
-            protocol.description = row['Study Protocol Description']
-            protocol.uri = row['Study Protocol URI']
-            protocol.version = row['Study Protocol Version']
-            protocol.protocol_type = get_oa(row['Study Protocol Type'],
-                                            row['Study Protocol Type Term Accession Number'],
-                                            row['Study Protocol Type Term Source REF'])
-            params = get_oa_list_from_semi_c_list(
-                row['Study Protocol Parameters Name'], row['Study Protocol Parameters Name Term Accession Number'],
-                row['Study Protocol Parameters Name Term Source REF'])
-            for param in params:
-                protocol_param = ProtocolParameter(parameter_name=param)
-                protocol.parameters.append(protocol_param)
-            protocol.comments = get_comments_row(df_dict['s_protocols'][i].columns, row)
-            study.protocols.append(protocol)
-            protocol_map[protocol.name] = protocol
-        study.protocols = list(protocol_map.values())
-        if skip_load_tables:
-            pass
-        else:
-            study_tfile_df = read_tfile(os.path.join(os.path.dirname(FP.name), study.filename))
-            sources, samples, _, __, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
-                ontology_sources=investigation.ontology_source_references, study_protocols=study.protocols,
-                study_factors=study.factors).create_from_df(study_tfile_df)
-            study.materials['sources'] = list(sources.values())
-            study.materials['samples'] = list(samples.values())
-            study.materials['samples'] = list(samples.values())
-            study.process_sequence = list(processes.values())
-            study.characteristic_categories = list(characteristic_categories.values())
-            study.units = list(unit_categories.values())
-
-            for process in study.process_sequence:
-                try:
-                    process.executes_protocol = protocol_map[process.executes_protocol]
-                except KeyError:
-                    try:
-                        unknown_protocol = protocol_map['unknown']
-                    except KeyError:
-                        protocol_map['unknown'] = Protocol(
-                            name="unknown protocol",
-                            description="This protocol was auto-generated where a protocol could not be determined.")
-                        unknown_protocol = protocol_map['unknown']
-                        study.protocols.append(unknown_protocol)
-                    process.executes_protocol = unknown_protocol
-
-        for _, row in df_dict['s_assays'][i].iterrows():
-            assay = Assay()
-            assay.filename = row['Study Assay File Name']
-            assay.measurement_type = get_oa(
-                row['Study Assay Measurement Type'],
-                row['Study Assay Measurement Type Term Accession Number'],
-                row['Study Assay Measurement Type Term Source REF']
-            )
-            assay.technology_type = get_oa(
-                row['Study Assay Technology Type'],
-                row['Study Assay Technology Type Term Accession Number'],
-                row['Study Assay Technology Type Term Source REF']
-            )
-            assay.technology_platform = row['Study Assay Technology Platform']
+    try:
+        for i in range(0, len(df_dict['studies'])):
+            row = df_dict['studies'][i].iloc[0]
+            study = Study()
+            study.identifier = row['Study Identifier']
+            study.title = row['Study Title']
+            study.description = row['Study Description']
+            study.submission_date = row['Study Submission Date']
+            study.public_release_date = row['Study Public Release Date']
+            study.filename = row['Study File Name']
+
+            study.publications = get_publications(df_dict['s_publications'][i])
+            study.contacts = get_contacts(df_dict['s_contacts'][i])
+            study.comments = get_comments(df_dict['studies'][i])
+
+            for _, row in df_dict['s_design_descriptors'][i].iterrows():
+                design_descriptor = get_oa(row['Study Design Type'],
+                                           row['Study Design Type Term Accession Number'],
+                                           row['Study Design Type Term Source REF'])
+                design_descriptor.comments = get_comments_row(df_dict['s_design_descriptors'][i].columns, row)
+                study.design_descriptors.append(design_descriptor)
+
+            for _, row in df_dict['s_factors'][i].iterrows():
+                factor = StudyFactor(name=row['Study Factor Name'])
+                factor.factor_type = get_oa(row['Study Factor Type'],
+                                            row['Study Factor Type Term Accession Number'],
+                                            row['Study Factor Type Term Source REF'])
+                factor.comments = get_comments_row(df_dict['s_factors'][i].columns, row)
+                study.factors.append(factor)
+
+            protocol_map = {}
+            for _, row in df_dict['s_protocols'][i].iterrows():
+                protocol = Protocol()
+                protocol.name = row['Study Protocol Name']
+                protocol.description = row['Study Protocol Description']
+                protocol.uri = row['Study Protocol URI']
+                protocol.version = row['Study Protocol Version']
+                protocol.protocol_type = get_oa(row['Study Protocol Type'],
+                                                row['Study Protocol Type Term Accession Number'],
+                                                row['Study Protocol Type Term Source REF'])
+                params = get_oa_list_from_semi_c_list(
+                    row['Study Protocol Parameters Name'], row['Study Protocol Parameters Name Term Accession Number'],
+                    row['Study Protocol Parameters Name Term Source REF'])
+                for param in params:
+                    protocol_param = ProtocolParameter(parameter_name=param)
+                    protocol.parameters.append(protocol_param)
+                protocol.comments = get_comments_row(df_dict['s_protocols'][i].columns, row)
+                study.protocols.append(protocol)
+                protocol_map[protocol.name] = protocol
+            study.protocols = list(protocol_map.values())
             if skip_load_tables:
                 pass
+            elif lazy:
+                study.set_table_loader(partial(load_study_table, protocol_map))
             else:
-                assay_tfile_df = read_tfile(os.path.join(os.path.dirname(FP.name), assay.filename))
-                _, samples, other, data, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
-                    ontology_sources=investigation.ontology_source_references,
-                    study_samples=study.materials['samples'],
-                    study_protocols=study.protocols,
-                    study_factors=study.factors).create_from_df(assay_tfile_df)
-                assay.materials['samples'] = list(samples.values())
-                assay.materials['other_material'] = list(other.values())
-                assay.data_files = list(data.values())
-                assay.process_sequence = list(processes.values())
-                assay.characteristic_categories = list(characteristic_categories.values())
-                assay.units = list(unit_categories.values())
-
-                for process in assay.process_sequence:
-                    try:
-                        process.executes_protocol = protocol_map[process.executes_protocol]
-                    except KeyError:
-                        try:
-                            unknown_protocol = protocol_map['unknown']
-                        except KeyError:
-                            protocol_map['unknown'] = Protocol(
-                                name="unknown protocol",
-                                description="This protocol was auto-generated where a protocol could not be determined.")
-                            unknown_protocol = protocol_map['unknown']
-                            study.protocols.append(unknown_protocol)
-                        process.executes_protocol = unknown_protocol
-
-            study.assays.append(assay)
-        investigation.studies.append(study)
+                load_study_table(protocol_map, study)
+
+            for _, row in df_dict['s_assays'][i].iterrows():
+                assay = Assay()
+                assay.filename = row['Study Assay File Name']
+                assay.measurement_type = get_oa(
+                    row['Study Assay Measurement Type'],
+                    row['Study Assay Measurement Type Term Accession Number'],
+                    row['Study Assay Measurement Type Term Source REF']
+                )
+                assay.technology_type = get_oa(
+                    row['Study Assay Technology Type'],
+                    row['Study Assay Technology Type Term Accession Number'],
+                    row['Study Assay Technology Type Term Source REF']
+                )
+                assay.technology_platform = row['Study Assay Technology Platform']
+                if skip_load_tables:
+                    pass
+                elif lazy:
+                    assay.set_table_loader(partial(load_assay_table, protocol_map, study))
+                elif executor is not None:
+                    submit_assay_table(protocol_map, study, assay)
+                else:
+                    load_assay_table(protocol_map, study, assay)
+
+                study.assays.append(assay)
+            investigation.studies.append(study)
+        for submitted_assay_table in submitted_assay_tables:
+            merge_assay_table(*submitted_assay_table)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     return investigation
 
 
-def process_keygen(protocol_ref, column_group, object_label_index, all_columns, series, series_index, DF):
+def get_process_key_columns(column_group, object_label_index, all_columns, DF):
+    """Resolves the columns that make up the process keys of a Protocol REF column group
+
+    This does the work that does not depend on the row being keyed, i.e. finding the assay node name column, the
+    nearest input and output node columns and comparing how many distinct (protocol, node) pairs each of them has in
+    the table, so that it only needs doing once per column group rather than once per row.
+
+    :param column_group: The column labels of the Protocol REF column group
+    :param object_label_index: The index used to locate the input and output node columns
+    :param all_columns: All of the column labels of the table
+    :param DF: The table DataFrame
+    :return: dict of the columns used to build each row's process key
+    """
+    key_columns = {
+        'name': None,
+        'node': None,
+        'parameter_values': [c for c in column_group if c.startswith('Parameter Value[')],
+        'date': None,
+        'performer': None
+    }
     name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
     if len(name_column_hits) == 1:
-        return series[name_column_hits[0]]
+        key_columns['name'] = name_column_hits[0]
+        return key_columns
 
-    process_key = protocol_ref
     node_cols = [i for i, c in enumerate(all_columns) if c in _LABELS_MATERIAL_NODES + _LABELS_DATA_NODES]
-    input_node_value = ''
-    output_node_value = ''
     output_node_index = find_gt(node_cols, object_label_index)
-    if output_node_index > -1:
-        output_node_label = all_columns[output_node_index]
-        output_node_value = str(series[output_node_label])
-
     input_node_index = find_lt(node_cols, object_label_index)
-    if input_node_index > -1:
-        input_node_label = all_columns[input_node_index]
-        input_node_value = str(series[input_node_label])
 
     input_nodes_with_prot_keys = DF[[all_columns[object_label_index], all_columns[input_node_index]]].drop_duplicates()
     output_nodes_with_prot_keys = DF[[all_columns[object_label_index], all_columns[output_node_index]]].drop_duplicates()
 
     if len(input_nodes_with_prot_keys) > len(output_nodes_with_prot_keys):
-        node_key = output_node_value
+        node_index = output_node_index
     else:
-        node_key = input_node_value
+        node_index = input_node_index
+    if node_index > -1:
+        key_columns['node'] = all_columns[node_index]
+
+    date_col_hits = [c for c in column_group if c.startswith('Date')]
+    if len(date_col_hits) == 1:
+        key_columns['date'] = date_col_hits[0]
+
+    performer_col_hits = [c for c in column_group if c.startswith('Performer')]
+    if len(performer_col_hits) == 1:
+        key_columns['performer'] = performer_col_hits[0]
 
-    if process_key == protocol_ref:
-        process_key += '-' + str(series_index)
+    return key_columns
 
-    pv_cols = [c for c in column_group if c.startswith('Parameter Value[')]
-    if len(pv_cols) > 0:
+
+def build_process_key(key_columns, protocol_ref, get_cell):
+    """Builds a single process key from the columns resolved by get_process_key_columns()
+
+    :param key_columns: dict as returned by get_process_key_columns()
+    :param protocol_ref: The Protocol REF value of the row
+    :param get_cell: Callable returning the row's value for a column label
+    :return: The process key
+    """
+    if key_columns['name'] is not None:
+        return get_cell(key_columns['name'])
+
+    node_key = ''
+    if key_columns['node'] is not None:
+        node_key = str(get_cell(key_columns['node']))
+
+    if len(key_columns['parameter_values']) > 0:
         # 2. else try use protocol REF + Parameter Values as key
-        if node_key is not None:
-            process_key = node_key + \
-                          ':' + protocol_ref + \
-                          ':' + '/'.join([str(v) for v in series[pv_cols]])
-        else:
-            process_key = protocol_ref + \
-                          ':' + '/'.join([str(v) for v in series[pv_cols]])
+        process_key = node_key + \
+                      ':' + protocol_ref + \
+                      ':' + '/'.join([str(get_cell(c)) for c in key_columns['parameter_values']])
     else:
         # 3. else try use input + protocol REF as key
         # 4. else try use output + protocol REF as key
-        if node_key is not None:
-            process_key = node_key + '/' + protocol_ref
+        process_key = node_key + '/' + protocol_ref
 
-    date_col_hits = [c for c in column_group if c.startswith('Date')]
-    if len(date_col_hits) == 1:
-        process_key = ':'.join([process_key, series[date_col_hits[0]]])
+    if key_columns['date'] is not None:
+        process_key = ':'.join([process_key, get_cell(key_columns['date'])])
 
-    performer_col_hits = [c for c in column_group if c.startswith('Performer')]
-    if len(performer_col_hits) == 1:
-        process_key = ':'.join([process_key, series[performer_col_hits[0]]])
+    if key_columns['performer'] is not None:
+        process_key = ':'.join([process_key, get_cell(key_columns['performer'])])
 
     return process_key
 
 
-def get_value(object_column, column_group, object_series, ontology_source_map, unit_categories):
+def process_keygen(protocol_ref, column_group, object_label_index, all_columns, series, series_index, DF):
+    key_columns = get_process_key_columns(column_group, object_label_index, all_columns, DF)
+    return build_process_key(key_columns, protocol_ref, lambda c: series[c])
+
+
+def process_keys(column_group, object_label_index, DF):
+    """Generates the process keys of every row of a table for one Protocol REF column group
 
+    Gives the same keys as calling process_keygen() on each row, but resolves the key columns once and then reads
+    the cells column-wise, so keying a whole table is linear in its number of rows.
+
+    :param column_group: The column labels of the Protocol REF column group
+    :param object_label_index: The index used to locate the input and output node columns
+    :param DF: The table DataFrame
+    :return: list of process keys, positionally aligned with the rows of DF
+    """
+    key_columns = get_process_key_columns(column_group, object_label_index, DF.columns, DF)
+    key_column_labels = [column_group[0]] + [c for c in [key_columns['name'], key_columns['node']] +
+                                             key_columns['parameter_values'] +
+                                             [key_columns['date'], key_columns['performer']] if c is not None]
+    key_column_values = dict((c, DF[c].tolist()) for c in key_column_labels)
+    keys = list()
+    for i in range(len(DF.index)):
+        keys.append(build_process_key(key_columns, str(key_column_values[column_group[0]][i]),
+                                      lambda c: key_column_values[c][i]))
+    return keys
+
+
+def get_value_layout(object_column, column_group, value_layouts=None):
+    """Resolves how the value of a column is qualified by the columns that follow it in its column group
+
+    The layout only depends on the column labels, so it can be resolved once per column and then reused for every row.
+
+    :param object_column: The label of the value column
+    :param column_group: The column labels of the column group the value column belongs to
+    :param value_layouts: Optional dict of the layouts resolved so far, shared across calls
+    :return: tuple of the layout, one of 'value', 'ontology' or 'unit', and the labels of the qualifying columns
+    """
+    layout_key = (object_column, tuple(column_group))
+
+    if value_layouts is not None:
+        try:
+            return value_layouts[layout_key]
+        except KeyError:
+            pass
+
+    column_index = list(column_group).index(object_column)
+    qualifier_columns = list(column_group[column_index + 1:column_index + 4])
+
+    if len(qualifier_columns) >= 2 and qualifier_columns[0].startswith('Term Source REF') \
+            and qualifier_columns[1].startswith('Term Accession Number'):
+        layout = ('ontology', tuple(qualifier_columns[:2]))
+    elif len(qualifier_columns) == 3 and qualifier_columns[0].startswith('Unit') \
+            and qualifier_columns[1].startswith('Term Source REF') \
+            and qualifier_columns[2].startswith('Term Accession Number'):
+        layout = ('unit', tuple(qualifier_columns))
+    else:
+        layout = ('value', ())
+
+    if value_layouts is not None:
+        value_layouts[layout_key] = layout
+    return layout
+
+
+def get_value(object_column, column_group, object_series, ontology_source_map, unit_categories,
+              ontology_annotations=None, value_layouts=None):
+    """Gets the value of a cell, as an OntologyAnnotation if it is qualified by a term source, and its unit
+
+    :param object_column: The label of the value column
+    :param column_group: The column labels of the column group the value column belongs to
+    :param object_series: The row, indexable by column label
+    :param ontology_source_map: dict of OntologySources by name
+    :param unit_categories: dict of unit OntologyAnnotations by term, shared across calls
+    :param ontology_annotations: Optional dict of value OntologyAnnotations by (term, term source, accession),
+        shared across calls so that identical values are the same object
+    :param value_layouts: Optional dict of the layouts of value columns, shared across calls, see get_value_layout()
+    :return: tuple of the value and its unit, or None if there is no unit
+    """
     cell_value = object_series[object_column]
 
     if cell_value == '':
         return cell_value, None
 
-    column_index = list(column_group).index(object_column)
+    layout, qualifier_columns = get_value_layout(object_column, column_group, value_layouts)
 
-    try:
-        offset_1r_col = column_group[column_index + 1]
-        offset_2r_col = column_group[column_index + 2]
-    except IndexError:
-        return cell_value, None
+    if layout == 'ontology':
 
-    if offset_1r_col.startswith('Term Source REF') and offset_2r_col.startswith('Term Accession Number'):
+        term_source_value = object_series[qualifier_columns[0]]
+        term_accession_value = object_series[qualifier_columns[1]]
 
-        value = OntologyAnnotation(term=str(cell_value))
+        annotation_key = (str(cell_value), term_source_value, term_accession_value)
 
-        term_source_value = object_series[offset_1r_col]
+        if ontology_annotations is not None:
+            try:
+                return ontology_annotations[annotation_key], None
+            except KeyError:
+                pass
+
+        value = OntologyAnnotation(term=str(cell_value))
 
         if term_source_value is not '':
 
             try:
                 value.term_source = ontology_source_map[term_source_value]
             except KeyError:
-                print('term source: ', term_source_value, ' not found')
-
-        term_accession_value = object_series[offset_2r_col]
+                get_reporter().warning('term source: {} not found'.format(term_source_value))
 
         if term_accession_value is not '':
             value.term_accession = str(term_accession_value)
 
-        return value, None
+        if ontology_annotations is not None:
+            ontology_annotations[annotation_key] = value
 
-    try:
-        offset_3r_col = column_group[column_index + 3]
-    except IndexError:
-        return cell_value, None
+        return value, None
 
-    if offset_1r_col.startswith('Unit') and offset_2r_col.startswith('Term Source REF') \
-            and offset_3r_col.startswith('Term Accession Number'):
+    if layout == 'unit':
 
-        category_key = object_series[offset_1r_col]
+        category_key = object_series[qualifier_columns[0]]
 
         try:
             unit_term_value = unit_categories[category_key]
@@ -3037,24 +3707,23 @@ def get_value(object_column, column_group, object_series, ontology_source_map, u
             unit_term_value = OntologyAnnotation(term=category_key)
             unit_categories[category_key] = unit_term_value
 
-            unit_term_source_value = object_series[offset_2r_col]
+            unit_term_source_value = object_series[qualifier_columns[1]]
 
             if unit_term_source_value is not '':
 
                 try:
                     unit_term_value.term_source = ontology_source_map[unit_term_source_value]
                 except KeyError:
-                    print('term source: ', unit_term_source_value, ' not found')
+                    get_reporter().warning('term source: {} not found'.format(unit_term_source_value))
 
-            term_accession_value = object_series[offset_3r_col]
+            term_accession_value = object_series[qualifier_columns[2]]
 
             if term_accession_value is not '':
                 unit_term_value.term_accession = term_accession_value
 
         return cell_value, unit_term_value
 
-    else:
-        return cell_value, None
+    return cell_value, None
 
 
 def pairwise(iterable):
@@ -3066,20 +3735,67 @@ def pairwise(iterable):
     return zip(a, b)
 
 
+def read_table(fp, encoding='utf-8', index_col=None, chunksize=None):
+    """Reads an ISA-Tab table file, keeping its header as written
+
+    pandas makes repeated labels such as 'Term Source REF' unique, so the header line is also read as written from
+    the same open file and set as the isatab_header attribute of the DataFrame.
+
+    :param fp: A seekable file-like object, positioned at the header line
+    :param encoding: The encoding used if fp is a binary file object
+    :param index_col: Column to use as the index of the DataFrame, as in pandas.read_csv()
+    :param chunksize: If set, returns an iterator of DataFrames of up to chunksize rows instead of one DataFrame
+    :return: DataFrame of the table, or an iterator of DataFrames if chunksize is set
+    """
+    start = fp.tell()
+    header_line = fp.readline()
+    if isinstance(header_line, bytes):
+        header_line = header_line.decode(encoding)
+    header = next(csv.reader([header_line.lstrip('\ufeff')], delimiter='\t'), [])
+    fp.seek(start)
+    reader = pd.read_csv(fp, sep='\t', index_col=index_col, comment='#', encoding=encoding, chunksize=chunksize)
+    if chunksize is None:
+        reader.isatab_header = header
+        return reader
+
+    def chunks():
+        for chunk in reader:
+            chunk.isatab_header = list(header)
+            yield chunk
+    return chunks()
+
+
 def read_tfile(tfile_path, index_col=None, factor_filter=None):
 
     with open(tfile_path, encoding='utf-8') as tfile_fp:
-        reader = csv.reader(tfile_fp, delimiter='\t')
-        header = list(next(reader))
-        tfile_fp.seek(0)
-        tfile_df = pd.read_csv(tfile_fp, sep='\t', index_col=index_col, memory_map=True, comment='#', encoding='utf-8').fillna('')
-        tfile_df.isatab_header = header
+        tfile_df = read_table(tfile_fp, index_col=index_col)
+        tfile_df.fillna('', inplace=True)
     if factor_filter:
         return tfile_df[tfile_df['Factor Value[{}]'.format(factor_filter[0])] == factor_filter[1]]
     else:
         return tfile_df
 
 
+def iter_tfile(tfile_path, chunksize=10000, factor_filter=None):
+    """Iterates over an ISA-Tab table file in chunks of rows, for files too large to load at once
+
+    Column types are inferred by pandas chunk by chunk, so a column may be numeric in one chunk and not in another.
+
+    :param tfile_path: Path to the table file
+    :param chunksize: The maximum number of rows in each chunk
+    :param factor_filter: Optional (factor name, value) tuple to only keep the rows with that Factor Value
+    :return: iterator of DataFrames, each with the isatab_header of the file, with empty cells as ''
+    """
+    with open(tfile_path, encoding='utf-8') as tfile_fp:
+        for chunk in read_table(tfile_fp, chunksize=chunksize):
+            chunk.fillna('', inplace=True)
+            if factor_filter:
+                header = chunk.isatab_header
+                chunk = chunk[chunk['Factor Value[{}]'.format(factor_filter[0])] == factor_filter[1]]
+                chunk.isatab_header = header
+            yield chunk
+
+
 def get_multiple_index(file_index, key):
     return np.where(np.array(file_index) in key)[0]
 
@@ -3119,7 +3835,8 @@ def preprocess(DF):
 
     for i in process_node_name_indices:
         if not columns[find_lt(all_cols_indicies, i)].startswith('Protocol REF'):
-            print('warning: Protocol REF missing before \'{}\', found \'{}\''.format(columns[i], columns[find_lt(all_cols_indicies, i)]))
+            get_reporter().warning('warning: Protocol REF missing before \'{}\', found \'{}\''.format(
+                columns[i], columns[find_lt(all_cols_indicies, i)]))
             missing_process_indices.append(i)
 
     # insert Protocol REF columns
@@ -3163,6 +3880,37 @@ def get_object_column_map(isatab_header, df_columns):
     return object_column_map
 
 
+class _LinkIndex(object):
+    """Identity sets of what is already in the lists that link nodes together, such as the inputs and outputs of
+    processes, so that a link made again by a later row is found without scanning the list
+    """
+
+    def __init__(self):
+        self.__members = dict()
+
+    def __get_members(self, items):
+        try:
+            return self.__members[id(items)][1]
+        except KeyError:
+            members = set(id(x) for x in items)
+            self.__members[id(items)] = (items, members)  # holds on to items so that its id is not reused
+            return members
+
+    def append(self, items, item):
+        """Appends item to the list items, unless the very same object is in it already
+
+        :param items: A list linking nodes, such as Process.inputs or Sample.derives_from
+        :param item: The node to link
+        :return: True if item was appended, False if it was in items already
+        """
+        members = self.__get_members(items)
+        if id(item) in members:
+            return False
+        members.add(id(item))
+        items.append(item)
+        return True
+
+
 class ProcessSequenceFactory:
 
     def __init__(self, ontology_sources=None, study_samples=None, study_protocols=None, study_factors=None):
@@ -3171,8 +3919,11 @@ class ProcessSequenceFactory:
         self.protocols = study_protocols
         self.factors = study_factors
 
+    @reported
     def create_from_df(self, DF):  # from DF of a table file
 
+        reporter = get_reporter()
+
         DF = preprocess(DF=DF)
 
         if self.ontology_sources is not None:
@@ -3191,6 +3942,10 @@ class ProcessSequenceFactory:
         processes = {}
         characteristic_categories = {}
         unit_categories = {}
+        ontology_annotations = {}
+        value_layouts = {}
+        links = _LinkIndex()
+        process_parameter_names = {}
 
         try:
             sources = dict(map(lambda x: ('Source Name:' + x, Source(name=x)),
@@ -3208,7 +3963,7 @@ class ProcessSequenceFactory:
                     try:
                         samples[k] = sample_map[k]
                     except KeyError:
-                        print('warning! Did not find sample referenced at assay level in study samples')
+                        reporter.warning('warning! Did not find sample referenced at assay level in study samples')
             else:
                 samples = dict(map(lambda x: ('Sample Name:' + x, Sample(name=x)),
                                [str(x) for x in DF['Sample Name'].drop_duplicates() if x != '']))
@@ -3254,6 +4009,11 @@ class ProcessSequenceFactory:
         except AttributeError:
             object_column_map = get_object_column_map(DF.columns, DF.columns)
 
+        # plain lists of labels, as indexing into a pandas Index cell by cell is slow
+        object_column_map = [list(column_group) for column_group in object_column_map]
+
+        column_group_process_keys = dict()  # process keys of each Protocol REF column group, by row position
+
         def get_node_by_label_and_key(l, k):
             n = None
             lk = l + ':' + k
@@ -3274,12 +4034,14 @@ class ProcessSequenceFactory:
 
             if object_label in _LABELS_MATERIAL_NODES:
 
-                pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Setting material objects: ',
-                                                                                  SimpleProgress(),
-                                                                                  Bar(left=" |", right="| "),
-                                                                                  ETA()]).start()
+                charac_columns = [c for c in column_group if c.startswith('Characteristics[')]
+                fv_columns = [c for c in column_group if c.startswith('Factor Value[')]
+                comment_columns = [c for c in column_group if c.startswith('Comment[')]
 
-                for _, object_series in pbar(DF[column_group].drop_duplicates().iterrows()):
+                for object_values in reporter.progress(
+                        DF[column_group].drop_duplicates().itertuples(index=False, name=None),
+                        'Setting material objects: ', max_value=len(DF.index)):
+                    object_series = dict(zip(column_group, object_values))
                     node_name = str(object_series[object_label])
                     node_key = ":".join([object_label, node_name])
                     material = None
@@ -3301,7 +4063,7 @@ class ProcessSequenceFactory:
 
                     if material is not None:
 
-                        for charac_column in [c for c in column_group if c.startswith('Characteristics[')]:
+                        for charac_column in charac_columns:
 
                             category_key = charac_column[16:-1]
 
@@ -3313,7 +4075,8 @@ class ProcessSequenceFactory:
 
                             characteristic = Characteristic(category=category)
 
-                            v, u = get_value(charac_column, column_group, object_series, ontology_source_map, unit_categories)
+                            v, u = get_value(charac_column, column_group, object_series, ontology_source_map,
+                                             unit_categories, ontology_annotations, value_layouts)
 
                             characteristic.value = v
                             characteristic.unit = u
@@ -3322,7 +4085,7 @@ class ProcessSequenceFactory:
 
                         if isinstance(material, Sample) and self.factors is not None:
 
-                            for fv_column in [c for c in column_group if c.startswith('Factor Value[')]:
+                            for fv_column in fv_columns:
 
                                 category_key = fv_column[13:-1]
 
@@ -3337,28 +4100,28 @@ class ProcessSequenceFactory:
                                 fv = FactorValue(factor_name=factor)
 
                                 v, u = get_value(fv_column, column_group, object_series, ontology_source_map,
-                                                 unit_categories)
+                                                 unit_categories, ontology_annotations, value_layouts)
 
                                 fv.value = v
                                 fv.unit = u
 
                                 material.factor_values.append(fv)
 
-                        for comment_column in [c for c in column_group if c.startswith('Comment[')]:
+                        for comment_column in comment_columns:
                             if comment_column[8:-1] not in [x.name for x in material.comments]:
                                 material.comments.append(Comment(name=comment_column[8:-1],
                                                          value=str(object_series[comment_column])))
 
             elif object_label in _LABELS_DATA_NODES:
-                pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Setting data objects: ',
-                                                                                  SimpleProgress(),
-                                                                                  Bar(left=" |", right="| "),
-                                                                                  ETA()]).start()
+                comment_columns = [c for c in column_group if c.startswith('Comment[')]
 
-                for _, object_series in pbar(DF[column_group].drop_duplicates().iterrows()):
+                for object_values in reporter.progress(
+                        DF[column_group].drop_duplicates().itertuples(index=False, name=None), 'Setting data objects: ',
+                        max_value=len(DF.index)):
+                    object_series = dict(zip(column_group, object_values))
                     try:
                         data_file = get_node_by_label_and_key(object_label, str(object_series[object_label]))
-                        for comment_column in [c for c in column_group if c.startswith('Comment[')]:
+                        for comment_column in comment_columns:
                             if comment_column[8:-1] not in [x.name for x in data_file.comments]:
                                 data_file.comments.append(Comment(name=comment_column[8:-1], value=str(object_series[comment_column])))
                     except KeyError:
@@ -3367,18 +4130,36 @@ class ProcessSequenceFactory:
             elif object_label.startswith('Protocol REF'):
                 object_label_index = list(DF.columns).index(object_label)
 
-                pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Generating process objects: ',
-                                                                                   SimpleProgress(),
-                                                                                   Bar(left=" |", right="| "),
-                                                                                   ETA()]).start()
-
-                for _, object_series in pbar(DF.iterrows()):  # don't drop duplicates
-                    # if _ == 0:
-                    #     print('processing: ', object_series[object_label])
+                column_group_process_keys[_cg] = process_keys(column_group, _cg, DF)
+
+                # the node columns either side of the protocol and the column group layout are the same on every
+                # row, so resolve them once and only read the cells needed in the loop
+                output_node_label = None
+                output_node_index = find_gt(node_cols, object_label_index)
+                output_proc_index = find_gt(proc_cols, object_label_index)
+                if output_proc_index < output_node_index > -1:
+                    output_node_label = DF.columns[output_node_index]
+
+                input_node_label = None
+                input_node_index = find_lt(node_cols, object_label_index)
+                input_proc_index = find_lt(proc_cols, object_label_index)
+                if input_proc_index < input_node_index > -1:
+                    input_node_label = DF.columns[input_node_index]
+
+                name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
+                pv_columns = [c for c in column_group if c.startswith('Parameter Value[')]
+                comment_columns = [c for c in column_group if c.startswith('Comment[')]
+
+                object_columns = list(column_group) + [l for l in (output_node_label, input_node_label)
+                                                       if l is not None]
+
+                for row_index, object_values in enumerate(reporter.progress(
+                        DF[object_columns].itertuples(index=False, name=None), 'Generating process objects: ',
+                        max_value=len(DF.index))):
+                    # don't drop duplicates
+                    object_series = dict(zip(object_columns, object_values))
                     protocol_ref = str(object_series[object_label])
-                    process_key = process_keygen(protocol_ref, column_group, _cg, DF.columns, object_series, _, DF)
-
-                    # TODO: Keep process key sequence here to reduce number of passes on Protocol REF columns?
+                    process_key = column_group_process_keys[_cg][row_index]
 
                     try:
                         process = processes[process_key]
@@ -3386,15 +4167,9 @@ class ProcessSequenceFactory:
                         process = Process(executes_protocol=protocol_ref)
                         processes.update(dict([(process_key, process)]))
 
-                    output_node_index = find_gt(node_cols, object_label_index)
-                    output_proc_index = find_gt(proc_cols, object_label_index)
-
-                    if output_proc_index < output_node_index > -1:
+                    if output_node_label is not None:
 
-                        output_node_label = DF.columns[output_node_index]
-                        output_node_value = str(object_series[output_node_label])
-
-                        node_key = output_node_value
+                        node_key = str(object_series[output_node_label])
 
                         output_node = None
 
@@ -3403,19 +4178,12 @@ class ProcessSequenceFactory:
                         except KeyError:
                             pass  # skip if object not found
 
-                        if output_node is not None and output_node not in process.outputs:
-                            # print(process_key, 'output', output_node_label, node_key)
-                            process.outputs.append(output_node)
-
-                    input_node_index = find_lt(node_cols, object_label_index)
-                    input_proc_index = find_lt(proc_cols, object_label_index)
-
-                    if input_proc_index < input_node_index > -1:
+                        if output_node is not None:
+                            links.append(process.outputs, output_node)
 
-                        input_node_label = DF.columns[input_node_index]
-                        input_node_value = str(object_series[input_node_label])
+                    if input_node_label is not None:
 
-                        node_key = input_node_value
+                        node_key = str(object_series[input_node_label])
 
                         input_node = None
 
@@ -3424,20 +4192,23 @@ class ProcessSequenceFactory:
                         except KeyError:
                             pass  # skip if object not found
 
-                        if input_node is not None and input_node not in process.inputs:
-                            # print(process_key, 'input', input_node_label, node_key)
-                            process.inputs.append(input_node)
-
-                    name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
+                        if input_node is not None:
+                            links.append(process.inputs, input_node)
 
                     if len(name_column_hits) == 1:
                         process.name = str(object_series[name_column_hits[0]])
 
-                    for pv_column in [c for c in column_group if c.startswith('Parameter Value[')]:
+                    try:
+                        parameter_names = process_parameter_names[id(process)]
+                    except KeyError:
+                        parameter_names = set(x.category.parameter_name.term for x in process.parameter_values)
+                        process_parameter_names[id(process)] = parameter_names
+
+                    for pv_column in pv_columns:
 
                         category_key = pv_column[16:-1]
 
-                        if category_key in [x.category.parameter_name.term for x in process.parameter_values]:
+                        if category_key in parameter_names:
                             pass
                         else:
                             try:
@@ -3453,25 +4224,29 @@ class ProcessSequenceFactory:
                                 raise ValueError("Could not resolve Protocol parameter from Parameter Value ", category_key)
 
                             parameter_value = ParameterValue(category=category)
-                            v, u = get_value(pv_column, column_group, object_series, ontology_source_map, unit_categories)
+                            v, u = get_value(pv_column, column_group, object_series, ontology_source_map,
+                                             unit_categories, ontology_annotations, value_layouts)
 
                             parameter_value.value = v
                             parameter_value.unit = u
 
                             process.parameter_values.append(parameter_value)
+                            parameter_names.add(category_key)
 
-                    for comment_column in [c for c in column_group if c.startswith('Comment[')]:
+                    for comment_column in comment_columns:
                         if comment_column[8:-1] not in [x.name for x in process.comments]:
                             process.comments.append(Comment(name=comment_column[8:-1],
                                                     value=str(object_series[comment_column])))
 
         # now go row by row pulling out processes and linking them accordingly
 
-        pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Linking processes and other nodes in paths: ',
-                                                                          SimpleProgress(),
-                                                                          Bar(left=" |", right="| "),
-                                                                          ETA()]).start()
-        for _, object_series in pbar(DF.iterrows()):  # don't drop duplicates
+        # only the node columns are read when linking, so take them column-wise rather than building rows
+        node_column_values = dict((c[0], DF[c[0]].tolist()) for c in object_column_map
+                                  if c[0].startswith('Source Name') or c[0].startswith('Sample Name')
+                                  or c[0].endswith(' File'))
+
+        for row_index in reporter.progress(range(len(DF.index)),  # don't drop duplicates
+                                           'Linking processes and other nodes in paths: '):
             process_key_sequence = list()
             source_node_context = None
             sample_node_context = None
@@ -3481,33 +4256,32 @@ class ProcessSequenceFactory:
 
                 if object_label.startswith('Source Name'):
                     try:
-                        source_node_context = get_node_by_label_and_key(object_label, str(object_series[object_label]))
+                        source_node_context = get_node_by_label_and_key(
+                            object_label, str(node_column_values[object_label][row_index]))
                     except KeyError:
                         pass  # skip if object not found
 
                 if object_label.startswith('Sample Name'):
                     try:
-                        sample_node_context = get_node_by_label_and_key(object_label, str(object_series[object_label]))
+                        sample_node_context = get_node_by_label_and_key(
+                            object_label, str(node_column_values[object_label][row_index]))
                     except KeyError:
                         pass  # skip if object not found
                     if source_node_context is not None:
-                        if source_node_context not in sample_node_context.derives_from:
-                            sample_node_context.derives_from.append(source_node_context)
+                        links.append(sample_node_context.derives_from, source_node_context)
 
                 if object_label.startswith('Protocol REF'):
-                    protocol_ref = str(object_series[object_label])
-                    process_key = process_keygen(protocol_ref, column_group, _cg, DF.columns, object_series, _, DF)
-                    process_key_sequence.append(process_key)
+                    process_key_sequence.append(column_group_process_keys[_cg][row_index])
 
                 if object_label.endswith(' File'):
                     data_node = None
                     try:
-                        data_node = get_node_by_label_and_key(object_label, str(object_series[object_label]))
+                        data_node = get_node_by_label_and_key(
+                            object_label, str(node_column_values[object_label][row_index]))
                     except KeyError:
                         pass  # skip if object not found
                     if sample_node_context is not None and data_node is not None:
-                        if sample_node_context not in data_node.generated_from:
-                            data_node.generated_from.append(sample_node_context)
+                        links.append(data_node.generated_from, sample_node_context)
 
             # print('key sequence = ', process_key_sequence)
 
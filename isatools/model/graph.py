@@ -0,0 +1,218 @@
+"""A compact directed graph for ISA process graphs, as an alternative to networkx.DiGraph.
+
+Nodes are numbered in the order they are first seen and edges are kept as arrays of node numbers, one run of
+successors and one run of predecessors per node, instead of a dict of dicts per node. The parts of the
+networkx.DiGraph API that isatools uses on process graphs are provided, along with descendants, topological order and
+end-to-end paths.
+"""
+
+from array import array
+
+
+class _AdjacencyView(object):
+    """Read-only mapping of each node to its successors or predecessors, like networkx's G.succ and G.pred"""
+
+    def __init__(self, graph, offsets, targets):
+        self.__graph = graph
+        self.__offsets = offsets
+        self.__targets = targets
+
+    def neighbour_indexes(self, index):
+        return self.__targets[self.__offsets[index]:self.__offsets[index + 1]]
+
+    def __getitem__(self, node):
+        return tuple(self.__graph.node_at(i) for i in self.neighbour_indexes(self.__graph.index_of(node)))
+
+    def __iter__(self):
+        return iter(self.__graph)
+
+    def __len__(self):
+        return len(self.__graph)
+
+    def __contains__(self, node):
+        return node in self.__graph
+
+    def items(self):
+        for index, node in enumerate(self.__graph.nodes()):
+            yield node, tuple(self.__graph.node_at(i) for i in self.neighbour_indexes(index))
+
+
+class ProcessGraph(object):
+    """Directed graph of the materials, data files and processes of a study or assay
+
+    The graph is built once, from its edges, and is not changed afterwards.
+    """
+
+    def __init__(self, edges=()):
+        """
+        :param edges: Iterable of (from node, to node) pairs, duplicates being ignored. Nodes must be hashable.
+        """
+        self.__nodes = list()
+        self.__indexes = dict()
+        sources = array('l')
+        targets = array('l')
+        seen_edges = set()
+        for u, v in edges:
+            edge = (self.__add_node(u), self.__add_node(v))
+            if edge not in seen_edges:
+                seen_edges.add(edge)
+                sources.append(edge[0])
+                targets.append(edge[1])
+        del seen_edges
+        self.__succ_offsets, self.__succ_targets = self.__compress(sources, targets)
+        self.__pred_offsets, self.__pred_targets = self.__compress(targets, sources)
+        self.succ = _AdjacencyView(self, self.__succ_offsets, self.__succ_targets)
+        self.pred = _AdjacencyView(self, self.__pred_offsets, self.__pred_targets)
+
+    def __add_node(self, node):
+        index = self.__indexes.get(node)
+        if index is None:
+            index = len(self.__nodes)
+            self.__indexes[node] = index
+            self.__nodes.append(node)
+        return index
+
+    def __compress(self, froms, tos):
+        """Groups edges by their from node, keeping the order they were added in, as a compressed sparse row"""
+        num_nodes = len(self.__nodes)
+        offsets = array('l', [0]) * (num_nodes + 1)
+        for u in froms:
+            offsets[u + 1] += 1
+        for i in range(num_nodes):
+            offsets[i + 1] += offsets[i]
+        positions = array('l', offsets[:-1])
+        grouped = array('l', [0]) * len(tos)
+        for u, v in zip(froms, tos):
+            grouped[positions[u]] = v
+            positions[u] += 1
+        return offsets, grouped
+
+    def index_of(self, node):
+        try:
+            return self.__indexes[node]
+        except KeyError:
+            raise KeyError("The node {} is not in the graph".format(node))
+
+    def node_at(self, index):
+        return self.__nodes[index]
+
+    def __len__(self):
+        return len(self.__nodes)
+
+    def __iter__(self):
+        return iter(self.__nodes)
+
+    def __contains__(self, node):
+        try:
+            return node in self.__indexes
+        except TypeError:
+            return False
+
+    def has_node(self, node):
+        return node in self
+
+    def nodes(self):
+        return list(self.__nodes)
+
+    def edges(self):
+        return [(self.__nodes[u], self.__nodes[v]) for u in range(len(self.__nodes))
+                for v in self.succ.neighbour_indexes(u)]
+
+    def number_of_nodes(self):
+        return len(self.__nodes)
+
+    def number_of_edges(self):
+        return len(self.__succ_targets)
+
+    def successors(self, node):
+        return iter(self.succ[node])
+
+    def predecessors(self, node):
+        return iter(self.pred[node])
+
+    def out_degree(self, node):
+        index = self.index_of(node)
+        return self.__succ_offsets[index + 1] - self.__succ_offsets[index]
+
+    def in_degree(self, node):
+        index = self.index_of(node)
+        return self.__pred_offsets[index + 1] - self.__pred_offsets[index]
+
+    def out_edges(self, node):
+        return [(node, v) for v in self.succ[node]]
+
+    def in_edges(self, node):
+        return [(u, node) for u in self.pred[node]]
+
+    def descendants(self, node):
+        """Gets the nodes that can be reached from a node
+
+        :param node: The node to start from
+        :return: set of the nodes reachable from node, not including node itself
+        """
+        start = self.index_of(node)
+        seen = {start}
+        stack = [start]
+        while stack:
+            for v in self.succ.neighbour_indexes(stack.pop()):
+                if v not in seen:
+                    seen.add(v)
+                    stack.append(v)
+        seen.discard(start)
+        return set(self.__nodes[i] for i in seen)
+
+    def topological_order(self):
+        """Orders the nodes so that every edge goes from an earlier node to a later one
+
+        :return: list of nodes, or None if the graph has cycles
+        """
+        num_nodes = len(self.__nodes)
+        in_degrees = array('l', (self.__pred_offsets[i + 1] - self.__pred_offsets[i] for i in range(num_nodes)))
+        ready = [i for i in range(num_nodes) if in_degrees[i] == 0]
+        ordered_nodes = list()
+        while ready:
+            u = ready.pop()
+            ordered_nodes.append(self.__nodes[u])
+            for v in self.succ.neighbour_indexes(u):
+                in_degrees[v] -= 1
+                if in_degrees[v] == 0:
+                    ready.append(v)
+        if len(ordered_nodes) < num_nodes:
+            return None
+        return ordered_nodes
+
+    def end_to_end_paths(self, start_nodes, is_end):
+        """Generates the paths from each start node to the end nodes that can be reached from it, one at a time
+
+        :param start_nodes: Nodes the paths start from
+        :param is_end: Function telling if a node is one the paths end at
+        :return: generator of paths as lists of nodes
+        """
+        ends = dict()
+
+        def index_is_end(i):
+            if i not in ends:
+                ends[i] = bool(is_end(self.__nodes[i]))
+            return ends[i]
+
+        for start in start_nodes:
+            for path in self.__simple_paths(self.index_of(start), index_is_end):
+                yield path
+
+    def __simple_paths(self, start, index_is_end):
+        path = [start]
+        on_path = {start}
+        stack = [iter(self.succ.neighbour_indexes(start))]
+        while stack:
+            v = next(stack[-1], None)
+            if v is None:
+                stack.pop()
+                on_path.discard(path.pop())
+                continue
+            if v in on_path:
+                continue
+            if index_is_end(v):
+                yield [self.__nodes[i] for i in path] + [self.__nodes[v]]
+            path.append(v)
+            on_path.add(v)
+            stack.append(iter(self.succ.neighbour_indexes(v)))
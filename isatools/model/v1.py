@@ -14,28 +14,176 @@ Todo:
 
 """
 
+import itertools
+
 import networkx as nx
 
+from isatools.model.graph import ProcessGraph
 
-def _build_assay_graph(process_sequence=list()):
-    G = nx.DiGraph()
+# The graphs of studies and assays are networkx.DiGraph objects unless set_graph_backend('native') is called
+GRAPH_BACKENDS = ('networkx', 'native')
+_graph_backend = 'networkx'
+
+
+def set_graph_backend(backend):
+    """Sets what Study.graph and Assay.graph are built as
+
+    :param backend: 'networkx' for networkx.DiGraph, or 'native' for the more compact isatools.model.graph.ProcessGraph
+    """
+    global _graph_backend
+    if backend not in GRAPH_BACKENDS:
+        raise ValueError("Graph backend must be one of {}, not {}".format(', '.join(GRAPH_BACKENDS), backend))
+    _graph_backend = backend
+
+
+def get_graph_backend():
+    return _graph_backend
+
+
+def _iter_assay_graph_edges(process_sequence):
     for process in process_sequence:
         if process.next_process is not None or len(
                 process.outputs) > 0:  # first check if there's some valid outputs to connect
-            if len([n for n in process.outputs if not isinstance(n, DataFile)]) > 0:
-                for output in [n for n in process.outputs if not isinstance(n, DataFile)]:
-                    G.add_edge(process, output)
+            outputs_no_data = [n for n in process.outputs if not isinstance(n, DataFile)]
+            if len(outputs_no_data) > 0:
+                for output in outputs_no_data:
+                    yield (process, output)
             else:  # otherwise just connect the process to the next one
-                G.add_edge(process, process.next_process)
+                yield (process, process.next_process)
         if process.prev_process is not None or len(process.inputs) > 0:
             if len(process.inputs) > 0:
                 for input_ in process.inputs:
-                    G.add_edge(input_, process)
+                    yield (input_, process)
             else:
-                G.add_edge(process.prev_process, process)
+                yield (process.prev_process, process)
+
+
+def _build_assay_graph(process_sequence=list(), backend=None):
+    if (backend or _graph_backend) == 'native':
+        return ProcessGraph(_iter_assay_graph_edges(process_sequence))
+    G = nx.DiGraph()
+    G.add_edges_from(_iter_assay_graph_edges(process_sequence))
     return G
 
 
+# Version stamps of GraphLinkLists, drawn with next(), which is atomic, so that lists changed in different threads get
+# different stamps
+_graph_versions = itertools.count(1)
+
+
+class GraphLinkList(list):
+    """A list making up part of the process graphs, a process sequence or the inputs or outputs of a process, which
+    takes a new version whenever it is changed, so that graphs built from it can tell when they are out of date
+    without looking through it
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = next(_graph_versions)
+
+    def _changed(self):
+        self.version = next(_graph_versions)
+
+    def append(self, item):
+        super().append(item)
+        self._changed()
+
+    def extend(self, items):
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed()
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def pop(self, *args):
+        item = super().pop(*args)
+        self._changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def __setitem__(self, index, item):
+        super().__setitem__(index, item)
+        self._changed()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, items):
+        result = super().__iadd__(items)
+        self._changed()
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._changed()
+        return result
+
+
+def _link_list_key(items):
+    """Gets something that stays equal for a list of graph links only while the list is unchanged
+
+    A GraphLinkList is told apart by its version. Any other list, such as one assigned by the caller, which is kept as
+    it is so that the caller can go on changing it, is told apart by its items.
+    """
+    if isinstance(items, GraphLinkList):
+        return id(items), items.version
+    return id(items), tuple(items)
+
+
+def _graph_key(process_sequence):
+    """Gets something that stays equal for a process sequence only while the graph built from it would be the same"""
+    key = [_graph_backend, _link_list_key(process_sequence)]
+    for process in process_sequence:
+        inputs, outputs = process.inputs, process.outputs
+        key.append(id(inputs))
+        key.append(inputs.version if type(inputs) is GraphLinkList else tuple(inputs))
+        key.append(id(outputs))
+        key.append(outputs.version if type(outputs) is GraphLinkList else tuple(outputs))
+        key.append(process.prev_process)
+        key.append(process.next_process)
+    return key
+
+
+class _LazyList(object):
+    """An attribute holding a list that is only allocated when it is first used
+
+    Materials, characteristics and values are loaded in the hundreds of thousands, and most of their lists, such as
+    their comments, stay empty. The list is kept in a slot or attribute of another name, as None until it is needed.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.name)
+        if value is None:
+            value = list()
+            setattr(instance, self.name, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.name, value)
+
+
 class Comment(object):
     """A comment allows arbitrary annotation of all ISA classes
 
@@ -45,6 +193,8 @@ class Comment(object):
         name (str): The name of the comment (as mapped to Comment[SomeName] in ISA-Tab) to give context to the comment field.
         value (str, int, float, NoneType): A value for the corresponding comment, as a string or number.
     """
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, value=''):
         self.name = name
         self.value = value
@@ -56,11 +206,64 @@ class Commentable(object):
     Attributes:
         comments (list, NoneType): Comments associated with the implementing ISA class (all ISA classes).
     """
+    __slots__ = ('_comments',)
+
+    comments = _LazyList('_comments')
+
     def __init__(self, comments=None):
-        if comments is None:
-            self.comments = []
-        else:
-            self.comments = comments
+        self._comments = comments
+
+
+class _TableAttribute(object):
+    """An attribute of a study or assay that is filled in from its table file
+
+    If loading the table file has been left until it is needed, it is loaded when the attribute is first used, or
+    first set, so that a value set is not then replaced by the one from the file.
+    """
+
+    def __init__(self, name):
+        self.name = '_' + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance.load_tables()
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name[1:])
+
+    def __set__(self, instance, value):
+        instance.load_tables()
+        instance.__dict__[self.name] = value
+
+
+class _LazyTables(object):
+    """Lets a study or assay put off loading its table file until one of the attributes filled in from it is used"""
+
+    def set_table_loader(self, loader):
+        """Sets a function to fill in the attributes that come from the table file, when first used
+
+        :param loader: Function called as loader(study_or_assay), once
+        """
+        self.__dict__['_table_loader'] = loader
+
+    def load_tables(self):
+        """Loads the table file now, if loading it was put off and it has not been loaded yet
+
+        If loading fails, the error is raised and the table file is tried again the next time it is needed.
+        """
+        loader = self.__dict__.pop('_table_loader', None)  # taken off while loading, as loading uses the attributes
+        if loader is not None:
+            try:
+                loader(self)
+            except BaseException:
+                self.__dict__['_table_loader'] = loader
+                raise
+
+    @property
+    def tables_loaded(self):
+        return '_table_loader' not in self.__dict__
 
 
 class Investigation(Commentable):
@@ -139,6 +342,7 @@ class OntologyAnnotation(Commentable):
         term_accession (str, NoneType): A URI or resource-specific identifier for the term.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('__term', '__term_source', '__term_accession', 'id')
 
     def __init__(self, term=None, term_source=None, term_accession=None, comments=None, id_=''):
         super().__init__(comments)
@@ -298,7 +502,7 @@ class Person(Commentable):
         self.roles = roles
 
 
-class Study(Commentable, object):
+class Study(_LazyTables, Commentable):
     """Study is the central unit, containing information on the subject under study, its characteristics
     and any treatments applied.
 
@@ -321,7 +525,14 @@ class Study(Commentable, object):
         characteristic_categories (list, NoneType): A list of OntologyAnnotation used in the annotation of material characteristics in the study.
         process_sequence (list, NoneType): A list of Process objects representing the experimental graphs at the study level.
         comments (list, NoneType): Comments associated with instances of this class.
+
+    When loaded with isatab.load(fp, lazy=True), materials, units, characteristic_categories and process_sequence are
+    only read from the study table file when one of them is first used.
     """
+    materials = _TableAttribute('materials')
+    units = _TableAttribute('units')
+    characteristic_categories = _TableAttribute('characteristic_categories')
+    process_sequence = _TableAttribute('process_sequence')
 
     def __init__(self, id_='', filename="", identifier="",  title="", description="", submission_date='',
                  public_release_date='', contacts=None, design_descriptors=None, publications=None,
@@ -374,7 +585,7 @@ class Study(Commentable, object):
             self.materials['other_material'] = other_material
 
         if process_sequence is None:
-            self.process_sequence = list()
+            self.process_sequence = GraphLinkList()
         else:
             self.process_sequence = process_sequence
 
@@ -395,10 +606,16 @@ class Study(Commentable, object):
 
     @property
     def graph(self):
-        if len(self.process_sequence) > 0:
-            self.__graph = _build_assay_graph(self.process_sequence)
-        else:
-            self.__graph = None
+        """The process sequence as a networkx.DiGraph, built again only after the process sequence, or the inputs,
+        outputs or links of a process, have changed. Treat it as read-only, as it is shared by later accesses.
+        """
+        graph_key = _graph_key(self.process_sequence)
+        if getattr(self, '_Study__graph_key', None) != graph_key:
+            if len(self.process_sequence) > 0:
+                self.__graph = _build_assay_graph(self.process_sequence)
+            else:
+                self.__graph = None
+            self.__graph_key = graph_key
         return self.__graph
 
     @graph.setter
@@ -425,7 +642,7 @@ class StudyFactor(Commentable):
             self.factor_type = factor_type
 
 
-class Assay(Commentable):
+class Assay(_LazyTables, Commentable):
     """An Assay represents a test performed either on material taken from a subject or on a whole initial subject,
     producing qualitative or quantitative measurements. An Assay groups descriptions of provenance of sample processing
     for related tests. Each test typically follows the steps of one particular experimental workflow described by a
@@ -442,7 +659,16 @@ class Assay(Commentable):
         process_sequence (list, NoneType): A list of Process objects representing the experimental graphs at the Assay level.
         comments (list, NoneType): Comments associated with instances of this class.
         graph (networkx.DiGraph): A graph representation of the process_sequence using the networkx package.
+
+    When loaded with isatab.load(fp, lazy=True), materials, data_files, units, characteristic_categories and
+    process_sequence are only read from the assay table file, and that of its study, when one of them is first used.
     """
+    materials = _TableAttribute('materials')
+    data_files = _TableAttribute('data_files')
+    units = _TableAttribute('units')
+    characteristic_categories = _TableAttribute('characteristic_categories')
+    process_sequence = _TableAttribute('process_sequence')
+
     def __init__(self, measurement_type=None, technology_type=None, technology_platform="", filename="",
                  process_sequence=None, data_files=None, samples=None, other_material=None,
                  characteristic_categories=None, units=None, comments=None):
@@ -461,7 +687,7 @@ class Assay(Commentable):
         self.filename = filename
 
         if process_sequence is None:
-            self.process_sequence = list()
+            self.process_sequence = GraphLinkList()
         else:
             self.process_sequence = process_sequence
 
@@ -493,10 +719,16 @@ class Assay(Commentable):
 
     @property
     def graph(self):
-        if len(self.process_sequence) > 0:
-            self.__graph = _build_assay_graph(self.process_sequence)
-        else:
-            self.__graph = None
+        """The process sequence as a networkx.DiGraph, built again only after the process sequence, or the inputs,
+        outputs or links of a process, have changed. Treat it as read-only, as it is shared by later accesses.
+        """
+        graph_key = _graph_key(self.process_sequence)
+        if getattr(self, '_Assay__graph_key', None) != graph_key:
+            if len(self.process_sequence) > 0:
+                self.__graph = _build_assay_graph(self.process_sequence)
+            else:
+                self.__graph = None
+            self.__graph_key = graph_key
         return self.__graph
 
     @graph.setter
@@ -569,6 +801,8 @@ class ParameterValue(object):
         unit (OntologyAnnotation): The qualifying unit classifier, if the value is numeric.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('category', 'value', 'unit')
+
     def __init__(self, category=None, value=None, unit=None):
         super().__init__()
         # if category is None:
@@ -604,14 +838,15 @@ class Source(Commentable):
         characteristics (list, NoneType): A list of Characteristics used to qualify the material properties.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('id', 'name', '_characteristics')
+
+    characteristics = _LazyList('_characteristics')
+
     def __init__(self, name="", id_='', characteristics=None, comments=None):
         super().__init__(comments)
         self.id = id_
         self.name = name
-        if characteristics is None:
-            self.characteristics = list()
-        else:
-            self.characteristics = characteristics
+        self._characteristics = characteristics
 
 
 class Characteristic(Commentable):
@@ -622,6 +857,8 @@ class Characteristic(Commentable):
         value (OntologyAnnotation, NoneType): The value of this instance of a characteristic as relevant to the attached material.
         unit (OntologyAnnotation, NoneType): If applicable, a unit qualifier for the value (if the value is numeric).
         """
+    __slots__ = ('category', 'value', 'unit')
+
     def __init__(self, category=None, value=None, unit=None, comments=None):
         super().__init__(comments)
         if category is None:
@@ -645,22 +882,19 @@ class Sample(Commentable):
         derives_from (Source): A link to the source material that the sample is derived from.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('id', 'name', '_factor_values', '_characteristics', '_derives_from')
+
+    factor_values = _LazyList('_factor_values')
+    characteristics = _LazyList('_characteristics')
+    derives_from = _LazyList('_derives_from')
+
     def __init__(self, name="", id_='', factor_values=None, characteristics=None, derives_from=None, comments=None):
         super().__init__(comments)
         self.id = id_
         self.name = name
-        if factor_values is None:
-            self.factor_values = list()
-        else:
-            self.factor_values = factor_values
-        if characteristics is None:
-            self.characteristics = list()
-        else:
-            self.characteristics = characteristics
-        if derives_from is None:
-            self.derives_from = []
-        else:
-            self.derives_from = derives_from
+        self._factor_values = factor_values
+        self._characteristics = characteristics
+        self._derives_from = derives_from
 
 
 class Material(Commentable):
@@ -672,18 +906,20 @@ class Material(Commentable):
         derives_from (Source): A link to the material that this material is derived from.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('id', 'name', 'type', '_characteristics', 'derives_from')
+
+    characteristics = _LazyList('_characteristics')
+
     def __init__(self, name="", id_='', type_='', characteristics=None, derives_from=None, comments=None):
         super().__init__(comments)
         self.id = id_
         self.name = name
         self.type = type_
-        if characteristics is None:
-            self.characteristics = list()
-        else:
-            self.characteristics = characteristics
+        self._characteristics = characteristics
 
 
 class Extract(Material):
+    __slots__ = ()
 
     def __init__(self, name="", id_='', characteristics=None, derives_from=None, comments=None):
         super().__init__(name=name, id_=id_, characteristics=characteristics, derives_from=derives_from,
@@ -692,6 +928,7 @@ class Extract(Material):
 
 
 class LabeledExtract(Material):
+    __slots__ = ()
 
     def __init__(self, name="", id_='', characteristics=None, derives_from=None, comments=None):
         super().__init__(name=name, id_=id_, characteristics=characteristics, derives_from=derives_from,
@@ -708,6 +945,8 @@ class FactorValue(Commentable):
         unit (OntologyAnnotation, NoneType): If numeric, the unit qualifier for the value.
         comments (list, NoneType): Comments associated with instances of this class.
     """
+    __slots__ = ('factor_name', 'value', 'unit')
+
     def __init__(self, factor_name=None, value=None, unit=None, comments=None):
         super().__init__(comments)
         self.factor_name = factor_name
@@ -745,11 +984,11 @@ class Process(Commentable):
         else:
             self.parameter_values = parameter_values
         if inputs is None:
-            self.inputs = list()
+            self.inputs = GraphLinkList()
         else:
             self.inputs = inputs
         if outputs is None:
-            self.outputs = list()
+            self.outputs = GraphLinkList()
         else:
             self.outputs = outputs
         self.additional_properties = dict()
@@ -0,0 +1,163 @@
+"""Progress and warnings of loading and writing ISA-Tab
+
+isatools reports the progress of its long loops, and warnings about what it reads, such as a term source that is not
+declared, through the reporter current in the calling thread. isatab.load, isatab.dump and
+ProcessSequenceFactory.create_from_df called outside of any reporter run in a Reporter of their own, so library use
+shows no progress bars and prints nothing, but the warnings are still logged, once each, when the call returns. To see
+progress on the console, or to get the warnings afterwards:
+
+    from isatools.reporting import ConsoleReporter
+
+    with ConsoleReporter() as reporter:
+        ISA = isatab.load(fp)
+    print(reporter.result())
+
+Warnings are counted by message, so a warning repeated on every row of a table is printed and logged once, with the
+number of times it was seen.
+"""
+import functools
+import logging
+import threading
+from collections import OrderedDict
+
+from progressbar import ProgressBar, SimpleProgress, Bar, ETA
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class Reporter(object):
+    """Takes progress and warnings without showing them, counting the warnings
+
+    Entering the reporter makes it current in this thread until exit, when the warnings counted are logged.
+    """
+
+    def __init__(self, logger=logger):
+        """
+        :param logger: Logger to log the warnings counted to on exit, or None not to log them
+        """
+        self.logger = logger
+        self.warning_counts = OrderedDict()
+
+    def __enter__(self):
+        get_reporter_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        get_reporter_stack().pop()
+        if self.logger is not None:
+            self.log_warnings(self.logger)
+        return False
+
+    def progress(self, iterable, message, max_value=None):
+        """Wraps a loop to report its progress
+
+        :param iterable: What is looped over
+        :param message: What the loop is doing
+        :param max_value: Number of items in iterable, if it has no len()
+        :return: iterable, or an iterable over the same items
+        """
+        return iterable
+
+    def info(self, message):
+        """Reports what is going on, such as how many paths were found"""
+        logger.debug(message)
+
+    def warning(self, message, count=1):
+        """Reports something wrong with what is being read or written
+
+        :param message: The warning
+        :param count: Number of times the warning was seen
+        """
+        if message in self.warning_counts:
+            self.warning_counts[message] += count
+        else:
+            self.warning_counts[message] = count
+            self.new_warning(message)
+
+    def new_warning(self, message):
+        """Called the first time each warning is reported"""
+        pass
+
+    def add_warning_counts(self, warning_counts):
+        """Adds warnings counted by another reporter, such as one in a worker process"""
+        for message, count in warning_counts.items():
+            self.warning(message, count)
+
+    def log_warnings(self, log):
+        for message, count in self.warning_counts.items():
+            if count > 1:
+                log.warning("{} (seen {} times)".format(message, count))
+            else:
+                log.warning(message)
+
+    def result(self):
+        """Gets the warnings reported, each with the number of times it was seen
+
+        :return: dict with a list of warnings, as dicts with "message" and "count", and the total count
+        """
+        return {
+            "warnings": [{"message": message, "count": count} for message, count in self.warning_counts.items()],
+            "num_warnings": sum(self.warning_counts.values())
+        }
+
+
+class ConsoleReporter(Reporter):
+    """Shows progress bars, and prints messages and the first of each warning, as isatools did before reporters"""
+
+    def progress(self, iterable, message, max_value=None):
+        if max_value is None:
+            max_value = len(iterable)
+        pbar = ProgressBar(min_value=0, max_value=max_value, widgets=[message,
+                                                                      SimpleProgress(),
+                                                                      Bar(left=" |", right="| "), ETA()]).start()
+        for item in pbar(iterable):
+            yield item
+        pbar.finish()
+
+    def info(self, message):
+        print(message)
+
+    def new_warning(self, message):
+        print(message)
+
+
+class _QuietReporter(Reporter):
+    """The reporter outside of any other, which keeps nothing, so that it does not grow over a long-running process"""
+
+    def warning(self, message, count=1):
+        pass
+
+
+def get_reporter_stack():
+    try:
+        return _local.reporters
+    except AttributeError:
+        _local.reporters = list()
+        return _local.reporters
+
+
+def get_reporter():
+    """Gets the reporter current in this thread, or else one that ignores everything"""
+    reporters = get_reporter_stack()
+    if reporters:
+        return reporters[-1]
+    try:
+        return _local.default_reporter
+    except AttributeError:
+        _local.default_reporter = _QuietReporter(logger=None)
+        return _local.default_reporter
+
+
+def reported(func):
+    """Decorates a function to run in a Reporter of its own, logging its warnings on return, if called outside of any
+    other reporter
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if get_reporter_stack():
+            return func(*args, **kwargs)
+        with Reporter():
+            return func(*args, **kwargs)
+    return wrapper
@@ -30,7 +30,7 @@ def detect_graph_process_pooling(G):
     from isatools.model.v1 import Process
     report = list()
     for process in [n for n in G.nodes() if isinstance(n, Process)]:
-        if len(G.in_edges(process)) > 1:
+        if G.in_degree(process) > 1:
             print("Possible process pooling detected on: {}"
                   .format(' '.join([process.id, process.executes_protocol.name])))
             report.append(process.id)
@@ -0,0 +1,173 @@
+"""Errors, warnings and log output of the validation runs of isatab and isajson, kept apart per thread
+
+The check functions of isatab and isajson report into isatab.errors, isatab.warnings, isajson.errors and
+isajson.warnings, which stand for the lists of the ValidationContext current in the calling thread. validate() runs
+the checks in a context of its own. To call a check function on its own and look up what it reported, call it in a
+context too:
+
+    from isatools.validate.context import ValidationContext
+
+    with ValidationContext() as context:
+        isatab.check_field_values(table, cfg)
+    print(context.warnings)
+
+Outside of any context, what the check functions report is thrown away, with a warning, rather than kept in lists that
+grow over a long-running process. isatab.errors and the like are then always empty, whereas before they held what
+every check had reported since the last call of validate().
+"""
+import logging
+import threading
+import warnings
+from io import StringIO
+
+_local = threading.local()
+
+
+class ValidationContext(object):
+    """Errors, warnings and log output of one validation run
+
+    Entering the context makes it current in this thread, so that the check functions of isatab and isajson report
+    into it instead of into another validation running at the same time. Contexts can be nested, for instance when a
+    validation runs another one, and the enclosing one is current again on exit.
+    """
+
+    def __init__(self, log_level=logging.NOTSET):
+        """
+        :param log_level: Level below which log records of the validators are dropped while this context is current, as
+            well as those below the levels of their loggers
+        """
+        self.errors = list()
+        self.warnings = list()
+        self.log = StringIO()
+        self.log_level = log_level
+
+    def __enter__(self):
+        get_context_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        get_context_stack().pop()
+        return False
+
+    def report(self, validation_finished):
+        return {
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "validation_finished": validation_finished
+        }
+
+
+class _DiscardList(list):
+    """A list that stays empty, whatever is added to it, warning that it is thrown away"""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def discard(self):
+        warnings.warn("The {} reported by a check function outside of any ValidationContext are not kept; call it in a "
+                      "ValidationContext to look them up".format(self.name), stacklevel=4)
+
+    def append(self, item):
+        self.discard()
+
+    def extend(self, items):
+        self.discard()
+
+
+class _DiscardingContext(ValidationContext):
+    """The context outside of any validation, which keeps nothing, so that it does not grow over a long-running process"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = _DiscardList('errors')
+        self.warnings = _DiscardList('warnings')
+
+
+def get_context_stack():
+    try:
+        return _local.contexts
+    except AttributeError:
+        _local.contexts = list()
+        return _local.contexts
+
+
+def get_current_context():
+    """Gets the validation context current in this thread
+
+    Outside of any validation, this is a context that throws away what is reported into it, with a warning, so check
+    functions can still be called on their own. To look up their reports, call them in a ValidationContext.
+    """
+    contexts = get_context_stack()
+    if contexts:
+        return contexts[-1]
+    try:
+        return _local.default_context
+    except AttributeError:
+        _local.default_context = _DiscardingContext()
+        return _local.default_context
+
+
+class CurrentContextList(object):
+    """Stands for the errors or warnings list of whichever validation context is current in the calling thread"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_list(self):
+        return getattr(get_current_context(), self.name)
+
+    def append(self, item):
+        self.get_list().append(item)
+
+    def extend(self, items):
+        self.get_list().extend(items)
+
+    def __iter__(self):
+        return iter(self.get_list())
+
+    def __len__(self):
+        return len(self.get_list())
+
+    def __getitem__(self, index):
+        return self.get_list()[index]
+
+    def __repr__(self):
+        return repr(self.get_list())
+
+
+class ContextLogHandler(logging.Handler):
+    """Copies log records into the log of the validation context current in the calling thread, if any
+
+    One of these is added to a validator's logger once, rather than a handler per validation run.
+    """
+
+    def emit(self, record):
+        contexts = get_context_stack()
+        if not contexts:
+            return
+        try:
+            contexts[-1].log.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+class ContextLogFilter(logging.Filter):
+    """Drops log records below the log level of the validation context current in the calling thread, if any
+
+    This stands in for setting the level of a validator's logger for each validation run, which would change it for
+    other runs at the same time too. The level of the logger itself is left as the application set it, so records below
+    it are not logged whatever the level of the context.
+    """
+
+    def filter(self, record):
+        contexts = get_context_stack()
+        return not contexts or record.levelno >= contexts[-1].log_level
+
+
+def add_context_logging(logger):
+    """Sets up a validator's logger to log into, and at the log level of, the validation context current in the
+    calling thread
+    """
+    logger.addFilter(ContextLogFilter())
+    logger.addHandler(ContextLogHandler())
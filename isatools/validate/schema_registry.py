@@ -0,0 +1,123 @@
+"""JSON Schema validators compiled once and kept for the life of the process
+
+Validating against one of the ISA-JSON schemas used to read the schema again, and every schema it refers to with
+$ref, from disk on each run. Here the schemas under a directory are read once into a store of schemas by URI, so that
+every $ref is resolved from memory, and the validators made from them are kept. Schemas in isatools/schemas are
+preloaded together, and any other schema along with the directory it is in, such as the schemas of a configuration.
+
+    from isatools.validate import schema_registry
+
+    for error in schema_registry.iter_errors(isa_json, schema_path, max_errors=10):
+        print(error.message)
+
+A validator resolves $refs with a stack of scopes that changes as it validates, so each thread is given its own.
+"""
+import json
+import logging
+import os
+import pathlib
+import threading
+from itertools import islice
+
+from jsonschema import Draft4Validator, RefResolver
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'schemas'))
+
+_lock = threading.Lock()
+_stores = dict()  # directory -> {schema URI: schema}, shared by all threads
+
+_local = threading.local()
+
+
+def schema_uri(schema_path):
+    return pathlib.Path(os.path.abspath(schema_path)).as_uri()
+
+
+def load_schemas(schemas_dir):
+    """Reads all JSON schemas in a directory and its subdirectories
+
+    :param schemas_dir: Path to the directory
+    :return: dict of the schemas by their file URI
+    """
+    store = dict()
+    for dirpath, dirnames, filenames in os.walk(schemas_dir):
+        for filename in filenames:
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path) as fp:
+                    store[schema_uri(path)] = json.load(fp)
+            except ValueError as e:
+                logger.debug("Not preloading {}, as it is not JSON: {}".format(path, e))
+    return store
+
+
+def get_store(schema_path):
+    """Gets the schemas preloaded for a schema and those it may refer to, reading them on first use
+
+    :param schema_path: Path to the schema file
+    :return: dict of the schemas by their file URI
+    """
+    schema_path = os.path.abspath(schema_path)
+    if schema_path.startswith(SCHEMAS_DIR + os.sep):
+        schemas_dir = SCHEMAS_DIR
+    else:
+        schemas_dir = os.path.dirname(schema_path)
+    with _lock:
+        if schemas_dir not in _stores:
+            _stores[schemas_dir] = load_schemas(schemas_dir)
+        return _stores[schemas_dir]
+
+
+def get_validator(schema_path):
+    """Gets the Draft4Validator of a schema for this thread, making it on first use
+
+    :param schema_path: Path to the schema file
+    :return: Draft4Validator with every schema in the store of the schema preloaded into its resolver
+    """
+    try:
+        validators = _local.validators
+    except AttributeError:
+        validators = _local.validators = dict()
+    uri = schema_uri(schema_path)
+    try:
+        return validators[uri]
+    except KeyError:
+        pass
+    store = get_store(schema_path)
+    if uri in store:
+        schema = store[uri]
+    else:
+        with open(schema_path) as fp:
+            schema = json.load(fp)
+    resolver = RefResolver(uri, schema, store=dict(store))
+    validators[uri] = Draft4Validator(schema, resolver=resolver)
+    return validators[uri]
+
+
+def iter_errors(instance, schema_path, max_errors=None):
+    """Validates against a schema, stopping after a number of errors if given
+
+    :param instance: The JSON to validate
+    :param schema_path: Path to the schema file
+    :param max_errors: Number of errors to stop at, or None to find them all
+    :return: iterator over the ValidationErrors found
+    """
+    errors = get_validator(schema_path).iter_errors(instance)
+    if max_errors is not None:
+        errors = islice(errors, max_errors)
+    return errors
+
+
+def validate(instance, schema_path):
+    """Validates against a schema, as Draft4Validator.validate() does
+
+    :param instance: The JSON to validate
+    :param schema_path: Path to the schema file
+    :raises ValidationError: the first error found
+    """
+    for error in iter_errors(instance, schema_path, max_errors=1):
+        raise error
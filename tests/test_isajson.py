@@ -126,3 +126,146 @@ class TestIsaJson(unittest.TestCase):
         self.assertEqual(len(assay_gx['materials']['otherMaterials']), 29)  # 29 other materials in a_matteo-assay-Gx.txt
         self.assertEqual(len(assay_gx['dataFiles']), 29)  # 29 data files  in a_matteo-assay-Gx.txt
         self.assertEqual(len(assay_gx['processSequence']), 116)  # 116 processes in in a_matteo-assay-Gx.txt
+
+    def test_json_load_streamed_with_references_before_declarations(self):
+        from io import StringIO
+        from isatools.model.v1 import (Investigation, Study, Assay, Protocol, OntologyAnnotation, OntologySource,
+                                       Characteristic, Source, Sample, Process, DataFile)
+        obi = OntologySource(name='OBI')
+        organism = OntologyAnnotation(term='organism', id_='#characteristic_category/organism')
+        s = Study(filename='s_test.txt', identifier='S1', characteristic_categories=[organism],
+                  protocols=[Protocol(name='sample collection', id_='#protocol/sample_collection',
+                                      protocol_type=OntologyAnnotation(term='sample collection', term_source=obi)),
+                             Protocol(name='sequencing', id_='#protocol/sequencing',
+                                      protocol_type=OntologyAnnotation(term='nucleic acid sequencing'))])
+        source = Source(name='source1', id_='#source/source1', characteristics=[
+            Characteristic(category=organism, value=OntologyAnnotation(term='Homo sapiens', term_source=obi))])
+        sample = Sample(name='sample1', id_='#sample/sample1')
+        s.materials['sources'].append(source)
+        s.materials['samples'].append(sample)
+        s.process_sequence.append(Process(id_='#process/collection1', executes_protocol=s.protocols[0],
+                                          inputs=[source], outputs=[sample]))
+        a = Assay(filename='a_test.txt')
+        data_file = DataFile(filename='reads.fastq', label='Raw Data File', id_='#data/reads')
+        a.materials['samples'].append(sample)
+        a.data_files.append(data_file)
+        a.process_sequence.append(Process(id_='#process/sequencing1', name='run1', executes_protocol=s.protocols[1],
+                                          inputs=[sample], outputs=[data_file]))
+        s.assays.append(a)
+        i = Investigation(identifier='I1', ontology_source_references=[obi], studies=[s])
+        # sorted keys put materials and processes before the protocols and categories they refer to
+        i_json = json.dumps(i, cls=isajson.ISAJSONEncoder, sort_keys=True, indent=4)
+        chunk_size = isajson._JSONReader.chunk_size
+        isajson._JSONReader.chunk_size = 16
+        try:
+            ISA = isajson.load(StringIO(i_json))
+        finally:
+            isajson._JSONReader.chunk_size = chunk_size
+        study = ISA.studies[0]
+        source, sample = study.materials['sources'][0], study.materials['samples'][0]
+        self.assertIs(source.characteristics[0].category, study.characteristic_categories[0])
+        self.assertIs(source.characteristics[0].value.term_source, ISA.ontology_source_references[0])
+        self.assertIs(study.process_sequence[0].executes_protocol, study.protocols[0])
+        self.assertListEqual(study.process_sequence[0].inputs, [source])
+        assay = study.assays[0]
+        self.assertListEqual(assay.materials['samples'], [sample])
+        self.assertIs(assay.process_sequence[0].executes_protocol, study.protocols[1])
+        self.assertListEqual(assay.process_sequence[0].outputs, assay.data_files)
+        self.assertEqual(assay.process_sequence[0].name, 'run1')
+
+    def test_study_id_index(self):
+        from isatools.validate.context import ValidationContext
+        study_json = {
+            "materials": {
+                "sources": [{"@id": "#source/s1", "characteristics": [
+                    {"category": {"@id": "#characteristic_category/organism"}}]}],
+                "samples": [{"@id": "#sample/s1", "characteristics": [], "factorValues": [
+                    {"category": {"@id": "#factor/dose"}, "unit": {"@id": "#unit/mg"}}]}]
+            },
+            "protocols": [{"@id": "#protocol/p1", "parameters": [{"@id": "#parameter/p1"}]},
+                          {"@id": "#protocol/p2", "parameters": []}],
+            "factors": [{"@id": "#factor/dose"}],
+            "characteristicCategories": [{"@id": "#characteristic_category/organism"}],
+            "unitCategories": [{"@id": "#unit/mg"}, {"@id": "#unit/ml"}],
+            "processSequence": [{"@id": "#process/1", "executesProtocol": {"@id": "#protocol/p1"},
+                                 "parameterValues": [{"category": {"@id": "#parameter/p1"}}],
+                                 "inputs": [{"@id": "#source/s1"}], "outputs": [{"@id": "#sample/s1"}]}],
+            "assays": [{
+                "materials": {"samples": [{"@id": "#sample/s1"}],
+                              "otherMaterials": [{"@id": "#material/extract1"}]},
+                "dataFiles": [{"@id": "#data/d1"}],
+                "characteristicCategories": [],
+                "unitCategories": [],
+                "processSequence": [{"@id": "#process/2", "parameterValues": [],
+                                     "inputs": [{"@id": "#sample/s1"}], "outputs": [{"@id": "#material/extract1"}]}]
+            }]
+        }
+        id_index = isajson.StudyIdIndex(study_json)
+        self.assertListEqual(id_index.ids('io_ids'), ["#source/s1", "#sample/s1", "#sample/s1", "#material/extract1"])
+        self.assertSetEqual(id_index.id_set('unit_ids_used'), {"#unit/mg"})
+        self.assertSetEqual(id_index.id_set('protocol_ids_used'), {"#protocol/p1"})  # process 2 executes no protocol
+        with ValidationContext() as context:
+            isajson.check_material_ids_not_declared_used(study_json, id_index)
+            isajson.check_material_ids_declared_used(study_json, isajson.get_data_file_ids, id_index)
+            isajson.check_process_protocol_ids_usage(study_json, id_index)
+            isajson.check_unit_category_ids_usage(study_json, id_index)
+            report = context.report(True)
+        self.assertListEqual(report["errors"], [])
+        self.assertListEqual([warning["code"] for warning in report["warnings"]], [1017, 1019, 1022])
+        del study_json["factors"]
+        id_index = isajson.StudyIdIndex(study_json)
+        self.assertSetEqual(id_index.id_set('factor_ids_used'), {"#factor/dose"})
+        with self.assertRaises(KeyError):
+            id_index.ids('factor_ids')  # raised only for the kind of ids that are missing
+
+    def test_iter_annotations_with_paths(self):
+        organism = {"@id": "#organism", "annotationValue": "organism", "termAccession": "", "termSource": ""}
+        homo_sapiens = {"annotationValue": "Homo sapiens", "termAccession": "9606", "termSource": "NCBITAXON"}
+        isa_json = {"ontologySourceReferences": [{"name": "NCBITAXON"}, {"name": "OBI"}], "studies": [{
+            "characteristicCategories": [{"characteristicType": organism}],
+            "materials": {"sources": [{"characteristics": [{"category": {"@id": "#organism"},
+                                                            "value": homo_sapiens}]}]}}]}
+        self.assertListEqual(list(isajson.iter_annotations(isa_json)), [
+            (("studies", 0, "characteristicCategories", 0, "characteristicType"), organism),
+            (("studies", 0, "materials", "sources", 0, "characteristics", 0, "value"), homo_sapiens)])
+        deep = homo_sapiens
+        for i in range(10000):
+            deep = {"comments": [deep]}
+        (path, annotation), = isajson.iter_annotations(deep)
+        self.assertEqual(len(path), 20000)
+        self.assertIs(annotation, homo_sapiens)
+        from isatools.validate.context import ValidationContext
+        with ValidationContext() as context:
+            annotations = list(isajson.iter_annotations(isa_json))
+            isajson.check_term_source_refs(isa_json, annotations)
+            isajson.check_term_accession_used_no_source_ref(isa_json, annotations)
+            report = context.report(True)
+        self.assertListEqual([warning["code"] for warning in report["warnings"]], [3007])
+
+    def test_check_study_and_assay_graphs_shared_prefix(self):
+        from isatools.validate.context import ValidationContext
+        protocol_types = ["sample collection", "extraction", "labeling", "sequencing"]
+        protocols = [{"@id": "#protocol/{}".format(i), "protocolType": {"annotationValue": protocol_type}}
+                     for i, protocol_type in enumerate(protocol_types)]
+
+        def process(i, protocol, previous_process=None, next_process=None):
+            process_json = {"@id": "#process/{}".format(i), "executesProtocol": {"@id": "#protocol/{}".format(protocol)},
+                            "inputs": [{"@id": "#material/{}".format(i)}], "outputs": [{"@id": "#material/{}".format(i + 1)}]}
+            if previous_process is not None:
+                process_json["previousProcess"] = {"@id": "#process/{}".format(previous_process)}
+            if next_process is not None:
+                process_json["nextProcess"] = {"@id": "#process/{}".format(next_process)}
+            return process_json
+        # two graphs share the collection and extraction, and only the first is labeled before sequencing
+        process_sequence_json = [process(1, 0, next_process=2), process(2, 1, 1, 3), process(3, 2, 2, 4),
+                                 process(4, 3, 3), process(5, 3, 2)]
+        configs = {"study": {"description": "study", "protocols": [{"protocol": protocol_type}
+                                                                    for protocol_type in protocol_types]}}
+        study_json = {"protocols": protocols, "processSequence": process_sequence_json, "assays": []}
+        with ValidationContext() as context:
+            isajson.check_study_and_assay_graphs(study_json, configs)
+            isajson.check_process_sequence_links(process_sequence_json)
+            report = context.report(True)
+        self.assertListEqual(report["errors"], [])
+        self.assertEqual(len(report["warnings"]), 1)
+        self.assertIn("['sample collection', 'extraction', 'sequencing']", report["warnings"][0]["supplemental"])
@@ -888,6 +888,76 @@ sample1	extraction	extract1	scanning	datafile.raw"""
         self.assertIn(expected_line3, dumps_out)
 
 
+    def test_end_to_end_paths_sample_pool_protocol_ref_material_split(self):
+        extraction = Protocol(name='extraction', protocol_type=OntologyAnnotation(term='extraction'))
+        scanning = Protocol(name='scanning')
+        samples = [Sample(name='sample{}'.format(i)) for i in range(3)]
+        extracts = [Extract(name='extract{}'.format(i)) for i in range(2)]
+        extraction_process = Process(executes_protocol=extraction)
+        extraction_process.inputs = samples
+        extraction_process.outputs = extracts
+        scanning_processes = list()
+        for i, extract in enumerate(extracts):
+            scanning_process = Process(executes_protocol=scanning)
+            scanning_process.inputs = [extract]
+            scanning_process.outputs = [RawDataFile(filename='datafile{}.raw'.format(i))]
+            plink(extraction_process, scanning_process)
+            scanning_processes.append(scanning_process)
+        a = Assay(filename='a_test.txt')
+        a.process_sequence = [extraction_process] + scanning_processes
+
+        G = a.graph
+        paths = isatab.EndToEndPaths(G, samples, lambda x: isinstance(x, Process) and x.next_process is None)
+        self.assertEqual(len(paths), 6)
+        expected_paths = [[sample, extraction_process, extract, scanning_process]
+                          for sample in samples for extract, scanning_process in zip(extracts, scanning_processes)]
+        self.assertEqual(sorted(map(lambda path: [id(n) for n in path], paths)),
+                         sorted(map(lambda path: [id(n) for n in path], expected_paths)))
+        self.assertEqual(len(paths.longest()), 4)
+
+    def test_end_to_end_paths_cycle(self):
+        sample = Sample(name='sample1')
+        extracts = [Extract(name='extract{}'.format(i)) for i in range(2)]
+        extraction = Process(executes_protocol=Protocol(name='extraction'), inputs=[sample], outputs=[extracts[0]])
+        washing = Process(executes_protocol=Protocol(name='washing'), inputs=[extracts[0]], outputs=[extracts[1]])
+        rewashing = Process(executes_protocol=Protocol(name='washing'), inputs=[extracts[1]], outputs=[extracts[0]])
+        plink(extraction, washing)
+        a = Assay(filename='a_test.txt')
+        a.process_sequence = [extraction, washing, rewashing]
+        paths_by_backend = dict()
+        backend = get_graph_backend()
+        try:
+            for graph_backend in ('networkx', 'native'):
+                set_graph_backend(graph_backend)
+                paths = isatab.EndToEndPaths(a.graph, [sample],
+                                             lambda x: isinstance(x, Process) and x.next_process is None)
+                paths_by_backend[graph_backend] = sorted([id(n) for n in path] for path in paths)
+        finally:
+            set_graph_backend(backend)
+        self.assertEqual(paths_by_backend['native'], paths_by_backend['networkx'])
+        self.assertEqual(len(paths_by_backend['native']), 2)
+
+
+    def test_table_rows_write(self):
+        rows = isatab.TableRows(['Source Name', 'Source Name.Characteristics[age]', 'Source Name.Comment[note]',
+                                 'Protocol REF.sample collection', 'Sample Name.0'])
+        for source_name, age, sample_name in [('source2', 3, 'sample2'), ('source1', '', 'sample1'),
+                                              ('source2', 3, 'sample2'), ('source3', 4.5, 'sample3')]:
+            row = rows.new_row()
+            for slot, value in zip(range(5), [source_name, age, '', 'sample collection', sample_name]):
+                row[slot] = value
+            rows.add(row)
+        self.assertEqual(rows.num_added, 4)
+        self.assertEqual(len(rows), 3)
+        out_fp = StringIO()
+        rows.write(out_fp, ['Source Name', 'Characteristics[age]', 'Comment[note]', 'Protocol REF', 'Sample Name'])
+        self.assertEqual(out_fp.getvalue(), """Source Name	Characteristics[age]	Protocol REF	Sample Name
+source1		sample collection	sample1
+source2	3.0	sample collection	sample2
+source3	4.5	sample collection	sample3
+""")
+
+
 class UnitTestIsaTabLoad(unittest.TestCase):
 
     def setUp(self):
@@ -968,6 +1038,249 @@ sample1	extraction	e2	scanning	d2"""
         self.assertEqual(len(d), 2)
         self.assertEqual(len(pr), 3)
 
+    def test_source_protocol_ref_pool_sample_links_once(self):
+        factory = ProcessSequenceFactory(study_protocols=[Protocol(name="sample collection")])
+        table_to_load = """Source Name	Protocol REF	Sample Name
+source1	sample collection	sample1
+source2	sample collection	sample1
+source1	sample collection	sample1"""
+        DF = pd.read_csv(StringIO(table_to_load), sep='\t')
+        DF.isatab_header = ["Source Name", "Protocol REF", "Sample Name"]
+        so, sa, om, d, pr, _, __ = factory.create_from_df(DF)
+        process = list(pr.values())[0]
+        self.assertListEqual([x.name for x in process.inputs], ['source1', 'source2'])
+        self.assertListEqual([x.name for x in process.outputs], ['sample1'])
+        self.assertListEqual([x.name for x in sa['Sample Name:sample1'].derives_from], ['source1', 'source2'])
+
+    def test_process_keys_same_as_process_keygen(self):
+        table_to_load = """Sample Name	Protocol REF	Parameter Value[kit]	Extract Name	Protocol REF	Raw Data File
+sample1	extraction	kit1	e1	scanning	d1
+sample1	extraction	kit2	e2	scanning	d2
+sample2	extraction	kit1	e3	scanning	d2"""
+        DF = pd.read_csv(StringIO(table_to_load), sep='\t')
+        for _cg, column_group in enumerate(isatab.get_object_column_map(DF.columns, DF.columns)):
+            if column_group[0].startswith('Protocol REF'):
+                keys = isatab.process_keys(column_group, _cg, DF)
+                self.assertEqual(len(keys), len(DF.index))
+                for i, (_, series) in enumerate(DF.iterrows()):
+                    self.assertEqual(keys[i], isatab.process_keygen(str(series[column_group[0]]), column_group, _cg,
+                                                                    DF.columns, series, _, DF))
+
+    def test_get_value_layouts(self):
+        column_group = ['Source Name', 'Characteristics[organism]', 'Term Source REF', 'Term Accession Number',
+                        'Characteristics[age]', 'Unit', 'Term Source REF.1', 'Term Accession Number.1',
+                        'Characteristics[note]']
+        self.assertEqual(isatab.get_value_layout('Characteristics[organism]', column_group),
+                         ('ontology', ('Term Source REF', 'Term Accession Number')))
+        self.assertEqual(isatab.get_value_layout('Characteristics[age]', column_group),
+                         ('unit', ('Unit', 'Term Source REF.1', 'Term Accession Number.1')))
+        self.assertEqual(isatab.get_value_layout('Characteristics[note]', column_group), ('value', ()))
+        value_layouts = dict()
+        for _ in range(2):
+            self.assertEqual(isatab.get_value_layout('Characteristics[note]', column_group, value_layouts),
+                             ('value', ()))
+        self.assertDictEqual(value_layouts, {('Characteristics[note]', tuple(column_group)): ('value', ())})
+
+    def test_get_value_shares_ontology_annotations(self):
+        column_group = ['Source Name', 'Characteristics[organism]', 'Term Source REF', 'Term Accession Number']
+        ontology_source_map = {'NCBITAXON': OntologySource(name='NCBITAXON')}
+        ontology_annotations = {}
+        values = []
+        for source_name in ('source1', 'source2'):
+            row = dict(zip(column_group, [source_name, 'Homo sapiens', 'NCBITAXON',
+                                          'http://purl.obolibrary.org/obo/NCBITaxon_9606']))
+            v, u = isatab.get_value('Characteristics[organism]', column_group, row, ontology_source_map, {},
+                                    ontology_annotations)
+            self.assertIsNone(u)
+            values.append(v)
+        self.assertIs(values[0], values[1])
+        self.assertEqual(values[0].term, 'Homo sapiens')
+        self.assertEqual(values[0].term_source.name, 'NCBITAXON')
+        self.assertEqual(values[0].term_accession, 'http://purl.obolibrary.org/obo/NCBITaxon_9606')
+
+    def test_read_table_keeps_isatab_header(self):
+        table_to_load = """Source Name	Characteristics[organism]	Term Source REF	Term Accession Number	Protocol REF	Sample Name	Characteristics[organism part]	Term Source REF	Term Accession Number
+source1	Homo sapiens	NCBITAXON	9606	sample collection	sample1	liver	UBERON	0002107"""
+        DF = isatab.read_table(StringIO(table_to_load))
+        self.assertEqual(DF.isatab_header, table_to_load.split('\n')[0].split('\t'))
+        self.assertIn('Term Source REF.1', DF.columns)
+        self.assertEqual(DF.loc[0, 'Term Source REF.1'], 'UBERON')
+
+    def test_iter_tfile_chunks(self):
+        table_to_load = """Sample Name	Protocol REF	Extract Name
+sample1	extraction	e1
+sample2	extraction	e2
+sample3	extraction	e3"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            tfile_path = os.path.join(tmp_dir, 'a_test.txt')
+            with open(tfile_path, 'w') as tfile_fp:
+                tfile_fp.write(table_to_load)
+            chunks = list(isatab.iter_tfile(tfile_path, chunksize=2))
+            self.assertEqual([len(chunk.index) for chunk in chunks], [2, 1])
+            for chunk in chunks:
+                self.assertEqual(chunk.isatab_header, ['Sample Name', 'Protocol REF', 'Extract Name'])
+            self.assertEqual(list(chunks[1]['Extract Name']), ['e3'])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_isatab_load_lazy(self):
+        i = Investigation(identifier='I1', title='Investigation')
+        s = Study(filename='s_test.txt', identifier='S1', title='Study', description='A study',
+                  submission_date='2017-01-01', public_release_date='2017-01-01',
+                  protocols=[Protocol(name='sample collection'), Protocol(name='scanning')])
+        source1 = Source(name='source1')
+        sample1 = Sample(name='sample1')
+        s.process_sequence = [Process(executes_protocol=s.protocols[0], inputs=[source1], outputs=[sample1])]
+        a = Assay(filename='a_test.txt')
+        a.process_sequence = [Process(executes_protocol=s.protocols[1], inputs=[sample1],
+                                      outputs=[RawDataFile(filename='d1.raw')])]
+        s.assays = [a]
+        i.studies = [s]
+        isatab.dump(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+            ISA = isatab.load(fp, lazy=True)
+        study = ISA.studies[0]
+        assay = study.assays[0]
+        self.assertEqual(study.filename, 's_test.txt')
+        self.assertFalse(study.tables_loaded)
+        self.assertFalse(assay.tables_loaded)
+        self.assertListEqual([x.filename for x in assay.data_files], ['d1.raw'])
+        self.assertTrue(study.tables_loaded)
+        self.assertTrue(assay.tables_loaded)
+        self.assertListEqual([x.name for x in study.materials['samples']], ['sample1'])
+        self.assertIs(assay.materials['samples'][0], study.materials['samples'][0])
+        self.assertEqual(assay.process_sequence[0].executes_protocol.name, 'scanning')
+
+    def test_isatab_load_lazy_set_before_read_and_failed_load(self):
+        i = Investigation(identifier='I1', title='Investigation')
+        s = Study(filename='s_test.txt', identifier='S1', title='Study', protocols=[Protocol(name='sample collection')])
+        s.process_sequence = [Process(executes_protocol=s.protocols[0], inputs=[Source(name='source1')],
+                                      outputs=[Sample(name='sample1')])]
+        i.studies = [s]
+        isatab.dump(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+            ISA = isatab.load(fp, lazy=True)
+        study = ISA.studies[0]
+        study.process_sequence = []  # not replaced by the processes in the file when they are loaded
+        self.assertTrue(study.tables_loaded)
+        self.assertListEqual(study.process_sequence, [])
+        self.assertListEqual([x.name for x in study.materials['samples']], ['sample1'])
+        with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+            ISA = isatab.load(fp, lazy=True)
+        study = ISA.studies[0]
+        study_file = os.path.join(self._tmp_dir, 's_test.txt')
+        os.rename(study_file, study_file + '.moved')
+        for _ in range(2):
+            with self.assertRaises(FileNotFoundError):
+                study.materials
+            self.assertFalse(study.tables_loaded)
+        os.rename(study_file + '.moved', study_file)
+        self.assertListEqual([x.name for x in study.materials['samples']], ['sample1'])
+        self.assertTrue(study.tables_loaded)
+
+    def test_isatab_load_assays_in_parallel(self):
+        i = Investigation(identifier='I1', title='Investigation')
+        s = Study(filename='s_test.txt', identifier='S1', title='Study', description='A study',
+                  submission_date='2017-01-01', public_release_date='2017-01-01',
+                  protocols=[Protocol(name='sample collection'), Protocol(name='scanning')])
+        sources = [Source(name='source{}'.format(x)) for x in range(3)]
+        samples = [Sample(name='sample{}'.format(x)) for x in range(3)]
+        s.process_sequence = [Process(executes_protocol=s.protocols[0], inputs=[source], outputs=[sample])
+                              for source, sample in zip(sources, samples)]
+        for x in range(3):
+            a = Assay(filename='a_test{}.txt'.format(x))
+            a.process_sequence = [Process(executes_protocol=s.protocols[1], inputs=[sample],
+                                          outputs=[RawDataFile(filename='d{}{}.raw'.format(x, sample.name))])
+                                  for sample in samples[:x + 1]]
+            s.assays.append(a)
+        i.studies = [s]
+        isatab.dump(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+            ISA = isatab.load(fp, max_workers=2)
+        study = ISA.studies[0]
+        self.assertListEqual([len(x.data_files) for x in study.assays], [1, 2, 3])
+        for assay in study.assays:
+            for process in assay.process_sequence:
+                self.assertIn(process.inputs[0], study.materials['samples'])
+                self.assertIs(process.executes_protocol, study.protocols[1])
+                self.assertIs(process.outputs[0].generated_from[0], process.inputs[0])
+
+    def test_isatab_load_assays_in_parallel_sample_comments(self):
+        i = Investigation(identifier='I1', title='Investigation')
+        s = Study(filename='s_test.txt', identifier='S1', title='Study',
+                  protocols=[Protocol(name='sample collection'), Protocol(name='scanning')])
+        sample = Sample(name='sample1')
+        s.process_sequence = [Process(executes_protocol=s.protocols[0], inputs=[Source(name='source1')],
+                                      outputs=[sample])]
+        for x in range(2):
+            a = Assay(filename='a_test{}.txt'.format(x))
+            a.process_sequence = [Process(executes_protocol=s.protocols[1], inputs=[sample],
+                                          outputs=[RawDataFile(filename='d{}.raw'.format(x))])]
+            s.assays.append(a)
+        i.studies = [s]
+        isatab.dump(i, self._tmp_dir)
+        for x in range(2):
+            a_file = os.path.join(self._tmp_dir, 'a_test{}.txt'.format(x))
+            with open(a_file) as fp:
+                header, row = fp.read().splitlines()
+            with open(a_file, 'w') as fp:
+                fp.write(header.replace('Sample Name', 'Sample Name\tComment[note]') + '\n')
+                fp.write(row.replace('sample1', 'sample1\tnote{}'.format(x)) + '\n')
+        for max_workers in (1, 2):
+            with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+                ISA = isatab.load(fp, max_workers=max_workers)
+            comments = ISA.studies[0].materials['samples'][0].comments
+            self.assertListEqual([(x.name, x.value) for x in comments], [('note', 'note0')])
+
+    def test_read_investigation_file_in_sections(self):
+        i_file = """ONTOLOGY SOURCE REFERENCE
+Term Source Name	OBI	EFO
+Term Source File	http://purl.obolibrary.org/obo/obi.owl	http://www.ebi.ac.uk/efo/efo.owl#
+INVESTIGATION
+Investigation Identifier	I1
+INVESTIGATION PUBLICATIONS
+Investigation PubMed ID
+INVESTIGATION CONTACTS
+Investigation Person Last Name
+STUDY
+Study Identifier	S1
+Study File Name	s_test.txt
+STUDY DESIGN DESCRIPTORS
+Study Design Type
+STUDY PUBLICATIONS
+Study PubMed ID
+Study Publication DOI	doi:1	doi:2
+Study Publication Status	published	published
+STUDY FACTORS
+Study Factor Name
+STUDY ASSAYS
+Study Assay File Name	a_test.txt
+STUDY PROTOCOLS
+Study Protocol Name	sample collection
+Study Protocol Description	collected #1
+STUDY CONTACTS
+Study Person Last Name	Smith
+Comment[Study Person ORCID]
+Comment[Study Person ORCID]	0000-0000
+"""
+        sections = list(isatab.iter_investigation_sections(StringIO(i_file)))
+        self.assertListEqual([key for key, _ in sections], ['ONTOLOGY SOURCE REFERENCE', 'INVESTIGATION',
+                                                            'INVESTIGATION PUBLICATIONS', 'INVESTIGATION CONTACTS',
+                                                            'STUDY', 'STUDY DESIGN DESCRIPTORS', 'STUDY PUBLICATIONS',
+                                                            'STUDY FACTORS', 'STUDY ASSAYS', 'STUDY PROTOCOLS',
+                                                            'STUDY CONTACTS'])
+        self.assertEqual(sections[0][1][1], ('Term Source File', ['http://purl.obolibrary.org/obo/obi.owl',
+                                                                  'http://www.ebi.ac.uk/efo/efo.owl#']))
+        df_dict = isatab.read_investigation_file(StringIO(i_file))
+        self.assertListEqual(df_dict['ontology_sources']['Term Source Name'].tolist(), ['OBI', 'EFO'])
+        self.assertListEqual(df_dict['ontology_sources']['Term Source File'].tolist(),
+                             ['http://purl.obolibrary.org/obo/obi.owl', 'http://www.ebi.ac.uk/efo/efo.owl#'])
+        self.assertListEqual(df_dict['s_protocols'][0]['Study Protocol Description'].tolist(), ['collected #1'])
+        self.assertListEqual(df_dict['s_publications'][0]['Study Publication DOI'].tolist(), ['doi:1', 'doi:2'])
+        self.assertListEqual(df_dict['s_contacts'][0]['Comment[Study Person ORCID]'].values.tolist(),
+                             [['', '0000-0000']])
+
     def test_isatab_load_issue210_on_MTBLS30(self):
         with open(os.path.join(self._tab_data_dir, 'MTBLS30', 'i_Investigation.txt')) as fp:
             ISA = isatab.load(fp)
@@ -53,3 +53,54 @@ class TestIsaTabConfigurator(unittest.TestCase):
                          .table_name,'metagenome_seq')
         self.assertEqual(configurator.get_config(
             config_dict, 'metagenome sequencing', 'nucleotide sequencing')[0].header, 'Sample Name')
+
+    def test_load_config_indexes_fields(self):
+        from isatools.io import isatab_configurator as configurator
+        config = configurator.load(self._config_dir)[('genome sequencing', 'nucleotide sequencing')]
+        table_config = config.isatab_configuration[0]
+        self.assertEqual(config.headers, [f.header for f in table_config.field])
+        self.assertEqual(config.required_headers, [f.header for f in table_config.field if f.is_required])
+        self.assertIs(config.get_field_by_header('Sample Name'), table_config.field[0])
+        self.assertIs(config.get_field_by_lower_header('sample name'), table_config.field[0])
+        self.assertIsNone(config.get_field_by_header('Not A Field'))
+        protocol_types = [p.protocol_type for p in table_config.protocol_field]
+        self.assertEqual(config.get_protocol_types_between(-1, len(table_config.field) + 100), protocol_types)
+        self.assertEqual(config.get_protocol_types_between(0, 0), [])
+
+
+class TestIsaTabConfiguratorCache(unittest.TestCase):
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from isatools import isatab
+        self._tmp_dir = tempfile.mkdtemp()
+        self._config_dir = os.path.join(self._tmp_dir, 'xml')
+        self._cache_dir = os.path.join(self._tmp_dir, 'cache')
+        shutil.copytree(isatab.default_config_dir, self._config_dir)
+
+    def tearDown(self):
+        import shutil
+        from isatools.io import isatab_configurator as configurator
+        configurator.clear_configs_registry()
+        shutil.rmtree(self._tmp_dir)
+
+    def test_load_reuses_configs_until_a_file_changes(self):
+        from isatools.io import isatab_configurator as configurator
+        config_dict = configurator.load(self._config_dir)
+        self.assertIs(configurator.load(self._config_dir)[('[Sample]', '')], config_dict[('[Sample]', '')])
+        os.remove(os.path.join(self._config_dir, 'genome_seq.xml'))
+        reloaded_config_dict = configurator.load(self._config_dir)
+        self.assertNotIn(('genome sequencing', 'nucleotide sequencing'), reloaded_config_dict)
+        self.assertIsNot(reloaded_config_dict[('[Sample]', '')], config_dict[('[Sample]', '')])
+
+    def test_load_from_pickled_cache(self):
+        from isatools.io import isatab_configurator as configurator
+        config_dict = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        self.assertEqual(len(os.listdir(self._cache_dir)), 1)
+        configurator.clear_configs_registry()
+        cached_config_dict = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        self.assertEqual(sorted(cached_config_dict.keys()), sorted(config_dict.keys()))
+        self.assertIsNot(cached_config_dict[('[Sample]', '')], config_dict[('[Sample]', '')])
+        self.assertEqual(cached_config_dict[('[Sample]', '')].headers, config_dict[('[Sample]', '')].headers)
+        self.assertEqual(cached_config_dict[('[Sample]', '')].isatab_configuration[0].table_name, 'studySample')
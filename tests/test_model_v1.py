@@ -45,4 +45,112 @@ class TestSimpleExamples(unittest.TestCase):
             self.assertIsInstance(material, Sample)
             self.assertEqual(material.derives_from, source)
         self.assertSetEqual(set([m.name for m in batch]), {'sample_material-0', 'sample_material-1',
-                                                           'sample_material-2'})
\ No newline at end of file
+                                                           'sample_material-2'})
+
+    def test_assay_graph_rebuilt_only_after_changes(self):
+        from isatools.model.v1 import Assay, Process, Sample, Material
+        sample = Sample(name='sample1')
+        extract = Material(name='extract1', type_='Extract Name')
+        process = Process(inputs=[sample], outputs=[extract])
+        assay = Assay()
+        self.assertIsNone(assay.graph)
+        assay.process_sequence.append(process)
+        graph = assay.graph
+        self.assertIs(assay.graph, graph)
+        self.assertEqual(set(graph.nodes()), {sample, extract, process})
+        labeled_extract = Material(name='lextract1', type_='Labeled Extract Name')
+        process.outputs.append(labeled_extract)
+        self.assertIsNot(assay.graph, graph)
+        self.assertIn(labeled_extract, assay.graph.nodes())
+        assay.process_sequence = []
+        self.assertIsNone(assay.graph)
+
+    def test_graph_follows_lists_assigned(self):
+        from isatools.model.v1 import Study, Process, Sample, Source, Material
+        source, sample, extract = Source(name='source1'), Sample(name='sample1'), Material(name='extract1')
+        inputs = [source]
+        process = Process()
+        process.inputs = inputs
+        inputs.append(sample)
+        self.assertIs(process.inputs, inputs)
+        self.assertListEqual(process.inputs, [source, sample])
+        study = Study()
+        process_sequence = [process]
+        study.process_sequence = process_sequence
+        self.assertIs(study.process_sequence, process_sequence)
+        graph = study.graph
+        self.assertIs(study.graph, graph)
+        process_sequence.append(Process(inputs=[sample], outputs=[extract]))
+        self.assertIn(extract, study.graph.nodes())
+        other_study = Study(process_sequence=[Process(inputs=[source], outputs=[sample])])
+        other_graph = other_study.graph
+        study.process_sequence.append(Process())  # changes to one study leave the graphs of others alone
+        self.assertIs(other_study.graph, other_graph)
+
+    def test_native_graph_backend(self):
+        from isatools.model.v1 import Assay, Process, Sample, Material, set_graph_backend
+        from isatools.model.graph import ProcessGraph
+        samples = [Sample(name='sample1'), Sample(name='sample2')]
+        extract = Material(name='extract1', type_='Extract Name')
+        labeled_extract = Material(name='lextract1', type_='Labeled Extract Name')
+        extraction = Process(inputs=samples, outputs=[extract])
+        labeling = Process(inputs=[extract], outputs=[labeled_extract])
+        assay = Assay()
+        assay.process_sequence = [extraction, labeling]
+        set_graph_backend('native')
+        try:
+            G = assay.graph
+        finally:
+            set_graph_backend('networkx')
+        self.assertIsInstance(G, ProcessGraph)
+        self.assertEqual(G.number_of_nodes(), 6)
+        self.assertEqual(G.in_degree(extraction), 2)
+        self.assertEqual(G.out_degree(extract), 1)
+        self.assertEqual(G.descendants(samples[0]), {extraction, extract, labeling, labeled_extract})
+        order = G.topological_order()
+        self.assertLess(order.index(extract), order.index(labeling))
+        self.assertListEqual(list(G.end_to_end_paths(samples, lambda x: x is labeled_extract)),
+                             [[sample, extraction, extract, labeling, labeled_extract] for sample in samples])
+        self.assertNotIsInstance(assay.graph, ProcessGraph)
+
+    def test_material_memory_benchmark(self):
+        import tracemalloc
+        from isatools.model.v1 import Sample, Characteristic, OntologyAnnotation
+
+        class DictBackedSample(object):  # how samples were laid out before they were slotted
+            def __init__(self, name, characteristics):
+                self.comments = list()
+                self.id = ''
+                self.name = name
+                self.factor_values = list()
+                self.characteristics = characteristics
+                self.derives_from = list()
+
+        class DictBackedCharacteristic(object):
+            def __init__(self, category, value):
+                self.comments = list()
+                self.category = category
+                self.value = value
+                self.unit = None
+
+        category = OntologyAnnotation(term='organism part')
+        value = OntologyAnnotation(term='liver')
+
+        def measure(sample_class, characteristic_class):
+            tracemalloc.start()
+            samples = [sample_class(name='sample{}'.format(i),
+                                    characteristics=[characteristic_class(category=category, value=value)])
+                       for i in range(10000)]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            self.assertEqual(len(samples), 10000)
+            return size
+
+        slotted_size = measure(Sample, Characteristic)
+        dict_backed_size = measure(DictBackedSample, DictBackedCharacteristic)
+        self.assertLess(slotted_size, dict_backed_size * 0.6)
+        sample = Sample(name='sample')
+        self.assertFalse(hasattr(sample, '__dict__'))
+        self.assertIsNone(sample._comments)
+        sample.comments.append('a comment')
+        self.assertListEqual(sample.comments, ['a comment'])
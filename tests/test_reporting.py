@@ -0,0 +1,58 @@
+import unittest
+import logging
+from io import StringIO
+from contextlib import redirect_stdout
+import pandas as pd
+from isatools.model.v1 import *
+from isatools.isatab import ProcessSequenceFactory
+from isatools.reporting import Reporter, ConsoleReporter, get_reporter
+
+
+class TestReporting(unittest.TestCase):
+
+    def setUp(self):
+        self._table = """Sample Name	Protocol REF	Extract Name
+sample1	extraction	e1
+sample2	extraction	e2
+sample3	extraction	e3"""
+
+    def load_table(self):
+        factory = ProcessSequenceFactory(study_samples=[Sample(name='sample1')],
+                                         study_protocols=[Protocol(name='extraction')])
+        DF = pd.read_csv(StringIO(self._table), sep='\t')
+        DF.isatab_header = ["Sample Name", "Protocol REF", "Extract Name"]
+        return factory.create_from_df(DF)
+
+    def test_quiet_by_default(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            self.load_table()
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(get_reporter().result()['num_warnings'], 0)
+
+    def test_warnings_logged_by_default(self):
+        with self.assertLogs('isatools.reporting', level='WARNING') as logs:
+            self.load_table()
+        self.assertListEqual(logs.output, ["WARNING:isatools.reporting:warning! Did not find sample referenced at "
+                                           "assay level in study samples (seen 2 times)"])
+
+    def test_warnings_counted_once_each(self):
+        log_stream = StringIO()
+        log = logging.getLogger('test_reporting')
+        log.addHandler(logging.StreamHandler(log_stream))
+        with Reporter(logger=log) as reporter:
+            self.load_table()
+        self.assertDictEqual(reporter.result(), {
+            "warnings": [{"message": "warning! Did not find sample referenced at assay level in study samples",
+                          "count": 2}],
+            "num_warnings": 2
+        })
+        self.assertEqual(log_stream.getvalue(), "warning! Did not find sample referenced at assay level in study "
+                                                "samples (seen 2 times)\n")
+
+    def test_console_reporter_prints_each_warning_once(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            with ConsoleReporter(logger=None):
+                self.load_table()
+        self.assertEqual(out.getvalue().count("warning! Did not find sample"), 1)
@@ -24,3 +24,35 @@ class TestIsaJsonSchemas(unittest.TestCase):
     def test_cedar_schemas(self):
         folder = os.path.join(self._schemas_dir, "cedar")
         validateSchemasInFolder(folder)
+
+
+class TestSchemaRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self._investigation_schema = os.path.join(os.path.dirname(__file__), '..', 'isatools', 'schemas',
+                                                  'isa_model_version_1_0_schemas', 'core', 'investigation_schema.json')
+
+    def test_validator_refs_preloaded(self):
+        from unittest import mock
+        from jsonschema import RefResolver
+        from isatools.validate import schema_registry
+        validator = schema_registry.get_validator(self._investigation_schema)
+        self.assertIs(schema_registry.get_validator(self._investigation_schema), validator)
+        study = {"filename": "s_test.txt", "materials": {"sources": [{"name": 1}]}, "processSequence": [{"inputs": 1}]}
+        with mock.patch.object(RefResolver, 'resolve_remote', side_effect=AssertionError("$ref read from disk")):
+            schema_errors = list(schema_registry.iter_errors({"studies": [study]}, self._investigation_schema))
+            self.assertGreater(len(schema_errors), 1)
+            self.assertEqual(len(list(schema_registry.iter_errors({"studies": [study]}, self._investigation_schema,
+                                                                  max_errors=1))), 1)
+            schema_registry.validate({"identifier": "I1", "studies": []}, self._investigation_schema)
+
+    def test_validator_per_thread(self):
+        from threading import Thread
+        from isatools.validate import schema_registry
+        validators = list()
+        thread = Thread(target=lambda: validators.append(schema_registry.get_validator(self._investigation_schema)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(validators[0], schema_registry.get_validator(self._investigation_schema))
+        self.assertIs(validators[0].resolver.store[validators[0].resolver.base_uri],
+                      schema_registry.get_validator(self._investigation_schema).schema)
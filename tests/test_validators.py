@@ -1,5 +1,7 @@
 import unittest
+import logging
 from isatools import isajson, isatab
+from isatools.validate.context import ValidationContext
 import os
 from tests import utils
 import tempfile
@@ -334,6 +336,150 @@ class TestValidateIsaTab(unittest.TestCase):
                 self.fail("Validation error and warnings are missing when should report some with BII-S-7")
 
 
+class TestIsaTabTableCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._table_path = os.path.join(self._tmp_dir, 's_study.txt')
+        with open(self._table_path, 'w') as fp:
+            fp.write('Source Name\tProtocol REF\tSample Name\nsource1\tsample collection\tsample1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_table_cache_parses_once(self):
+        table_cache = isatab.TableCache()
+        table = table_cache.load(self._table_path)
+        self.assertIs(table_cache.load(os.path.join(self._tmp_dir, '.', 's_study.txt')), table)
+        self.assertEqual(len(table_cache), 1)
+        self.assertEqual(list(table['Sample Name']), ['sample1'])
+
+    def test_table_cache_reloads_modified_table(self):
+        table_cache = isatab.TableCache()
+        table = table_cache.load(self._table_path)
+        with open(self._table_path, 'a') as fp:
+            fp.write('source2\tsample collection\tsample2\n')
+        os.utime(self._table_path, (os.path.getatime(self._table_path), os.path.getmtime(self._table_path) + 1))
+        self.assertIsNot(table_cache.load(self._table_path), table)
+        self.assertEqual(list(table_cache.load(self._table_path)['Sample Name']), ['sample1', 'sample2'])
+
+    def test_table_cache_missing_table(self):
+        with self.assertRaises(FileNotFoundError):
+            isatab.TableCache().load(os.path.join(self._tmp_dir, 'a_missing.txt'))
+
+
+class TestIsaTabTableChecks(unittest.TestCase):
+
+    def setUp(self):
+        from isatools.io import isatab_configurator
+        self._sample_config = isatab_configurator.load(isatab.default_config_dir)[('[Sample]', '')]
+
+    def test_check_field_values_reports_missing_required_values_in_row_order(self):
+        import pandas as pd
+        import numpy as np
+        table = pd.DataFrame({'Source Name': ['source1', '', 'source3', np.nan],
+                              'Protocol REF': ['sample collection'] * 4,
+                              'Sample Name': ['sample1', 'sample2', ' ', 'sample4']},
+                             columns=['Source Name', 'Protocol REF', 'Sample Name'])
+        table.filename = 's_test.txt'
+        with ValidationContext() as context:
+            self.assertTrue(isatab.check_field_values(table, self._sample_config))
+        self.assertEqual([(w['code'], w['supplemental']) for w in context.warnings], [
+            (4012, "Missing value for the required field 'Source Name' in the file 's_test.txt'"),
+            (4012, "Missing value for the required field 'Sample Name' in the file 's_test.txt'"),
+            (4010, "Missing value for the required field 'Source Name' in the file 's_test.txt'")])
+
+
+class TestValidationContext(unittest.TestCase):
+
+    def setUp(self):
+        from isatools.io import isatab_configurator
+        self._sample_config = isatab_configurator.load(isatab.default_config_dir)[('[Sample]', '')]
+        self._tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _check_missing_source_names(self, n, reports):
+        import pandas as pd
+        table = pd.DataFrame({'Source Name': [''] * n, 'Protocol REF': ['sample collection'] * n,
+                              'Sample Name': ['sample{}'.format(i) for i in range(n)]},
+                             columns=['Source Name', 'Protocol REF', 'Sample Name'])
+        table.filename = 's_{}.txt'.format(n)
+        with ValidationContext() as context:
+            isatab.check_field_values(table, self._sample_config)
+        reports[n] = context.warnings
+
+    def test_concurrent_contexts_do_not_mix_reports(self):
+        import threading
+        reports = dict()
+        threads = [threading.Thread(target=self._check_missing_source_names, args=(n, reports)) for n in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for n, warnings in reports.items():
+            self.assertEqual(set(w['supplemental'] for w in warnings),
+                             {"Missing value for the required field 'Source Name' in the file 's_{}.txt'".format(n)})
+
+    def test_nested_contexts(self):
+        with ValidationContext() as outer_context:
+            isatab.errors.append({"message": "outer", "supplemental": "", "code": 0})
+            with ValidationContext() as inner_context:
+                isatab.errors.append({"message": "inner", "supplemental": "", "code": 0})
+            isatab.warnings.append({"message": "outer", "supplemental": "", "code": 0})
+        self.assertEqual([e['message'] for e in outer_context.errors], ['outer'])
+        self.assertEqual([w['message'] for w in outer_context.warnings], ['outer'])
+        self.assertEqual([e['message'] for e in inner_context.errors], ['inner'])
+
+    def test_validate_does_not_add_log_handlers(self):
+        i_file_path = os.path.join(self._tmp_dir, 'i_broken.txt')
+        with open(i_file_path, 'w') as i_fp:
+            i_fp.write('not an investigation file\n')
+        handler_count = len(isatab.logger.handlers)
+        for _ in range(3):
+            with open(i_file_path) as i_fp:
+                report = isatab.validate(i_fp)
+            self.assertFalse(report['validation_finished'])
+        self.assertEqual(len(isatab.logger.handlers), handler_count)
+
+    def test_reports_outside_of_contexts_are_not_kept(self):
+        import pandas as pd
+        table = pd.DataFrame({'Source Name': [''], 'Protocol REF': ['sample collection'], 'Sample Name': ['sample1']},
+                             columns=['Source Name', 'Protocol REF', 'Sample Name'])
+        table.filename = 's_test.txt'
+        with self.assertWarns(UserWarning):
+            isatab.check_field_values(table, self._sample_config)
+        with self.assertWarns(UserWarning):
+            isatab.errors.append({"message": "outside", "supplemental": "", "code": 0})
+        self.assertEqual(len(isatab.warnings), 0)
+        self.assertEqual(len(isatab.errors), 0)
+
+    def test_log_level_of_each_validation(self):
+        i_file_path = os.path.join(self._tmp_dir, 'i_broken.txt')
+        with open(i_file_path, 'w') as i_fp:
+            i_fp.write('not an investigation file\n')
+        self.assertEqual(isatab.logger.level, logging.NOTSET)  # left for applications to set
+        with self.assertLogs('isatools.isatab', level='INFO') as logs:
+            with open(i_file_path) as i_fp:
+                isatab.validate(i_fp, log_level=logging.ERROR)
+        self.assertTrue(logs.records)
+        self.assertTrue(all(record.levelno >= logging.ERROR for record in logs.records))
+        with ValidationContext(log_level=logging.WARNING) as context:
+            isatab.logger.warning("Before validation")
+            with open(i_file_path) as i_fp:
+                isatab.validate(i_fp, log_level=logging.CRITICAL + 1)
+            isatab.logger.warning("After validation")
+        self.assertEqual(context.log.getvalue().splitlines(), ["Before validation", "After validation"])
+        self.assertEqual(isatab.logger.level, logging.NOTSET)
+
+
+def _validate_archive_or_die(i_file_path, config_dir, config_cache_dir, timeout):
+    if 'crash' in i_file_path:
+        os._exit(1)
+    return {"filename": i_file_path, "report": {"errors": [], "warnings": [], "validation_finished": True}}
+
+
 class TestBatchValidateIsaTab(unittest.TestCase):
 
     def setUp(self):
@@ -352,6 +498,66 @@ class TestBatchValidateIsaTab(unittest.TestCase):
         batch_report = isatab.batch_validate(self._bii_tab_dir_list)
         self.assertTrue(len([f['filename'] for f in batch_report['batch_report']]) == len(self._bii_tab_dir_list))
 
+    def test_batch_validate_bii_in_parallel(self):
+        batch_report = isatab.batch_validate(self._bii_tab_dir_list)
+        parallel_batch_report = isatab.batch_validate(self._bii_tab_dir_list, max_workers=2)
+        self.assertEqual([f['filename'] for f in parallel_batch_report['batch_report']],
+                         [f['filename'] for f in batch_report['batch_report']])
+        self.assertEqual([f['report']['errors'] for f in parallel_batch_report['batch_report']],
+                         [f['report']['errors'] for f in batch_report['batch_report']])
+
+    def test_batch_validate_bii_timeout(self):
+        batch_report = isatab.batch_validate(self._bii_tab_dir_list, max_workers=2, timeout=0.001)
+        self.assertEqual(len(batch_report['batch_report']), len(self._bii_tab_dir_list))
+        for f in batch_report['batch_report']:
+            self.assertFalse(f['report']['validation_finished'])
+            self.assertEqual(f['report']['errors'][0]['message'], 'Validation timed out')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs worker processes forked with the patched worker function")
+    def test_batch_validate_worker_dies(self):
+        import multiprocessing
+        from unittest import mock
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest("needs worker processes forked with the patched worker function")
+        tab_dir_list = list()
+        for name in ('a', 'crash', 'b', 'c', 'd'):
+            tab_dir = os.path.join(self._tmp_dir, name)
+            os.mkdir(tab_dir)
+            open(os.path.join(tab_dir, 'i_{}.txt'.format(name)), 'w').close()
+            tab_dir_list.append(tab_dir)
+        with mock.patch.object(isatab, '_validate_archive_in_worker', _validate_archive_or_die):
+            batch_report = isatab.batch_validate(tab_dir_list, max_workers=2)
+        self.assertListEqual([f['report']['validation_finished'] for f in batch_report['batch_report']],
+                             [True, False, True, True, True])  # only the archive the worker died on failed
+        self.assertEqual(batch_report['batch_report'][1]['report']['errors'][0]['message'], 'Unknown/System Error')
+
+    def test_timeout_inside_field_checks(self):
+        import signal
+        import time
+        import pandas as pd
+        from unittest import mock
+        if not hasattr(signal, 'setitimer'):
+            self.skipTest("needs SIGALRM")
+        table = pd.DataFrame({'Date': ['2017-01-{:02d}'.format(i) for i in range(1, 29)]})
+        table.filename = 's_test.txt'
+        cfg = mock.Mock()
+        cfg.get_field_by_header.return_value = mock.Mock(header='Date', data_type='date', is_required=True)
+
+        def parse_date_slowly(value):
+            time.sleep(0.5)
+
+        def validate_fields(i_file_path, config_dir, config_cache_dir):
+            with ValidationContext() as context:
+                isatab.check_field_values(table, cfg)
+            return {"filename": i_file_path, "report": context.report(True)}
+
+        start = time.time()
+        with mock.patch.object(isatab, 'validate_archive', validate_fields), \
+                mock.patch.object(isatab.iso8601, 'parse_date', parse_date_slowly):
+            report = isatab._validate_archive_in_worker('i_slow.txt', None, None, 0.2)
+        self.assertLess(time.time() - start, 5)  # checking every cell would take 14 seconds
+        self.assertEqual(report['report']['errors'][0]['message'], 'Validation timed out')
+
 
 class TestBatchValidateIsaJson(unittest.TestCase):
 